@@ -0,0 +1,58 @@
+# pragma version ==0.4.3
+"""
+@title Multicall
+@notice Aggregates read-only calls into a single eth_call. Exposes the same aggregate and
+        tryAggregate signatures as Multicall3, so the bot can use either contract.
+        Compiled into MULTICALL_BYTECODE of utilities/multicall.py with `vyper -f bytecode contracts/Multicall.vy`.
+"""
+
+MAX_CALLS: constant(uint256) = 1024
+MAX_CALL_DATA: constant(uint256) = 256
+MAX_RETURN_DATA: constant(uint256) = 256
+
+struct Call:
+    target: address
+    callData: Bytes[MAX_CALL_DATA]
+
+struct Result:
+    success: bool
+    returnData: Bytes[MAX_RETURN_DATA]
+
+
+@external
+@payable
+def aggregate(calls: DynArray[Call, MAX_CALLS]) -> (uint256, DynArray[Bytes[MAX_RETURN_DATA], MAX_CALLS]):
+    returnData: DynArray[Bytes[MAX_RETURN_DATA], MAX_CALLS] = []
+    for call: Call in calls:
+        success: bool = False
+        ret: Bytes[MAX_RETURN_DATA] = b""
+        success, ret = raw_call(call.target, call.callData, max_outsize=MAX_RETURN_DATA, revert_on_failure=False)
+        assert success, "Multicall aggregate: call failed"
+        returnData.append(ret)
+    return block.number, returnData
+
+
+@external
+@payable
+def tryAggregate(requireSuccess: bool, calls: DynArray[Call, MAX_CALLS]) -> DynArray[Result, MAX_CALLS]:
+    returnData: DynArray[Result, MAX_CALLS] = []
+    for call: Call in calls:
+        success: bool = False
+        ret: Bytes[MAX_RETURN_DATA] = b""
+        success, ret = raw_call(call.target, call.callData, max_outsize=MAX_RETURN_DATA, revert_on_failure=False)
+        if requireSuccess:
+            assert success, "Multicall tryAggregate: call failed"
+        returnData.append(Result(success=success, returnData=ret))
+    return returnData
+
+
+@view
+@external
+def getBlockNumber() -> uint256:
+    return block.number
+
+
+@view
+@external
+def getEthBalance(addr: address) -> uint256:
+    return addr.balance
@@ -2,10 +2,16 @@
 pragma solidity ^0.8.0;
 
 import "@uniswap/v2-periphery/contracts/interfaces/IUniswapV2Router02.sol";
+import "@uniswap/v2-core/contracts/interfaces/IUniswapV2Pair.sol";
 import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "@openzeppelin/contracts/token/ERC20/utils/SafeERC20.sol";
 
 contract Arbitrage {
+    // Tokens such as USDT return nothing from transfer and approve, which a bare IERC20 call reverts on
+    using SafeERC20 for IERC20;
+
     address public owner;
+    address private flashPair; // the pair a flash trade is borrowing from, only set while the trade runs
 
     modifier onlyOwner() {
         require(msg.sender == owner, "Not the contract owner");
@@ -33,6 +39,128 @@ contract Arbitrage {
         require(getBalance(_token1) > initialBalance, "Trade reverted. Failed to profit.");
     }
 
+    function executeTradeDirect(
+        address _pair1,
+        address _pair2,
+        address _token1,
+        address _token2,
+        uint256 _amount,
+        uint256 _amountOut1,
+        uint256 _amountOut2
+    ) external onlyOwner {
+        uint256 initialBalance = getBalance(_token1);
+        bool token1IsToken0 = _token1 < _token2;
+
+        // Amounts out are computed off-chain from the reserves. The first pair pays token2 straight into the second pair.
+        IERC20(_token1).safeTransfer(_pair1, _amount);
+        if (token1IsToken0) {
+            IUniswapV2Pair(_pair1).swap(0, _amountOut1, _pair2, new bytes(0));
+            IUniswapV2Pair(_pair2).swap(_amountOut2, 0, address(this), new bytes(0));
+        } else {
+            IUniswapV2Pair(_pair1).swap(_amountOut1, 0, _pair2, new bytes(0));
+            IUniswapV2Pair(_pair2).swap(0, _amountOut2, address(this), new bytes(0));
+        }
+        require(getBalance(_token1) > initialBalance, "Trade reverted. Failed to profit.");
+    }
+
+    function executeFlashTrade(
+        address _pair1,
+        address _pair2,
+        address _token1,
+        address _token2,
+        uint256 _amount,
+        uint256 _amountOut1,
+        uint256 _amountOut2
+    ) external onlyOwner {
+        uint256 initialBalance = getBalance(_token1);
+
+        // Borrow token2 from the first pair. It is swapped back to token1 on the second pair in the callback,
+        // and the first pair is repaid _amount of token1 out of the proceeds, so no inventory of token1 is needed.
+        flashPair = _pair1;
+        bytes memory data = abi.encode(_pair2, _token1, _token2, _amount, _amountOut2);
+        if (_token1 < _token2) {
+            IUniswapV2Pair(_pair1).swap(0, _amountOut1, address(this), data);
+        } else {
+            IUniswapV2Pair(_pair1).swap(_amountOut1, 0, address(this), data);
+        }
+        flashPair = address(0);
+        require(getBalance(_token1) > initialBalance, "Trade reverted. Failed to profit.");
+    }
+
+    function uniswapV2Call(address _sender, uint256 _amount0, uint256 _amount1, bytes calldata _data) external {
+        flashCallback(_sender, _amount0, _amount1, _data);
+    }
+
+    // PancakeSwap pairs call back under their own name
+    function pancakeCall(address _sender, uint256 _amount0, uint256 _amount1, bytes calldata _data) external {
+        flashCallback(_sender, _amount0, _amount1, _data);
+    }
+
+    function flashCallback(address _sender, uint256 _amount0, uint256 _amount1, bytes calldata _data) internal {
+        require(flashPair != address(0) && msg.sender == flashPair && _sender == address(this), "Unexpected flash swap callback");
+        (address pair2, address token1, address token2, uint256 amount, uint256 amountOut2) = abi.decode(_data, (address, address, address, uint256, uint256));
+
+        IERC20(token2).safeTransfer(pair2, _amount0 + _amount1);
+        if (token1 < token2) {
+            IUniswapV2Pair(pair2).swap(amountOut2, 0, address(this), new bytes(0));
+        } else {
+            IUniswapV2Pair(pair2).swap(0, amountOut2, address(this), new bytes(0));
+        }
+        IERC20(token1).safeTransfer(msg.sender, amount);
+    }
+
+    function approveRouters(address[] calldata _tokens, address[] calldata _routers) external onlyOwner {
+        for (uint256 i = 0; i < _tokens.length; i++) {
+            for (uint256 j = 0; j < _routers.length; j++) {
+                IERC20(_tokens[i]).forceApprove(_routers[j], type(uint256).max);
+            }
+        }
+    }
+
+    struct TradeLeg {
+        address router1;
+        address router2;
+        address token1;
+        address token2;
+        uint256 amount;
+        uint256 minProfit;
+    }
+
+    event TradeLegResult(uint256 indexed index, bool success, uint256 profit);
+
+    function executeTrades(TradeLeg[] calldata _legs) external onlyOwner {
+        for (uint256 i = 0; i < _legs.length; i++) {
+            TradeLeg calldata leg = _legs[i];
+            // Each leg runs in its own call frame, so a failed leg only rolls back its own swaps.
+            try this.executeTradeLeg(leg.router1, leg.router2, leg.token1, leg.token2, leg.amount, leg.minProfit) returns (uint256 profit) {
+                emit TradeLegResult(i, true, profit);
+            } catch {
+                emit TradeLegResult(i, false, 0);
+            }
+        }
+    }
+
+    function executeTradeLeg(
+        address _router1,
+        address _router2,
+        address _token1,
+        address _token2,
+        uint256 _amount,
+        uint256 _minProfit
+    ) external returns (uint256) {
+        require(msg.sender == address(this), "Only callable from executeTrades");
+        uint256 initialBalance = getBalance(_token1);
+        uint256 initialBalanceToken2 = getBalance(_token2);
+
+        swap(_router1, _token1, _token2, _amount);
+        uint256 tradeReturn = getBalance(_token2) - initialBalanceToken2;
+
+        swap(_router2, _token2, _token1, tradeReturn);
+        uint256 finalBalance = getBalance(_token1);
+        require(finalBalance > initialBalance && finalBalance - initialBalance >= _minProfit, "Leg reverted. Failed to profit.");
+        return finalBalance - initialBalance;
+    }
+
     function estimateTradeReturn(
         address _router1,
         address _router2,
@@ -45,6 +173,65 @@ contract Arbitrage {
         return amountOut2;
     }
 
+    struct Route {
+        address router1;
+        address router2;
+        address token1;
+        address token2;
+    }
+
+    function estimateTradeReturns(
+        Route[] calldata _routes,
+        uint256[] calldata _amounts
+    ) external view returns (uint256[][] memory) {
+        uint256[][] memory returns_ = new uint256[][](_routes.length);
+        for (uint256 i = 0; i < _routes.length; i++) {
+            returns_[i] = new uint256[](_amounts.length);
+            address[] memory pathOut = getPathForTokenToToken(_routes[i].token1, _routes[i].token2);
+            address[] memory pathBack = getPathForTokenToToken(_routes[i].token2, _routes[i].token1);
+            for (uint256 j = 0; j < _amounts.length; j++) {
+                // A route that can't be quoted, e.g. for lack of liquidity, returns 0 instead of reverting the whole matrix.
+                try IUniswapV2Router02(_routes[i].router1).getAmountsOut(_amounts[j], pathOut) returns (uint256[] memory amountsOut1) {
+                    try IUniswapV2Router02(_routes[i].router2).getAmountsOut(amountsOut1[1], pathBack) returns (uint256[] memory amountsOut2) {
+                        returns_[i][j] = amountsOut2[1];
+                    } catch {}
+                } catch {}
+            }
+        }
+        return returns_;
+    }
+
+    function executePath(
+        address[] calldata _routers,
+        address[] calldata _path,
+        uint256 _amount
+    ) external onlyOwner {
+        require(_path.length >= 3 && _routers.length == _path.length - 1, "Invalid path.");
+        require(_path[0] == _path[_path.length - 1], "Path must return to the starting token.");
+        uint256 initialBalance = getBalance(_path[0]);
+
+        uint256 amountIn = _amount;
+        for (uint256 i = 0; i < _routers.length; i++) {
+            uint256 balanceBefore = getBalance(_path[i + 1]);
+            swap(_routers[i], _path[i], _path[i + 1], amountIn);
+            amountIn = getBalance(_path[i + 1]) - balanceBefore;
+        }
+        require(getBalance(_path[0]) > initialBalance, "Trade reverted. Failed to profit.");
+    }
+
+    function estimatePathReturn(
+        address[] calldata _routers,
+        address[] calldata _path,
+        uint256 _amount
+    ) external view returns (uint256) {
+        require(_path.length >= 2 && _routers.length == _path.length - 1, "Invalid path.");
+        uint256 amountOut = _amount;
+        for (uint256 i = 0; i < _routers.length; i++) {
+            amountOut = IUniswapV2Router02(_routers[i]).getAmountsOut(amountOut, getPathForTokenToToken(_path[i], _path[i + 1]))[1];
+        }
+        return amountOut;
+    }
+
     function getBalance(address _tokenContractAddress) public view returns (uint256) {
         return IERC20(_tokenContractAddress).balanceOf(address(this));
     }
@@ -67,7 +254,10 @@ contract Arbitrage {
         address _tokenOut,
         uint256 _amount
     ) internal {
-        IERC20(_tokenIn).approve(_router, _amount);
+        // Routers keep an infinite allowance once approved, so the approval is only paid on the first swap.
+        if (IERC20(_tokenIn).allowance(address(this), _router) < _amount) {
+            IERC20(_tokenIn).forceApprove(_router, type(uint256).max);
+        }
         address[] memory path = getPathForTokenToToken(_tokenIn, _tokenOut);
         IUniswapV2Router02(_router).swapExactTokensForTokens(
             _amount,
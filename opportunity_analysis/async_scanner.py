@@ -0,0 +1,307 @@
+from utilities.populate_routes import (setup)
+from utilities.arb_bot import ArbBot
+from utilities.pair_registry import (PairRegistry, UNISWAP_V2_PAIR_ABI)
+from utilities.reserve_snapshot import ReserveSnapshot
+from utilities.receipt_tracker import ReceiptTracker
+from utilities.rpc_client import (get_web3, get_async_web3)
+from utilities.metadata_cache import configure_metadata_cache
+from utilities.route_evaluator import RouteEvaluator
+from opportunity_analysis.bot_trading import (report_receipt)
+import asyncio
+import json
+import time
+'''
+async_scanner.py
+
+Scans routes for trade opportunities with AsyncWeb3. Reserves, balances and on-chain quotes of
+independent routes are fetched concurrently with bounded parallelism, so a scan cycle takes about
+as long as its slowest round of calls instead of the sum of all of them. Opportunities are decided
+the same way as in bot_trading.py: a RouteEvaluator masks the routes whose spread passes the profit
+target in a direction that still has an edge after fees, and only those are quoted on-chain.
+'''
+class AsyncScanner:
+    """
+    Represents a concurrent route scanner.
+
+    Attributes:
+        async_web3 (AsyncWeb3): an AsyncWeb3 instance to access blockchain.
+        routes (list): routes as in data["routes"] of the mainnet config.
+        router_dict (dict): router Contract instances keyed by router address.
+        pair_registry (PairRegistry): registry of the pair contracts on all routers.
+        min_profitBP (int): Basis point value of the minimum profitability accepted in a trade.
+        slippage_bufferBP (int): Basis point value of the slippage buffer percentage added for swaps.
+        trading_feeBP (int): Basis point value of the total trading fees involved in the arb trade.
+        max_concurrency (int): the maximum number of RPC calls in flight at once.
+        route_evaluator (RouteEvaluator): evaluator of the spreads of the routes in both directions.
+        profit_threshold (float): the spread a route needs to exceed, as in hit_profit_target.
+        bot (AsyncContract): AsyncContract instance of the arbitrage bot contract.
+        pair_contracts (dict): AsyncContract instances of the pairs keyed by pair address.
+    """
+    def __init__(self, async_web3, arb_bot, routes, router_dict, pair_registry, min_profitBP, slippage_bufferBP, trading_feeBP=60, max_concurrency=16):
+        """
+        Initialize the AsyncScanner instance with async contracts of the arbitrage bot and of every pair behind the routes.
+
+        Params:
+            async_web3 (AsyncWeb3): an AsyncWeb3 instance to access blockchain.
+            arb_bot (ArbBot): an ArbBot instance whose contract address and abi are used.
+            routes (list): routes as in data["routes"] of the mainnet config.
+            router_dict (dict): router Contract instances keyed by router address.
+            pair_registry (PairRegistry): registry of the pair contracts on all routers.
+            min_profitBP (int): Basis point value of the minimum profitability accepted in a trade.
+            slippage_bufferBP (int): Basis point value of the slippage buffer percentage added for swaps.
+            trading_feeBP (int): Basis point value of the total trading fees involved in the arb trade.
+            max_concurrency (int): the maximum number of RPC calls in flight at once.
+        """
+        self.async_web3 = async_web3
+        self.routes = routes
+        self.router_dict = router_dict
+        self.pair_registry = pair_registry
+        self.min_profitBP = min_profitBP
+        self.slippage_bufferBP = slippage_bufferBP
+        self.trading_feeBP = trading_feeBP
+        self.max_concurrency = max_concurrency
+        self.semaphore = None
+        self.route_evaluator = RouteEvaluator(routes, router_dict, pair_registry)
+        self.profit_threshold = (min_profitBP + slippage_bufferBP + trading_feeBP)/100
+        self.bot = async_web3.eth.contract(address=arb_bot.bot_address, abi=arb_bot.bot_abi)
+        self.pair_contracts = {}
+        for route in routes:
+            for router_address in (route["router1"], route["router2"]):
+                pair_address = pair_registry.get_pair_address(router_dict[router_address], route["token1"], route["token2"])
+                if pair_address not in self.pair_contracts:
+                    self.pair_contracts[pair_address] = async_web3.eth.contract(address=pair_address, abi=UNISWAP_V2_PAIR_ABI)
+
+    async def call(self, function, block_number):
+        """
+        Calls a contract function at a block once a concurrency slot is free.
+
+        Params:
+            function (AsyncContractFunction): the bound contract function to call.
+            block_number (int): the block to call at.
+
+        Returns:
+            the return value of the contract function.
+        """
+        async with self.semaphore:
+            return await function.call(block_identifier=block_number)
+
+    async def get_reserves(self, block_number):
+        """
+        Fetches the reserves of every pair concurrently.
+
+        Params:
+            block_number (int): the block to read the reserves at.
+
+        Returns:
+            (ReserveSnapshot): the reserves of every pair at the block.
+        """
+        pair_addresses = list(self.pair_contracts)
+        reserves = await asyncio.gather(*[
+            self.call(self.pair_contracts[pair_address].functions.getReserves(), block_number)
+            for pair_address in pair_addresses
+            ])
+        return ReserveSnapshot(block_number, {pair_address: tuple(reserve) for pair_address, reserve in zip(pair_addresses, reserves)})
+
+    async def get_balances(self, token_addresses, block_number):
+        """
+        Fetches the balances of tokens in the arbitrage contract concurrently.
+
+        Params:
+            token_addresses (iterable): addresses of token contracts.
+            block_number (int): the block to read the balances at.
+
+        Returns:
+            (dict): the wei amount of every token balance keyed by token address.
+        """
+        token_addresses = list(token_addresses)
+        balances = await asyncio.gather(*[
+            self.call(self.bot.functions.getBalance(token_address), block_number)
+            for token_address in token_addresses
+            ])
+        return dict(zip(token_addresses, balances))
+
+    async def estimate_return(self, router1, router2, token1, token2, amount, block_number):
+        """
+        Estimates the return of a trade with Arbitrage.estimateTradeReturn, like ArbBot.estimate_return.
+
+        Params:
+            router1 (str): The address of a router contract.
+            router2 (str): The address of a router contract.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+            block_number (int): the block to estimate at.
+
+        Returns:
+            (int): The estimated amount of return in token1.
+        """
+        return await self.call(self.bot.functions.estimateTradeReturn(router1, router2, token1, token2, amount), block_number)
+
+    async def scan_route(self, route, price_diff, balances, block_number):
+        """
+        Quotes both trade directions of a route that passed the profit target concurrently.
+
+        Params:
+            route (dict): a route as in data["routes"] of the mainnet config.
+            price_diff (float): the spread of the route evaluated by the RouteEvaluator.
+            balances (dict): the balances of the arbitrage contract keyed by token address.
+            block_number (int): the block to quote at.
+
+        Returns:
+            (dict): the route with the "price_diff", the "router1"/"router2" order to trade in, the "amount" and the
+                "expected_return", or None if the route isn't profitable.
+        """
+        router1 = self.router_dict[route["router1"]]
+        router2 = self.router_dict[route["router2"]]
+        amount = balances[route["token1"]]
+        if amount == 0:
+            return None
+        return_1_then_2, return_2_then_1 = await asyncio.gather(
+            self.estimate_return(router1.address, router2.address, route["token1"], route["token2"], amount, block_number),
+            self.estimate_return(router2.address, router1.address, route["token1"], route["token2"], amount, block_number)
+            )
+        if return_1_then_2 >= return_2_then_1:
+            router_order, expected_return = (router1.address, router2.address), return_1_then_2
+        else:
+            router_order, expected_return = (router2.address, router1.address), return_2_then_1
+        if expected_return <= amount:
+            return None
+        return dict(route, price_diff=price_diff, router1=router_order[0], router2=router_order[1], amount=amount, expected_return=expected_return)
+
+    async def scan(self, block_number=None):
+        """
+        Scans every route against one block, fetching reserves, balances and quotes of independent routes concurrently.
+
+        Params:
+            block_number (int): the block to scan. Scans the latest block if none.
+
+        Returns:
+            block_number (int): the block that was scanned.
+            opportunities (list): the profitable routes as returned by scan_route.
+        """
+        # asyncio primitives belong to the running event loop, so the semaphore is made per scan
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        if block_number is None:
+            block_number = await self.async_web3.eth.block_number
+
+        reserves, balances = await asyncio.gather(
+            self.get_reserves(block_number),
+            self.get_balances({route["token1"] for route in self.routes}, block_number)
+            )
+        # Spreads of all routes are evaluated in both directions in one pass, so only the candidates are quoted
+        self.route_evaluator.load_reserves(reserves)
+        candidates, spreads = self.route_evaluator.evaluate(self.profit_threshold)
+        results = await asyncio.gather(*[
+            self.scan_route(self.routes[route_index], float(spreads[route_index]), balances, block_number)
+            for route_index in candidates
+            ])
+        return block_number, [result for result in results if result is not None]
+
+def batch_opportunities(opportunities, slippage_bufferBP):
+    """
+    Turns the opportunities of a block into the legs of one executeTrades batch. Opportunities are sized at the whole
+    balance of their base asset, so only the most profitable one of every base asset is kept.
+
+    Params:
+        opportunities (list): the profitable routes as returned by AsyncScanner.scan_route.
+        slippage_bufferBP (int): Basis point value of the slippage buffer taken off the expected profit of every leg.
+
+    Returns:
+        (list): (router1, router2, token1, token2, amount, min_profit) of every leg.
+    """
+    best = {}
+    for opportunity in opportunities:
+        profit = opportunity["expected_return"] - opportunity["amount"]
+        if opportunity["token1"] not in best or profit > best[opportunity["token1"]][0]:
+            best[opportunity["token1"]] = (profit, opportunity)
+    return [
+        (opportunity["router1"], opportunity["router2"], opportunity["token1"], opportunity["token2"], opportunity["amount"],
+         max(1, profit * (10000 - slippage_bufferBP) // 10000))
+        for profit, opportunity in best.values()
+        ]
+
+async def run(scanner, arb_bot, receipt_tracker, end_time, poll_interval, batch_trades=False):
+    """
+    Scans every new block until end_time and submits the opportunities found without waiting for them to be mined.
+
+    Params:
+        scanner (AsyncScanner): an AsyncScanner instance.
+        arb_bot (ArbBot): an ArbBot instance to execute trades with.
+        receipt_tracker (ReceiptTracker): the tracker polling the receipts of the trades in the background.
+        end_time (float): the time to stop scanning at.
+        poll_interval (float): seconds between two block number polls.
+        batch_trades (bool): whether to send the opportunities of a block as the legs of one executeTrades transaction.
+
+    Returns:
+        none
+    """
+    last_block = None
+    while time.time() < end_time:
+        block_number = await scanner.async_web3.eth.block_number
+        if block_number == last_block:
+            await asyncio.sleep(poll_interval)
+            continue
+        last_block = block_number
+
+        cycle_start = time.time()
+        arb_bot.fee_oracle.update(block_number) # trades of the block are priced without any fee RPC
+        _, opportunities = await scanner.scan(block_number)
+        for opportunity in opportunities:
+            print(f'''Opportunity found on block {block_number}!
+Expected return is {opportunity["expected_return"] - opportunity["amount"]} wei of {opportunity["token1"]}
+trading {opportunity["token1"]}/{opportunity["token2"]} on {opportunity["router1"]} then {opportunity["router2"]}.''')
+            if batch_trades:
+                continue
+            arb_bot.submit_trade(opportunity["router1"], opportunity["router2"], opportunity["token1"], opportunity["token2"], opportunity["amount"], receipt_tracker, report_receipt)
+        if batch_trades and opportunities:
+            arb_bot.submit_trades(batch_opportunities(opportunities, scanner.slippage_bufferBP), receipt_tracker, report_receipt)
+        print(f"Block {block_number} scanned in {round((time.time() - cycle_start) * 1000, 2)}ms")
+
+if __name__ == "__main__":
+    '''
+    The main function that serves as the entry point of the concurrent scanner.
+    '''
+    with open('opportunity_analysis/arb_bot_config.json', 'r') as arb_bot_config_file:
+        arb_bot_config = json.load(arb_bot_config_file)
+
+    min_profitBP = arb_bot_config["min_profitBP"]
+    slippage_bufferBP = arb_bot_config["slippage_bufferBP"]
+    duration = arb_bot_config["duration"]
+    start_time = arb_bot_config["start_time"]
+    PRIVATE_KEY = arb_bot_config["PRIVATE_KEY"]
+    block_poll_interval = arb_bot_config.get("block_poll_interval", 0.2)
+    max_concurrency = arb_bot_config.get("max_concurrency", 16)
+    fee_speed = arb_bot_config.get("fee_speed", "standard")
+    batch_trades = arb_bot_config.get("batch_trades", False)
+    rpc_pool_size = arb_bot_config.get("rpc_pool_size", 16)
+    rpc_timeout = arb_bot_config.get("rpc_timeout", 10)
+    rpc_fallback_urls = arb_bot_config.get("rpc_fallback_urls", [])
+    rpc_hedge_after = arb_bot_config.get("rpc_hedge_after", 0.25)
+    metadata_cache_path = arb_bot_config.get("metadata_cache_path")
+    if metadata_cache_path is not None:
+        configure_metadata_cache(metadata_cache_path) # immutable token and router reads are kept across runs
+    get_web3(pool_size=rpc_pool_size, timeout=rpc_timeout, fallback_urls=rpc_fallback_urls, hedge_after=rpc_hedge_after) # the first client of the node sets the pool every component shares
+    arb_bot = ArbBot(PRIVATE_KEY, min_profitBP = min_profitBP, slippage_bufferBP = slippage_bufferBP)
+    arb_bot.fee_oracle.speed = fee_speed
+
+    web3, data, api_key, api_url = setup()
+
+    # create the Router instances
+    with open("configs/router_ABIs/UniswapV2Router02_abi.json", "r") as file:
+        uniswap_router_abi = json.load(file)
+    router_dict = {router["address"]: arb_bot.web3.eth.contract(address=router["address"], abi=uniswap_router_abi) for router in data["routers"]}
+
+    # load Uniswap Factory abi
+    with open("configs/factory_ABIs/UniswapV2Factory_abi.json", "r") as factory_abi_file:
+        factory_abi = json.load(factory_abi_file)
+
+    # Resolve the pair contracts of all routes once for the lifetime of the scanner
+    pair_registry = PairRegistry(web3, factory_abi)
+    pair_registry.register_routes(data["routes"], router_dict)
+
+    async_web3 = get_async_web3(arb_bot.node_url, timeout=rpc_timeout)
+    scanner = AsyncScanner(async_web3, arb_bot, data["routes"], router_dict, pair_registry, min_profitBP, slippage_bufferBP, max_concurrency=max_concurrency)
+    receipt_tracker = ReceiptTracker(web3, poll_interval=block_poll_interval).start()
+    asyncio.run(run(scanner, arb_bot, receipt_tracker, start_time + duration, block_poll_interval, batch_trades))
+    receipt_tracker.stop()
+    print(f"Completed bot operations for {int(duration/60)} minutes.")
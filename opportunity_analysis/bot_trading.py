@@ -1,9 +1,20 @@
 from utilities.populate_routes import (setup)
 from utilities.arb_bot import ArbBot
-from utilities.trading_utilities import (get_account_balances)
+from utilities.rpc_client import get_web3
+from utilities.metadata_cache import configure_metadata_cache
+from utilities.pair_registry import PairRegistry
+from utilities.multicall import (get_multicall)
+from utilities.reserve_snapshot import (take_reserve_snapshot)
+from utilities.reserve_book import ReserveBook
+from utilities.block_scheduler import BlockScheduler
+from utilities.quote_engine import QuoteEngine
+from utilities.route_evaluator import RouteEvaluator
+from utilities.token_graph import TokenGraph
+from utilities.trading_utilities import (get_account_balances, get_token_flow)
+from utilities.receipt_tracker import ReceiptTracker
+from utilities.trade_logger import TradeLogger
 import json
 import time
-import csv
 '''
 trade.py
 
@@ -13,59 +24,40 @@ Executes trades when profit target is hit, and logs results to console.
 Author: ILnaw
 Version: 08-14-2024
 '''     
-def get_price_diff(web3, uniswap_v2_pair_abi, factory_abi, tokenA_address, tokenB_address, router1, router2):
+def get_price_diff(pair_registry, tokenA_address, tokenB_address, router1, router2, reserve_snapshot=None):
     """
     Get the price difference of tokenA/tokenB on two different routers.
 
     Params:
-        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
-        uniswap_v2_pair_abi (str): abi of a uniswap v2 pair contract.
-        factory_abi (str): abi of a uniswap v2 factory contract.
+        pair_registry (PairRegistry): registry of the pair contracts on all routers.
         tokenA_address (str): address of a token contract.
         tokenB_address (str): address of a token contract.
         router1 (Contract): Contract instance of a router.
         router2 (Contract): Contract instance of a router.
+        reserve_snapshot (ReserveSnapshot or ReserveBook): block-consistent reserves to read from. Reserves are fetched from the pair contracts if none.
     
     Returns:
         (float): price difference of the same pair of token on two different routers. 
     """
-    # create Factory instance
-    factory1_address = router1.functions.factory().call()
-    factory1 = web3.eth.contract(address=factory1_address, abi=factory_abi)
-    factory2_address = router2.functions.factory().call()
-    factory2 = web3.eth.contract(address=factory2_address, abi=factory_abi)
-
-    pair_contract_1 = get_pair_contract(web3, factory1, uniswap_v2_pair_abi, tokenA_address, tokenB_address)
-    pair_contract_2 = get_pair_contract(web3, factory2, uniswap_v2_pair_abi, tokenA_address, tokenB_address)
+    pair_contract_1 = pair_registry.get_pair_contract(router1, tokenA_address, tokenB_address)
+    pair_contract_2 = pair_registry.get_pair_contract(router2, tokenA_address, tokenB_address)
 
     # Fetch reserves
-    reserves_on_1 = pair_contract_1.functions.getReserves().call()
+    if reserve_snapshot is not None:
+        reserves_on_1 = reserve_snapshot.get_reserves(pair_contract_1.address)
+        reserves_on_2 = reserve_snapshot.get_reserves(pair_contract_2.address)
+    else:
+        reserves_on_1 = pair_contract_1.functions.getReserves().call()
+        reserves_on_2 = pair_contract_2.functions.getReserves().call()
+
     reserve0_on_1, reserve1_on_1, _ = reserves_on_1
     price_on_router1 = reserve0_on_1 / reserve1_on_1
 
-    reserves_on_2 = pair_contract_2.functions.getReserves().call()
     reserve0_on_2, reserve1_on_2, _ = reserves_on_2
     price_on_router2 = reserve0_on_2 / reserve1_on_2
     
     return (price_on_router2 - price_on_router1)/price_on_router1
 
-def get_pair_contract(web3, factory_contract, pair_contract_abi, token1_address, token2_address):
-    """
-    Get the pair contract of two tokens on an AMM dex through its factory contract.
-
-    Params:
-        web3 (Provider): A Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
-        factory_contract (Contract): Contract instance of a factory in an AMM.
-        pair_contract_abi (str): abi of a uniswap v2 pair contract.
-        token1_address (str): address of a token contract.
-        token2_address (str): address of a token contract.
-
-    Returns:
-        (Contract): the pair contract of two tokens on an AMM.
-    """
-    pair_contract_address = factory_contract.functions.getPair(token1_address, token2_address).call()
-    return web3.eth.contract(address = pair_contract_address, abi = pair_contract_abi)
-
 def hit_profit_target(min_profitBP, slippage_bufferBP, trading_feeBP, price_diff):
     """
     Determines whether the price difference of a token pair on different routers hit the profit target based on 
@@ -84,6 +76,143 @@ def hit_profit_target(min_profitBP, slippage_bufferBP, trading_feeBP, price_diff
         return True
     return False
 
+def presign_candidates(arb_bot, quote_engine, routes, router_dict, candidates, spreads, top_n, balances=None):
+    """
+    Speculatively signs the trades of the top candidate routes of a block by spread, sized and oriented the same way
+    the scan loop sizes them, so that the first one confirmed is sent without encoding or signing.
+
+    Params:
+        arb_bot (ArbBot): an ArbBot instance.
+        quote_engine (QuoteEngine): quote engine holding the cached reserves and router fees.
+        routes (list): routes as in data["routes"] of the mainnet config.
+        router_dict (dict): router Contract instances keyed by router address.
+        candidates (ndarray): indices of the routes that hit the profit threshold.
+        spreads (ndarray): the spread of every route.
+        top_n (int): the number of candidates to pre-sign.
+        balances (dict): the token balances of the arbitrage contract keyed by token address. Read in one batch if none.
+
+    Returns:
+        (int): the number of pre-signed transactions.
+    """
+    trades = []
+    top_candidates = sorted(candidates, key=lambda route_index: spreads[route_index], reverse=True)[:top_n]
+    if balances is None:
+        balances = arb_bot.get_balances(routes[route_index]["token1"] for route_index in top_candidates)
+    for route_index in top_candidates:
+        route = routes[route_index]
+        token1, token2 = route["token1"], route["token2"]
+        router1, router2 = router_dict[route["router1"]], router_dict[route["router2"]]
+        token1_balance = balances[token1]
+        best_profit = 0
+        for first, second in ((router1, router2), (router2, router1)):
+            amount = arb_bot.get_optimal_trade_amount(quote_engine, first, second, token1, token2, token1_balance)
+            profit = quote_engine.quote_round_trip(first, second, token1, token2, amount) - amount
+            if profit > best_profit:
+                best_profit, trade = profit, (first.address, second.address, token1, token2, amount)
+        if best_profit > 0:
+            trades.append(trade)
+    return arb_bot.presign_trades(trades)
+
+def execute_cycle(arb_bot, quote_engine, router_dict, cycle, receipt_tracker):
+    """
+    Re-checks a multi-hop cycle found on the token graph with exact integer quotes, and submits it at its
+    profit-maximizing size if it is still profitable.
+
+    Params:
+        arb_bot (ArbBot): an ArbBot instance.
+        quote_engine (QuoteEngine): quote engine holding the cached reserves and router fees.
+        router_dict (dict): router Contract instances keyed by router address.
+        cycle (dict): a cycle as returned by TokenGraph.score_cycles.
+        receipt_tracker (ReceiptTracker): the tracker polling the receipt of the trade in the background.
+
+    Returns:
+        (PendingTx): The handle of the trade transaction, or None if the cycle wasn't traded.
+    """
+    routers = [router_dict[router_address] for router_address in cycle["routers"]]
+    amount = arb_bot.get_optimal_path_amount(quote_engine, routers, cycle["path"])
+    expected_return = quote_engine.quote_path(routers, cycle["path"], amount)
+    if amount == 0 or expected_return <= amount:
+        return None
+
+    print(f'''Multi-hop opportunity found!
+Expected return is {expected_return - amount} wei of {cycle["path"][0]}
+along {" -> ".join(cycle["path"])}.''')
+    def on_receipt(pending_tx):
+        if pending_tx.receipt is not None and pending_tx.receipt["status"] == 1:
+            print(f"Multi-hop arb trade completed through {len(routers)} hops.")
+        else:
+            print("executePath() failed! Arb trade failed.")
+    return arb_bot.submit_path(cycle["routers"], cycle["path"], amount, receipt_tracker, on_receipt)
+
+def report_receipt(pending_tx):
+    """
+    Reports the outcome of a submitted trade once the receipt tracker sees it mined or dropped.
+
+    Params:
+        pending_tx (PendingTx): the handle of the trade transaction.
+
+    Returns:
+        none
+    """
+    if pending_tx.receipt is not None and pending_tx.receipt["status"] == 1:
+        print(f"Arb trade completed in block {pending_tx.receipt['blockNumber']}.")
+    else:
+        print("executeTrade() failed! Arb trade failed.")
+
+def log_trade_on_receipt(arb_bot, trade_logger, trade):
+    """
+    Builds the receipt callback of a submitted arb trade. Once the trade is mined, the callback takes the amount of the
+    base asset the trade returned to the arbitrage contract from the Transfer logs of its own receipt, so that the PnL
+    of the trade excludes the other trades of its block, and hands it to the trade logger.
+
+    Params:
+        arb_bot (ArbBot): an ArbBot instance.
+        trade_logger (TradeLogger): the performance log of the arb trades.
+        trade (dict): the arguments of TradeLogger.log_trade known when the trade is sent.
+
+    Returns:
+        (function): the callback to pass to the receipt tracker.
+    """
+    def on_receipt(pending_tx):
+        if pending_tx.receipt is None:
+            print(f"Arb trade on {trade['token1']} and {trade['token2']} was dropped.")
+            return
+        if pending_tx.receipt["status"] == 1:
+            print('''
+    ****************************
+    *         Success!         *
+    *   Arb trade completed.   *
+    ****************************
+''')
+        token1_balance_after = trade["token1_balance"] + get_token_flow(pending_tx.receipt, trade["token1"], arb_bot.bot_address)
+        trade_logger.log_trade(pending_tx.receipt, token1_balance_after=token1_balance_after, time_tx_finalized=pending_tx.finalized_at, **trade)
+    return on_receipt
+
+def log_batch_on_receipt(arb_bot, trade_logger, trades):
+    """
+    Builds the receipt callback of a submitted batch of arb trades. Once the batch is mined, the callback decodes the
+    outcome of every leg from the receipt and hands each leg to the trade logger with an equal share of the gas used.
+
+    Params:
+        arb_bot (ArbBot): an ArbBot instance.
+        trade_logger (TradeLogger): the performance log of the arb trades.
+        trades (list): the arguments of TradeLogger.log_trade known when the batch is sent, in the order of the legs.
+
+    Returns:
+        (function): the callback to pass to the receipt tracker.
+    """
+    def on_receipt(pending_tx):
+        if pending_tx.receipt is None:
+            print(f"Batch of {len(trades)} arb trades was dropped.")
+            return
+        leg_results = {index: (success, profit) for index, success, profit in arb_bot.get_trade_leg_results(pending_tx.receipt)}
+        print(f"Batch of {len(trades)} arb trades mined with {sum(success for success, _ in leg_results.values())} profitable legs.")
+        for index, trade in enumerate(trades):
+            success, profit = leg_results.get(index, (False, 0))
+            leg_receipt = dict(pending_tx.receipt, status=int(success), gasUsed=pending_tx.receipt["gasUsed"] // len(trades))
+            trade_logger.log_trade(leg_receipt, token1_balance_after=trade["token1_balance"] + profit, time_tx_finalized=pending_tx.finalized_at, **trade)
+    return on_receipt
+
 if __name__ == "__main__":
     '''
     The main function that serves as the entry point of the program.
@@ -96,7 +225,26 @@ if __name__ == "__main__":
     duration = arb_bot_config["duration"]
     start_time = arb_bot_config["start_time"]
     PRIVATE_KEY = arb_bot_config["PRIVATE_KEY"]
+    scan_time_budget = arb_bot_config.get("scan_time_budget", 1.0)
+    block_poll_interval = arb_bot_config.get("block_poll_interval", 0.2)
+    verify_quotes = arb_bot_config.get("verify_quotes", False)
+    max_cycle_length = arb_bot_config.get("max_cycle_length", 3)
+    fee_speed = arb_bot_config.get("fee_speed", "standard")
+    use_websocket = arb_bot_config.get("use_websocket", False)
+    presign_top_n = arb_bot_config.get("presign_top_n", 3)
+    batch_trades = arb_bot_config.get("batch_trades", False)
+    trade_mode = arb_bot_config.get("trade_mode", "router")
+    rpc_pool_size = arb_bot_config.get("rpc_pool_size", 16)
+    rpc_timeout = arb_bot_config.get("rpc_timeout", 10)
+    rpc_fallback_urls = arb_bot_config.get("rpc_fallback_urls", [])
+    rpc_hedge_after = arb_bot_config.get("rpc_hedge_after", 0.25)
+    metadata_cache_path = arb_bot_config.get("metadata_cache_path")
+    if metadata_cache_path is not None:
+        configure_metadata_cache(metadata_cache_path) # immutable token and router reads are kept across runs
+    get_web3(pool_size=rpc_pool_size, timeout=rpc_timeout, fallback_urls=rpc_fallback_urls, hedge_after=rpc_hedge_after) # the first client of the node sets the pool every component shares
     arb_bot = ArbBot(PRIVATE_KEY, min_profitBP = min_profitBP, slippage_bufferBP = slippage_bufferBP)
+    arb_bot.fee_oracle.speed = fee_speed
+    arb_bot.trade_mode = trade_mode
 
     web3, data, api_key, api_url = setup()
 
@@ -121,75 +269,75 @@ if __name__ == "__main__":
     with open("configs/factory_ABIs/UniswapV2Factory_abi.json", "r") as factory_abi_file:
         factory_abi = json.load(factory_abi_file)
         print("factory_abi read from json file.")
-        
-        uniswap_v2_pair_abi = [
-        {
-            "constant": True,
-            "inputs": [],
-            "name": "getReserves",
-            "outputs": [
-                {"name": "_reserve0", "type": "uint112"},
-                {"name": "_reserve1", "type": "uint112"},
-                {"name": "_blockTimestampLast", "type": "uint32"},
-            ],
-            "payable": False,
-            "stateMutability": "view",
-            "type": "function",
-        }
-    ]
-
-    # Create a csv file to track trade txs and performance.
-    with open("performance_monitor/trade_logs_bot.csv", mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([
-            "net_profit($)", 
-            "profit_per_trade($)",
-            "net_roi",
-            "success_rate",
-            "total_trade_volume_usd($)",
-            "trade_profit($)",
-            "analysis_latency(ms)",
-            "on_chain_execution_time(ms)",
-            "price_diff", 
-            "time_opportunity_found(s)", 
-            "time_tx_init(s)", 
-            "time_tx_finalized(s)", 
-            "base_asset",
-            "intermediate_asset",
-            "first_swap_router",
-            "second_swap_router",
-            "base_asset_balance_before_swap(wei)", 
-            "base_asset_balance_after_swap(wei)", 
-            "tx_receipt"
-            ])
+
+    # Resolve the pair contracts of all routes once for the lifetime of the bot
+    pair_registry = PairRegistry(web3, factory_abi)
+    pair_addresses = pair_registry.register_routes(data["routes"], router_dict)
+
+    # Reserves of all pairs are read in one aggregated eth_call, then kept up to date from Sync logs
+    multicall = get_multicall(web3, PRIVATE_KEY)
+    reserve_book = ReserveBook(web3, take_reserve_snapshot(multicall, pair_addresses), pair_addresses)
+    changed_pairs = set(pair_addresses) # evaluate every route against the starting snapshot
+    reserve_book.subscribe(lambda pairs, block_number: changed_pairs.update(pairs))
+
+    # Round trips are quoted off-chain from the reserve book, optionally checked against estimateTradeReturn
+    quote_engine = QuoteEngine(pair_registry, reserve_book, arb_bot=arb_bot, verify=verify_quotes)
+
+    # Multi-hop cycles are searched on a token graph of all pools, starting from the base assets held by the bot
+    token_graph = TokenGraph(data["routes"], router_dict, pair_registry, max_length=max_cycle_length)
+    base_asset_addresses = [asset["address"] for asset in data["baseAssets"]]
+    # Cycles through the base assets are enumerated once and indexed by pair, so each block only re-scores the cycles through moved pairs
+    if max_cycle_length >= 3:
+        print(f"Indexed {token_graph.index_cycles(base_asset_addresses)} multi-hop cycles.")
+
+    # Spreads of all routes are evaluated in a single NumPy pass per block
+    route_evaluator = RouteEvaluator(data["routes"], router_dict, pair_registry)
+    profit_threshold = (min_profitBP + slippage_bufferBP + 60)/100 # same target as hit_profit_target with 60 BP trading fees
+
+    # Trades are sent without blocking the scan, and logged with their PnL once the receipt tracker sees them mined
+    trade_logger = TradeLogger()
+    receipt_tracker = ReceiptTracker(web3, poll_interval=block_poll_interval).start()
     
     # Run the bot for the specified duration
     print("Bot setup complete. Monitoring on-chain opportunites...")
-    bot_balances = 2589.50 * 10 # traded 10 ETH for the base assets
-    print(f'bot initial balances: ${bot_balances}')
-    trade_count = 0 # the number of arb trades sent on-chain
-    net_profit = 0 #  net_profit = balance after trades - balance before trades - gas fees
-    total_trade_volume_usd = 0
-    profit_per_trade = 0
-    winning_trades_count = 0
-    losing_trades_count = 0
-    success_count = 0
-    while time.time() - start_time < duration:
-        for viable_route in data["routes"]:
+    print(f'bot initial balances: ${trade_logger.bot_balances}')
+    # Wake on every new block and evaluate the routes against its state within the scan time budget
+    # Blocks and Sync logs are pushed over a WebSocket subscription if enabled, and polled over HTTP otherwise
+    subscriber = arb_bot.subscribe(pair_addresses) if use_websocket else None
+    scheduler = BlockScheduler(web3, time_budget=scan_time_budget, poll_interval=block_poll_interval, subscriber=subscriber)
+    for block_number in scheduler.blocks(start_time + duration):
+        if subscriber is not None:
+            reserve_book.apply_subscription(subscriber, block_number)
+        else:
+            reserve_book.update(block_number)
+        arb_bot.fee_oracle.update(block_number) # trades of the block are priced without any fee RPC
+
+        # Re-score the routes whose pairs moved, found through the pair to routes index, then re-check only the candidates
+        route_evaluator.load_reserves(reserve_book, changed_pairs)
+        token_graph.update_reserves(reserve_book, changed_pairs)
+        candidates, spreads = route_evaluator.evaluate(profit_threshold, route_evaluator.get_dirty_routes(changed_pairs))
+        # Read the balances of every candidate's token1 in a single batch request, instead of one request per candidate
+        balances = arb_bot.get_balances(data["routes"][route_index]["token1"] for route_index in candidates) if len(candidates) > 0 else {}
+        # Sign the most promising trades ahead of confirming them, so that sending one takes a single RPC
+        # Batched trades are sent as one executeTrades transaction instead, which never uses the pre-signed ones
+        if presign_top_n > 0 and len(candidates) > 0 and trade_mode == "router" and not batch_trades:
+            presign_candidates(arb_bot, quote_engine, data["routes"], router_dict, candidates, spreads, presign_top_n, balances)
+        # With batching, the trades of the block are collected as legs and sent in a single executeTrades transaction
+        # Either way, the balances committed to the trades already sent or collected this block aren't available to later ones
+        batch_legs, batch_log, committed = [], [], {}
+        # Routes deferred from the last block are checked first, then the rest by spread
+        ordered_candidates = scheduler.prioritize(candidates, spreads)
+        for position, route_index in enumerate(ordered_candidates):
+             if scheduler.budget_exceeded():
+                 print(f"Scan time budget exceeded on block {block_number}. Deferring remaining routes to the next block.")
+                 scheduler.defer(ordered_candidates[position:])
+                 break
+             viable_route = data["routes"][route_index]
              token1 = viable_route["token1"]
              token2 = viable_route["token2"]
              router1 = router_dict[viable_route["router1"]]
              router2 = router_dict[viable_route["router2"]]
-
-             price_diff = get_price_diff(
-                 web3,
-                 uniswap_v2_pair_abi,
-                 factory_abi,
-                 token1,
-                 token2,
-                 router1,
-                 router2
-                 )
+             price_diff = float(spreads[route_index])
 
              if hit_profit_target(min_profitBP, slippage_bufferBP, 60, price_diff) == True:
                  print(f'''Profit target hit! 
@@ -197,96 +345,65 @@ Price diff is now {price_diff*100}%
 for {token1} and {token2}
 between Uniswap and Sushi.''')
                  time_opportunity_found = time.time()
-                 token1_balance = arb_bot.get_balance(token1)
-                 time_tx_init = "estimate_return below amount_in."
-                 time_tx_finalized = "executeTrade failed"
-                 tx_receipt = "executeTrade failed"
-                 router_1 = "N/A"
-                 router_2 = "N/A"
-                 # determine sequence of trading venues through if else statements
-                 trade_router1_then_router2 = arb_bot.estimate_return(router1.address, router2.address, token1, token2, token1_balance)
-                 print(f"amount difference after trading on router1 then router2: {trade_router1_then_router2 - token1_balance}")
-                 trade_router2_then_router1 = arb_bot.estimate_return(router2.address, router1.address, token1, token2, token1_balance)
-                 print(f"amount difference after trading on router2 then router1: {trade_router2_then_router1 - token1_balance}")
-
-                 if trade_router1_then_router2 > token1_balance:
-                    router_1 = router1.address
-                    router_2 = router2.address
-                    time_tx_init = time.time()
-                    tx_receipt = arb_bot.execute_trade(router1.address, router2.address, token1, token2, token1_balance)
-                    time_tx_finalized = time.time()
-                 elif trade_router2_then_router1 > token1_balance:
-                    router_1 = router2.address
-                    router_2 = router1.address
-                    time_tx_init = time.time()
-                    tx_receipt = arb_bot.execute_trade(router2.address, router1.address, token1, token2, token1_balance)
-                    time_tx_finalized = time.time()
+                 token1_balance = max(0, balances[token1] - committed.get(token1, 0)) # less what earlier trades of the block trade
+                 # size each sequence of trading venues at its profit-maximizing amount, capped at the balance unless flash-borrowed
+                 capped = trade_mode != "flash" or batch_trades
+                 amount_router1_then_router2 = arb_bot.get_optimal_trade_amount(quote_engine, router1, router2, token1, token2, token1_balance, capped)
+                 trade_router1_then_router2 = quote_engine.quote_round_trip(router1, router2, token1, token2, amount_router1_then_router2)
+                 profit_router1_then_router2 = trade_router1_then_router2 - amount_router1_then_router2
+                 print(f"amount difference after trading {amount_router1_then_router2} on router1 then router2: {profit_router1_then_router2}")
+                 amount_router2_then_router1 = arb_bot.get_optimal_trade_amount(quote_engine, router2, router1, token1, token2, token1_balance, capped)
+                 trade_router2_then_router1 = quote_engine.quote_round_trip(router2, router1, token1, token2, amount_router2_then_router1)
+                 profit_router2_then_router1 = trade_router2_then_router1 - amount_router2_then_router1
+                 print(f"amount difference after trading {amount_router2_then_router1} on router2 then router1: {profit_router2_then_router1}")
+
+                 if profit_router1_then_router2 > 0 and profit_router1_then_router2 >= profit_router2_then_router1:
+                    router_1, router_2, trade_amount = router1.address, router2.address, amount_router1_then_router2
+                 elif profit_router2_then_router1 > 0:
+                    router_1, router_2, trade_amount = router2.address, router1.address, amount_router2_then_router1
                  else:
                      print('''Abort trade! Negative return.
                            ''')
+                     continue
 
-                 # Write trade performance data into the csv file each time a dual-dex trade tx is initiated.
-                 if tx_receipt != "executeTrade failed":
-                     trade_count += 1
-                     for asset in data["baseAssets"]:
-                        if asset["address"] == token1:
-                            token1_wei_price = asset["price"] 
-                            break
-                     total_trade_volume_usd += token1_balance * token1_wei_price
-                     token_1_balance_after = arb_bot.get_balance(token1) # balance after the trade
-                     gas_cost = tx_receipt['gasUsed'] * tx_receipt['effectiveGasPrice'] * 2.60687E-15
-                     trade_profit = (token_1_balance_after - token1_balance)*token1_wei_price - gas_cost
-                     net_profit += trade_profit # get the net_profit so far
-                     profit_per_trade = round(net_profit/trade_count, 2)
-                     return_on_investment = round(net_profit/bot_balances, 2) # roi = net_profit/total investments, rounded to 2 decimal places
-                     analysis_latency = (time_tx_init - time_opportunity_found) * 1000 # convert to ms
-                     on_chain_execution_time = (time_tx_finalized - time_tx_init) * 1000 # convert to ms
-                     if tx_receipt["status"] == 1:
-                        success_count += 1
-                     success_rate = round(success_count/trade_count, 2)
-                     with open("performance_monitor/trade_logs_bot.csv", mode='a', newline='') as file:
-                        writer = csv.writer(file)
-                        writer.writerow([
-                            net_profit,
-                            profit_per_trade, 
-                            return_on_investment,
-                            success_rate, 
-                            total_trade_volume_usd,
-                            trade_profit,
-                            analysis_latency, # Time taken to detect and execute an arbitrage opportunity.
-                            on_chain_execution_time, # The time between placing the order and the order getting executed, which reflects gas price competitiveness and serves gas optimization reference.
-                            price_diff, 
-                            time_opportunity_found, 
-                            time_tx_init, 
-                            time_tx_finalized, 
-                            token1,
-                            token2,
-                            router_1,
-                            router_2,
-                            token1_balance, # balance before the trade
-                            token_1_balance_after, # balance after the trade
-                            tx_receipt
-                            ])
-                        
-                        print(f'''
-PROFITABILITY
-    -- Net Profit:          ${net_profit}
-    -- Net ROI:             {return_on_investment*100}%
-    -- Profit per Trade:    ${profit_per_trade}
-
-SUCCESS RATE
-    -- Winning Chance:      {success_rate*100}%
-    -- Winning Trade Count: {success_count}
-    -- Total Trade Count:   {trade_count}                         
-
-EXECUTION SPEED
-    -- Analysis Latency:    {analysis_latency}ms
-    -- On-chain execution:  {on_chain_execution_time}ms
-
-CAPITAL UTILIZATION
-    -- Trade Volume:        ${total_trade_volume_usd}
-''')
-             # Sleep for a short duration to avoid busy-waiting in CPU
-             time.sleep(1)
+                 # Send the trade without waiting for it to be mined. Its performance is logged once the receipt is in.
+                 for asset in data["baseAssets"]:
+                    if asset["address"] == token1:
+                        token1_wei_price = asset["price"] 
+                        break
+                 trade = {
+                     "trade_amount": trade_amount,
+                     "token1_wei_price": token1_wei_price,
+                     "token1_balance": balances[token1], # balance before the trades of the block
+                     "price_diff": price_diff,
+                     "time_opportunity_found": time_opportunity_found,
+                     "time_tx_init": time.time(),
+                     "token1": token1,
+                     "token2": token2,
+                     "router_1": router_1,
+                     "router_2": router_2
+                 }
+                 if batch_trades:
+                     expected_profit = max(profit_router1_then_router2, profit_router2_then_router1)
+                     batch_legs.append((router_1, router_2, token1, token2, trade_amount, max(1, expected_profit * (10000 - slippage_bufferBP) // 10000)))
+                     batch_log.append(trade)
+                     committed[token1] = committed.get(token1, 0) + trade_amount
+                     continue
+                 pending_tx = arb_bot.submit_trade_in_mode(quote_engine, router_dict[router_1], router_dict[router_2], token1, token2, trade_amount, receipt_tracker, log_trade_on_receipt(arb_bot, trade_logger, trade))
+                 if pending_tx != "N/A" and capped:
+                     committed[token1] = committed.get(token1, 0) + trade_amount
+        else:
+            # Look for multi-hop cycles once all two-hop candidates of the block are handled
+            if changed_pairs and max_cycle_length >= 3:
+                for cycle in token_graph.score_cycles(changed_pairs):
+                    if scheduler.budget_exceeded():
+                        break
+                    execute_cycle(arb_bot, quote_engine, router_dict, cycle, receipt_tracker)
+            changed_pairs.clear()
+        if batch_legs:
+            arb_bot.submit_trades(batch_legs, receipt_tracker, log_batch_on_receipt(arb_bot, trade_logger, batch_log))
+    if subscriber is not None:
+        subscriber.stop()
+    receipt_tracker.stop() # wait for the trades still pending to be logged
     print(f"Completed bot operations for {int(duration/60)} minutes.")
 
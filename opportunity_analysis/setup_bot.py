@@ -51,7 +51,23 @@ if __name__ == "__main__":
         "slippage_bufferBP": slippage_bufferBP,
         "duration": duration,
         "start_time": start_time,
-        "PRIVATE_KEY": PRIVATE_KEY
+        "PRIVATE_KEY": PRIVATE_KEY,
+        "scan_time_budget": 1.0, # seconds a block's scan may take before remaining routes are deferred
+        "block_poll_interval": 0.2, # seconds between two eth_blockNumber polls
+        "verify_quotes": False, # check off-chain quotes against estimateTradeReturn on the fork
+        "max_cycle_length": 3, # longest multi-hop cycle searched on the token graph, below 3 disables the search
+        "max_concurrency": 16, # RPC calls in flight at once in async_scanner.py
+        "num_shards": None, # shard processes of sharded_scanner.py, one per CPU core if none
+        "fee_speed": "standard", # target inclusion speed of the fee oracle: slow, standard or fast
+        "presign_top_n": 3, # candidate trades of a block signed ahead of confirming them, 0 disables pre-signing, unused with batch_trades
+        "batch_trades": False, # send all trades found in a block as the legs of one executeTrades transaction
+        "trade_mode": "router", # "router" trades through executeTrade, "direct" swaps on the pairs through executeTradeDirect, "flash" borrows the trade from the first pair
+        "rpc_pool_size": 16, # keep-alive connections to the node shared by every RPC client, and requests in flight at most
+        "rpc_timeout": 10, # seconds to wait for a response of the node
+        "rpc_fallback_urls": [], # other nodes of the same chain that reads are routed to when faster, hedged on and failed over to
+        "rpc_hedge_after": 0.25, # seconds to wait for a read before hedging it on a fallback node
+        "use_websocket": False, # be pushed new blocks and Sync logs over a WebSocket subscription instead of polling
+        "metadata_cache_path": None # JSON file keeping token decimals, symbols and router factories across runs, in memory only if none
     }
     with open('opportunity_analysis/arb_bot_config.json', 'w') as arb_bot_config_file:
         json.dump(arb_bot_config, arb_bot_config_file, indent=4)
\ No newline at end of file
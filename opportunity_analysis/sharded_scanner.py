@@ -0,0 +1,343 @@
+from utilities.populate_routes import (setup, CONFIG_PATH)
+from utilities.arb_bot import ArbBot
+from utilities.rpc_client import get_web3
+from utilities.metadata_cache import configure_metadata_cache
+from utilities.pair_registry import (PairRegistry, sort_tokens)
+from utilities.multicall import (get_multicall)
+from utilities.reserve_snapshot import (ReserveSnapshot, take_reserve_snapshot)
+from utilities.reserve_book import ReserveBook
+from utilities.block_scheduler import BlockScheduler
+from utilities.quote_engine import QuoteEngine
+from utilities.route_evaluator import RouteEvaluator
+from utilities.receipt_tracker import ReceiptTracker
+from opportunity_analysis.bot_trading import (report_receipt)
+from web3 import Web3
+import multiprocessing
+import argparse
+import json
+import os
+'''
+sharded_scanner.py
+
+Scans large route universes, such as the routes populated from configs/mainnet_full.json, across a
+pool of processes. Routes are split into shards by the hash of their token pair, and every shard
+process keeps a RouteEvaluator over its own routes. For every block, the executor process sends
+each shard the block-pinned reserves of the pairs it trades, and the shards stream the routes that
+pass the profit threshold back over one queue, where they are re-checked and executed.
+
+Command-line arguments:
+  -h, --help  show this help message and exit
+  --config    Path of the config to load the routes from, e.g. configs/mainnet_full.json.
+'''
+def get_shard(route, num_shards):
+    """
+    Gets the shard of a route from the hash of its token pair, so that every route of a pair lands in the same shard.
+
+    Params:
+        route (dict): a route as in data["routes"] of the mainnet config.
+        num_shards (int): the number of shards.
+
+    Returns:
+        (int): the index of the shard of the route.
+    """
+    token0, token1 = sort_tokens(route["token1"], route["token2"])
+    pair_hash = Web3.keccak(hexstr=token0 + token1[2:])
+    return int.from_bytes(pair_hash, 'big') % num_shards
+
+def shard_routes(routes, num_shards):
+    """
+    Splits routes into shards by the hash of their token pair.
+
+    Params:
+        routes (list): routes as in data["routes"] of the mainnet config.
+        num_shards (int): the number of shards.
+
+    Returns:
+        (list): the list of routes of every shard.
+    """
+    shards = [[] for _ in range(num_shards)]
+    for route in routes:
+        shards[get_shard(route, num_shards)].append(route)
+    return shards
+
+def scan_shard(shard_index, route_evaluator, threshold, task_queue, candidate_queue):
+    """
+    Runs in a shard process. Scores the routes of the shard against every reserve snapshot received on the
+    task queue, and streams the routes passing the threshold to the candidate queue, followed by a None
+    candidate once the block is done. Stops on a None task.
+
+    Params:
+        shard_index (int): the index of the shard.
+        route_evaluator (RouteEvaluator): evaluator over the routes of the shard.
+        threshold (float): the spread a route needs to exceed, as in hit_profit_target.
+        task_queue (Queue): queue of ReserveSnapshot instances holding the reserves of the pairs that changed.
+        candidate_queue (Queue): queue of (block number, shard index, candidate) shared by all shards.
+
+    Returns:
+        none
+    """
+    while True:
+        reserve_snapshot = task_queue.get()
+        if reserve_snapshot is None:
+            return
+        changed_pairs = list(reserve_snapshot.reserves)
+        route_evaluator.load_reserves(reserve_snapshot, changed_pairs)
+        candidates, spreads = route_evaluator.evaluate(threshold, route_evaluator.get_dirty_routes(changed_pairs))
+        for route_index in candidates:
+            candidate = dict(route_evaluator.routes[route_index], price_diff=float(spreads[route_index]))
+            candidate_queue.put((reserve_snapshot.block_number, shard_index, candidate))
+        candidate_queue.put((reserve_snapshot.block_number, shard_index, None))
+
+class ShardedScanner:
+    """
+    Represents a pool of shard processes scanning a route universe.
+
+    Attributes:
+        threshold (float): the spread a route needs to exceed, as in hit_profit_target.
+        shards (list): the list of routes of every shard.
+        route_evaluators (list): RouteEvaluator instance of every shard.
+        pair_shards (dict): indices of the shards trading a pair keyed by pair address.
+        task_queues (list): task queue of every shard process.
+        candidate_queue (Queue): queue the shard processes stream candidates to.
+        processes (list): the shard processes.
+    """
+    def __init__(self, routes, router_dict, pair_registry, threshold, num_shards=None):
+        """
+        Initialize the ShardedScanner instance by splitting the routes into shards and laying out an evaluator per shard.
+        Pair addresses are resolved here once, so the shard processes never need an RPC connection.
+
+        Params:
+            routes (list): routes as in data["routes"] of the mainnet config.
+            router_dict (dict): router Contract instances keyed by router address.
+            pair_registry (PairRegistry): registry of the pair contracts on all routers.
+            threshold (float): the spread a route needs to exceed, as in hit_profit_target.
+            num_shards (int): the number of shard processes. Uses one per CPU core if none.
+        """
+        self.threshold = threshold
+        self.shards = [shard for shard in shard_routes(routes, num_shards or os.cpu_count()) if shard]
+        self.route_evaluators = [RouteEvaluator(shard, router_dict, pair_registry) for shard in self.shards]
+        self.pair_shards = {}
+        for shard_index, route_evaluator in enumerate(self.route_evaluators):
+            for pair_address in route_evaluator.pair_addresses:
+                self.pair_shards.setdefault(pair_address, []).append(shard_index)
+        self.task_queues = []
+        self.candidate_queue = None
+        self.processes = []
+
+    def start(self):
+        """
+        Starts a process per shard.
+
+        Returns:
+            none
+        """
+        context = multiprocessing.get_context("spawn")
+        self.candidate_queue = context.Queue()
+        for shard_index, route_evaluator in enumerate(self.route_evaluators):
+            task_queue = context.Queue()
+            process = context.Process(
+                target=scan_shard,
+                args=(shard_index, route_evaluator, self.threshold, task_queue, self.candidate_queue),
+                daemon=True)
+            process.start()
+            self.task_queues.append(task_queue)
+            self.processes.append(process)
+
+    def stop(self):
+        """
+        Stops all shard processes.
+
+        Returns:
+            none
+        """
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for process in self.processes:
+            process.join()
+        self.task_queues = []
+        self.processes = []
+
+    def submit(self, reserves, block_number, pair_addresses):
+        """
+        Sends every shard trading any of the given pairs their reserves pinned to one block.
+
+        Params:
+            reserves (ReserveSnapshot or ReserveBook): reserves of the pairs at the block.
+            block_number (int): the block the reserves are pinned to.
+            pair_addresses (iterable): addresses of the pairs whose reserves changed.
+
+        Returns:
+            (int): the number of shards the block was sent to.
+        """
+        shard_reserves = {}
+        for pair_address in pair_addresses:
+            for shard_index in self.pair_shards.get(pair_address, []):
+                shard_reserves.setdefault(shard_index, {})[pair_address] = reserves.get_reserves(pair_address)
+        for shard_index, pair_reserves in shard_reserves.items():
+            self.task_queues[shard_index].put(ReserveSnapshot(block_number, pair_reserves))
+        return len(shard_reserves)
+
+    def candidates(self, block_number, pending_shards):
+        """
+        Yields the candidates streamed by the shards for a block as they arrive, until every pending shard is done.
+
+        Params:
+            block_number (int): the block the candidates were scored at.
+            pending_shards (int): the number of shards the block was sent to.
+
+        Yields:
+            (dict): the route of a candidate with its "price_diff".
+        """
+        while pending_shards > 0:
+            candidate_block, _, candidate = self.candidate_queue.get()
+            if candidate is None:
+                if candidate_block == block_number:
+                    pending_shards -= 1
+            elif candidate_block == block_number:
+                yield candidate
+
+def execute_candidate(arb_bot, quote_engine, router_dict, candidate, receipt_tracker, callback=None, balances=None, committed=None):
+    """
+    Re-checks a candidate route with exact integer quotes in both directions, and submits the more
+    profitable one at its profit-maximizing size without waiting for it to be mined. As in bot_trading,
+    the trade is capped at the balance of the contract less the amounts committed to the trades already
+    sent in the block, and its own amount is committed once it is sent.
+
+    Params:
+        arb_bot (ArbBot): an ArbBot instance.
+        quote_engine (QuoteEngine): quote engine holding the cached reserves and router fees.
+        router_dict (dict): router Contract instances keyed by router address.
+        candidate (dict): a route with its "price_diff" as yielded by ShardedScanner.candidates.
+        receipt_tracker (ReceiptTracker): the tracker polling the receipt of the trade in the background.
+        callback (function): called with the PendingTx once the trade is mined or dropped.
+        balances (dict): the token balances of the arbitrage contract at the block keyed by token address. Read if none.
+        committed (dict): the amounts committed to the trades already sent in the block keyed by token address.
+
+    Returns:
+        (PendingTx): The handle of the trade transaction, or None if the route wasn't traded.
+    """
+    token1 = candidate["token1"]
+    token2 = candidate["token2"]
+    router1 = router_dict[candidate["router1"]]
+    router2 = router_dict[candidate["router2"]]
+    # flash trades borrow their size, so they aren't capped at the balance of the contract
+    capped = arb_bot.trade_mode != "flash"
+    committed = {} if committed is None else committed
+    token1_balance = None
+    if capped:
+        if balances is None:
+            balances = arb_bot.get_balances([token1])
+        token1_balance = max(0, balances[token1] - committed.get(token1, 0)) # less what earlier trades of the block trade
+
+    best_profit, best_trade = 0, None
+    for router_a, router_b in ((router1, router2), (router2, router1)):
+        amount = arb_bot.get_optimal_trade_amount(quote_engine, router_a, router_b, token1, token2, token1_balance, capped)
+        profit = quote_engine.quote_round_trip(router_a, router_b, token1, token2, amount) - amount
+        if profit > best_profit:
+            best_profit, best_trade = profit, (router_a, router_b, token1, token2, amount)
+    if best_trade is None:
+        return None
+
+    print(f'''Profit target hit!
+Price diff is now {candidate["price_diff"]*100}%
+for {token1} and {token2}. Expected return is {best_profit} wei.''')
+    pending_tx = arb_bot.submit_trade_in_mode(quote_engine, *best_trade, receipt_tracker, callback)
+    if pending_tx != "N/A" and capped:
+        committed[token1] = committed.get(token1, 0) + best_trade[4]
+    return pending_tx
+
+if __name__ == "__main__":
+    '''
+    The main function that serves as the entry point of the sharded scanner.
+    '''
+    parser = argparse.ArgumentParser(description="Scans the routes of a config across a pool of shard processes.")
+    parser.add_argument('--config', default=CONFIG_PATH, help='Path of the config to load the routes from, e.g. configs/mainnet_full.json.')
+    args = parser.parse_args()
+
+    with open('opportunity_analysis/arb_bot_config.json', 'r') as arb_bot_config_file:
+        arb_bot_config = json.load(arb_bot_config_file)
+
+    min_profitBP = arb_bot_config["min_profitBP"]
+    slippage_bufferBP = arb_bot_config["slippage_bufferBP"]
+    duration = arb_bot_config["duration"]
+    start_time = arb_bot_config["start_time"]
+    PRIVATE_KEY = arb_bot_config["PRIVATE_KEY"]
+    scan_time_budget = arb_bot_config.get("scan_time_budget", 1.0)
+    block_poll_interval = arb_bot_config.get("block_poll_interval", 0.2)
+    num_shards = arb_bot_config.get("num_shards")
+    fee_speed = arb_bot_config.get("fee_speed", "standard")
+    use_websocket = arb_bot_config.get("use_websocket", False)
+    rpc_pool_size = arb_bot_config.get("rpc_pool_size", 16)
+    rpc_timeout = arb_bot_config.get("rpc_timeout", 10)
+    rpc_fallback_urls = arb_bot_config.get("rpc_fallback_urls", [])
+    rpc_hedge_after = arb_bot_config.get("rpc_hedge_after", 0.25)
+    metadata_cache_path = arb_bot_config.get("metadata_cache_path")
+    if metadata_cache_path is not None:
+        configure_metadata_cache(metadata_cache_path) # immutable token and router reads are kept across runs
+    get_web3(pool_size=rpc_pool_size, timeout=rpc_timeout, fallback_urls=rpc_fallback_urls, hedge_after=rpc_hedge_after) # the first client of the node sets the pool every component shares
+    arb_bot = ArbBot(PRIVATE_KEY, min_profitBP = min_profitBP, slippage_bufferBP = slippage_bufferBP)
+    arb_bot.fee_oracle.speed = fee_speed
+    arb_bot.trade_mode = arb_bot_config.get("trade_mode", "router")
+
+    web3, data, api_key, api_url = setup(args.config)
+
+    # create the Router instances
+    with open("configs/router_ABIs/UniswapV2Router02_abi.json", "r") as file:
+        uniswap_router_abi = json.load(file)
+    router_dict = {router["address"]: arb_bot.web3.eth.contract(address=router["address"], abi=uniswap_router_abi) for router in data["routers"]}
+
+    # load Uniswap Factory abi
+    with open("configs/factory_ABIs/UniswapV2Factory_abi.json", "r") as factory_abi_file:
+        factory_abi = json.load(factory_abi_file)
+
+    # Resolve the pair contracts of all routes once for the lifetime of the scanner
+    pair_registry = PairRegistry(web3, factory_abi)
+    pair_addresses = pair_registry.register_routes(data["routes"], router_dict)
+
+    # Reserves of all pairs are read in one aggregated eth_call, then kept up to date from Sync logs
+    multicall = get_multicall(web3, PRIVATE_KEY)
+    reserve_book = ReserveBook(web3, take_reserve_snapshot(multicall, pair_addresses), pair_addresses)
+    changed_pairs = set(pair_addresses) # send every pair to the shards for the starting snapshot
+    reserve_book.subscribe(lambda pairs, block_number: changed_pairs.update(pairs))
+    quote_engine = QuoteEngine(pair_registry, reserve_book)
+
+    profit_threshold = (min_profitBP + slippage_bufferBP + 60)/100 # same target as hit_profit_target with 60 BP trading fees
+    scanner = ShardedScanner(data["routes"], router_dict, pair_registry, profit_threshold, num_shards)
+    base_asset_addresses = list(dict.fromkeys(route["token1"] for route in data["routes"]))
+    scanner.start()
+    print(f"Scanning {len(data['routes'])} routes across {len(scanner.processes)} shard processes.")
+
+    # Trades are sent without blocking the scan, and reported once the receipt tracker sees them mined
+    receipt_tracker = ReceiptTracker(web3, poll_interval=block_poll_interval).start()
+
+    # Blocks and Sync logs are pushed over a WebSocket subscription if enabled, and polled over HTTP otherwise
+    subscriber = arb_bot.subscribe(pair_addresses) if use_websocket else None
+    scheduler = BlockScheduler(web3, time_budget=scan_time_budget, poll_interval=block_poll_interval, subscriber=subscriber)
+    try:
+        for block_number in scheduler.blocks(start_time + duration):
+            if subscriber is not None:
+                reserve_book.apply_subscription(subscriber, block_number)
+            else:
+                reserve_book.update(block_number)
+            arb_bot.fee_oracle.update(block_number) # trades of the block are priced without any fee RPC
+            pending_shards = scanner.submit(reserve_book, block_number, changed_pairs)
+            changed_pairs.clear()
+            # the balances of every base asset are read in one batch request on the first candidate of the block,
+            # and the amounts committed to the trades sent in the block aren't available to later ones
+            balances, committed = None, {}
+            for candidate in scanner.candidates(block_number, pending_shards):
+                # candidates are still drained once the budget is used up so the next block starts clean,
+                # and their pairs are kept dirty to be re-scored on the next block
+                if not scheduler.budget_exceeded():
+                    if balances is None and arb_bot.trade_mode != "flash":
+                        balances = arb_bot.get_balances(base_asset_addresses)
+                    execute_candidate(arb_bot, quote_engine, router_dict, candidate, receipt_tracker, report_receipt, balances, committed)
+                else:
+                    for router_address in (candidate["router1"], candidate["router2"]):
+                        changed_pairs.add(pair_registry.get_pair_address(router_dict[router_address], candidate["token1"], candidate["token2"]))
+    finally:
+        scanner.stop()
+        if subscriber is not None:
+            subscriber.stop()
+        receipt_tracker.stop()
+    print(f"Completed bot operations for {int(duration/60)} minutes.")
@@ -0,0 +1,162 @@
+const { expect } = require("chai");
+const { loadFixture } = require("@nomicfoundation/hardhat-toolbox/network-helpers");
+const { anyValue } = require("@nomicfoundation/hardhat-chai-matchers/withArgs");
+
+// Runs against the mainnet fork of hardhat.config.js
+const UNISWAP_ROUTER = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D";
+const SUSHI_ROUTER = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F";
+const UNISWAP_FACTORY = "0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f";
+const SUSHI_FACTORY = "0xC0AEe478e3658e2610c5F7A4A2E1777cE9e4f2Ac";
+const WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2";
+const USDT = "0xdAC17F958D2ee523a2206206994597C13D831ec7"; // returns nothing from transfer and approve
+const NO_PAIR_TOKEN = "0x000000000000000000000000000000000000dEaD"; // has no pair on any router
+
+const ROUTER_ABI = [
+  "function swapExactETHForTokens(uint256 amountOutMin, address[] path, address to, uint256 deadline) payable returns (uint256[])",
+  "function getAmountsOut(uint256 amountIn, address[] path) view returns (uint256[])",
+];
+const FACTORY_ABI = ["function getPair(address tokenA, address tokenB) view returns (address)"];
+const PAIR_ABI = ["function getReserves() view returns (uint112, uint112, uint32)"];
+const ERC20_ABI = ["function balanceOf(address owner) view returns (uint256)"];
+
+function getAmountOut(amountIn, reserveIn, reserveOut) {
+  const amountInWithFee = amountIn * 997n;
+  return (amountInWithFee * reserveOut) / (reserveIn * 1000n + amountInWithFee);
+}
+
+async function getOrientedReserves(pair, tokenIn, tokenOut) {
+  const [reserve0, reserve1] = await pair.getReserves();
+  return BigInt(tokenIn) < BigInt(tokenOut) ? [reserve0, reserve1] : [reserve1, reserve0];
+}
+
+async function deadline() {
+  return (await ethers.provider.getBlock("latest")).timestamp + 600;
+}
+
+// Funds the arbitrage contract with USDT, then dumps ETH for USDT on Sushi so that WETH is cheaper in USDT on Sushi than on Uniswap
+async function deployWithSpreadFixture() {
+  const [owner, whale] = await ethers.getSigners();
+  const arbitrage = await ethers.deployContract("Arbitrage");
+  const uniswapRouter = await ethers.getContractAt(ROUTER_ABI, UNISWAP_ROUTER);
+  const sushiRouter = await ethers.getContractAt(ROUTER_ABI, SUSHI_ROUTER);
+  const usdt = await ethers.getContractAt(ERC20_ABI, USDT);
+
+  await uniswapRouter.connect(owner).swapExactETHForTokens(0, [WETH, USDT], await arbitrage.getAddress(), await deadline(), { value: ethers.parseEther("20") });
+  await sushiRouter.connect(whale).swapExactETHForTokens(0, [WETH, USDT], whale.address, await deadline(), { value: ethers.parseEther("500") });
+
+  const uniswapPair = await ethers.getContractAt(PAIR_ABI, await (await ethers.getContractAt(FACTORY_ABI, UNISWAP_FACTORY)).getPair(WETH, USDT));
+  const sushiPair = await ethers.getContractAt(PAIR_ABI, await (await ethers.getContractAt(FACTORY_ABI, SUSHI_FACTORY)).getPair(WETH, USDT));
+  return { arbitrage, owner, whale, usdt, uniswapPair, sushiPair };
+}
+
+describe("Arbitrage contract", function () {
+  const amount = 10_000n * 10n ** 6n; // 10,000 USDT
+
+  describe("executeTrades", function () {
+    it("Should keep the profitable legs and skip the failing ones", async function () {
+      const { arbitrage, usdt } = await loadFixture(deployWithSpreadFixture);
+      const initialBalance = await usdt.balanceOf(await arbitrage.getAddress());
+      const legs = [
+        { router1: SUSHI_ROUTER, router2: UNISWAP_ROUTER, token1: USDT, token2: WETH, amount, minProfit: 1n }, // buys WETH where it's cheap
+        { router1: UNISWAP_ROUTER, router2: SUSHI_ROUTER, token1: USDT, token2: WETH, amount, minProfit: 1n }, // the losing direction
+        { router1: SUSHI_ROUTER, router2: UNISWAP_ROUTER, token1: USDT, token2: WETH, amount, minProfit: ethers.MaxUint256 }, // misses its min profit
+      ];
+
+      const tx = arbitrage.executeTrades(legs);
+      await expect(tx).to.emit(arbitrage, "TradeLegResult").withArgs(0, true, anyValue);
+      await expect(tx).to.emit(arbitrage, "TradeLegResult").withArgs(1, false, 0);
+      await expect(tx).to.emit(arbitrage, "TradeLegResult").withArgs(2, false, 0);
+      expect(await usdt.balanceOf(await arbitrage.getAddress())).to.be.gt(initialBalance);
+    });
+
+    it("Should only let the contract itself run a leg", async function () {
+      const { arbitrage } = await loadFixture(deployWithSpreadFixture);
+      await expect(arbitrage.executeTradeLeg(SUSHI_ROUTER, UNISWAP_ROUTER, USDT, WETH, amount, 1n))
+        .to.be.revertedWith("Only callable from executeTrades");
+    });
+
+    it("Should only let the owner trade", async function () {
+      const { arbitrage, whale } = await loadFixture(deployWithSpreadFixture);
+      await expect(arbitrage.connect(whale).executeTrades([])).to.be.revertedWith("Not the contract owner");
+    });
+  });
+
+  describe("estimateTradeReturns", function () {
+    it("Should match estimateTradeReturn for every route and amount", async function () {
+      const { arbitrage } = await loadFixture(deployWithSpreadFixture);
+      const routes = [
+        { router1: SUSHI_ROUTER, router2: UNISWAP_ROUTER, token1: USDT, token2: WETH },
+        { router1: UNISWAP_ROUTER, router2: SUSHI_ROUTER, token1: USDT, token2: WETH },
+      ];
+      const amounts = [amount, amount * 10n];
+
+      const returns = await arbitrage.estimateTradeReturns(routes, amounts);
+      for (let i = 0; i < routes.length; i++) {
+        for (let j = 0; j < amounts.length; j++) {
+          const { router1, router2, token1, token2 } = routes[i];
+          expect(returns[i][j]).to.equal(await arbitrage.estimateTradeReturn(router1, router2, token1, token2, amounts[j]));
+        }
+      }
+      expect(returns[0][0]).to.be.gt(amount);
+    });
+
+    it("Should return 0 for a route that can't be quoted instead of reverting", async function () {
+      const { arbitrage } = await loadFixture(deployWithSpreadFixture);
+      const routes = [
+        { router1: UNISWAP_ROUTER, router2: SUSHI_ROUTER, token1: USDT, token2: NO_PAIR_TOKEN },
+        { router1: SUSHI_ROUTER, router2: UNISWAP_ROUTER, token1: USDT, token2: WETH },
+      ];
+      const returns = await arbitrage.estimateTradeReturns(routes, [amount]);
+      expect(returns[0][0]).to.equal(0);
+      expect(returns[1][0]).to.be.gt(0);
+    });
+  });
+
+  describe("executeTradeDirect", function () {
+    it("Should trade USDT on the pairs without the routers", async function () {
+      const { arbitrage, usdt, uniswapPair, sushiPair } = await loadFixture(deployWithSpreadFixture);
+      const initialBalance = await usdt.balanceOf(await arbitrage.getAddress());
+      const [sushiIn, sushiOut] = await getOrientedReserves(sushiPair, USDT, WETH);
+      const [uniswapIn, uniswapOut] = await getOrientedReserves(uniswapPair, WETH, USDT);
+      const amountOut1 = getAmountOut(amount, sushiIn, sushiOut);
+      const amountOut2 = getAmountOut(amountOut1, uniswapIn, uniswapOut);
+
+      await arbitrage.executeTradeDirect(await sushiPair.getAddress(), await uniswapPair.getAddress(), USDT, WETH, amount, amountOut1, amountOut2);
+      expect(await usdt.balanceOf(await arbitrage.getAddress())).to.equal(initialBalance - amount + amountOut2);
+    });
+
+    it("Should revert an unprofitable trade", async function () {
+      const { arbitrage, uniswapPair, sushiPair } = await loadFixture(deployWithSpreadFixture);
+      const [uniswapIn, uniswapOut] = await getOrientedReserves(uniswapPair, USDT, WETH);
+      const [sushiIn, sushiOut] = await getOrientedReserves(sushiPair, WETH, USDT);
+      const amountOut1 = getAmountOut(amount, uniswapIn, uniswapOut);
+      const amountOut2 = getAmountOut(amountOut1, sushiIn, sushiOut);
+
+      await expect(arbitrage.executeTradeDirect(await uniswapPair.getAddress(), await sushiPair.getAddress(), USDT, WETH, amount, amountOut1, amountOut2))
+        .to.be.revertedWith("Trade reverted. Failed to profit.");
+    });
+  });
+
+  describe("executeFlashTrade", function () {
+    it("Should borrow from the first pair, repay it and keep the profit", async function () {
+      const { arbitrage, usdt, uniswapPair, sushiPair } = await loadFixture(deployWithSpreadFixture);
+      const initialBalance = await usdt.balanceOf(await arbitrage.getAddress());
+      const [sushiIn, sushiOut] = await getOrientedReserves(sushiPair, USDT, WETH);
+      const [uniswapIn, uniswapOut] = await getOrientedReserves(uniswapPair, WETH, USDT);
+      const flashAmount = initialBalance * 2n; // more than the contract holds
+      const amountOut1 = getAmountOut(flashAmount, sushiIn, sushiOut);
+      const amountOut2 = getAmountOut(amountOut1, uniswapIn, uniswapOut);
+
+      await arbitrage.executeFlashTrade(await sushiPair.getAddress(), await uniswapPair.getAddress(), USDT, WETH, flashAmount, amountOut1, amountOut2);
+      expect(await usdt.balanceOf(await arbitrage.getAddress())).to.equal(initialBalance + amountOut2 - flashAmount);
+    });
+
+    it("Should reject a callback outside of a flash trade", async function () {
+      const { arbitrage, owner } = await loadFixture(deployWithSpreadFixture);
+      await expect(arbitrage.uniswapV2Call(await arbitrage.getAddress(), 0, 0, "0x"))
+        .to.be.revertedWith("Unexpected flash swap callback");
+      await expect(arbitrage.pancakeCall(owner.address, 0, 0, "0x"))
+        .to.be.revertedWith("Unexpected flash swap callback");
+    });
+  });
+});
@@ -0,0 +1,143 @@
+import asyncio
+import pytest
+from opportunity_analysis.async_scanner import (AsyncScanner, batch_opportunities)
+
+WETH_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+USDC_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+uniswap_v2_address = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+sushiswap_v2_address = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+bot_address = "0x00B0517de6b2b09aBD3a7B69d66D85eFdb2c7d94"
+
+class FakeRouter:
+    def __init__(self, address):
+        self.address = address
+
+class FakePair:
+    def __init__(self, address):
+        self.address = address
+
+class FakePairRegistry:
+    def get_pair_address(self, router, tokenA_address, tokenB_address):
+        return "-".join([router.address] + sorted([tokenA_address, tokenB_address]))
+
+    def get_pair_contract(self, router, tokenA_address, tokenB_address):
+        return FakePair(self.get_pair_address(router, tokenA_address, tokenB_address))
+
+class FakeCall:
+    def __init__(self, chain, value):
+        self.chain = chain
+        self.value = value
+
+    async def call(self, block_identifier='latest'):
+        self.chain.in_flight += 1
+        self.chain.max_in_flight = max(self.chain.max_in_flight, self.chain.in_flight)
+        await asyncio.sleep(0.01)
+        self.chain.in_flight -= 1
+        return self.value
+
+class FakeFunctions:
+    def __init__(self, chain, address):
+        self.chain = chain
+        self.address = address
+
+    def getReserves(self):
+        return FakeCall(self.chain, self.chain.reserves[self.address])
+
+    def getBalance(self, token_address):
+        return FakeCall(self.chain, self.chain.balances[token_address])
+
+    def estimateTradeReturn(self, router1, router2, token1, token2, amount):
+        return FakeCall(self.chain, self.chain.returns[(router1, router2)])
+
+class FakeContract:
+    def __init__(self, chain, address):
+        self.address = address
+        self.functions = FakeFunctions(chain, address)
+
+class FakeEth:
+    def __init__(self, chain):
+        self.chain = chain
+
+    def contract(self, address, abi):
+        return FakeContract(self.chain, address)
+
+class FakeAsyncWeb3:
+    def __init__(self, reserves, balances, returns):
+        self.reserves = reserves
+        self.balances = balances
+        self.returns = returns
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.eth = FakeEth(self)
+
+class FakeArbBot:
+    bot_address = bot_address
+    bot_abi = []
+
+router_dict = {uniswap_v2_address: FakeRouter(uniswap_v2_address), sushiswap_v2_address: FakeRouter(sushiswap_v2_address)}
+registry = FakePairRegistry()
+routes = [{"router1": sushiswap_v2_address, "router2": uniswap_v2_address, "token1": WETH_address, "token2": USDC_address}]
+
+def pair(router_address):
+    return registry.get_pair_address(router_dict[router_address], WETH_address, USDC_address)
+
+def make_web3(uniswap_reserves):
+    return FakeAsyncWeb3(
+        {pair(sushiswap_v2_address): (3_000_000 * 10**6, 1_000 * 10**18, 0), pair(uniswap_v2_address): uniswap_reserves},
+        {WETH_address: 10**18},
+        {(sushiswap_v2_address, uniswap_v2_address): 11 * 10**17, (uniswap_v2_address, sushiswap_v2_address): 9 * 10**17}
+        )
+
+def test_scan_finds_opportunity():
+    async_web3 = make_web3((3_600_000 * 10**6, 1_000 * 10**18, 0))
+    scanner = AsyncScanner(async_web3, FakeArbBot(), routes, router_dict, registry, 10, 0, trading_feeBP=0)
+    block_number, opportunities = asyncio.run(scanner.scan(7))
+    assert block_number == 7
+    assert len(opportunities) == 1
+    assert opportunities[0]["router1"] == sushiswap_v2_address
+    assert opportunities[0]["amount"] == 10**18
+    assert opportunities[0]["expected_return"] == 11 * 10**17
+    assert opportunities[0]["price_diff"] == pytest.approx(0.2)
+
+def test_scan_finds_opportunity_in_reverse_direction():
+    # WETH is cheaper on uniswap, so the route is traded on uniswap first
+    async_web3 = make_web3((2_500_000 * 10**6, 1_000 * 10**18, 0))
+    async_web3.returns = {(sushiswap_v2_address, uniswap_v2_address): 9 * 10**17, (uniswap_v2_address, sushiswap_v2_address): 11 * 10**17}
+    scanner = AsyncScanner(async_web3, FakeArbBot(), routes, router_dict, registry, 10, 0, trading_feeBP=0)
+    _, opportunities = asyncio.run(scanner.scan(7))
+    assert len(opportunities) == 1
+    assert opportunities[0]["router1"] == uniswap_v2_address
+    assert opportunities[0]["price_diff"] == pytest.approx(0.2)
+
+def test_scan_skips_routes_below_target():
+    async_web3 = make_web3((3_030_000 * 10**6, 1_000 * 10**18, 0))
+    scanner = AsyncScanner(async_web3, FakeArbBot(), routes, router_dict, registry, 10, 0, trading_feeBP=0)
+    _, opportunities = asyncio.run(scanner.scan(7))
+    assert opportunities == []
+
+def test_scan_skips_routes_without_edge_after_fees():
+    # a 0.2% spread passes a zero target, but not the 0.3% swap fee of both routers
+    async_web3 = make_web3((3_006_000 * 10**6, 1_000 * 10**18, 0))
+    scanner = AsyncScanner(async_web3, FakeArbBot(), routes, router_dict, registry, 0, 0, trading_feeBP=0)
+    _, opportunities = asyncio.run(scanner.scan(7))
+    assert opportunities == []
+
+def test_scan_bounds_concurrency():
+    async_web3 = make_web3((3_600_000 * 10**6, 1_000 * 10**18, 0))
+    scanner = AsyncScanner(async_web3, FakeArbBot(), routes, router_dict, registry, 10, 0, trading_feeBP=0, max_concurrency=2)
+    asyncio.run(scanner.scan(7))
+    assert async_web3.max_in_flight == 2
+
+def test_batch_keeps_best_opportunity_per_base_asset():
+    opportunities = [
+        {"router1": uniswap_v2_address, "router2": sushiswap_v2_address, "token1": WETH_address, "token2": USDC_address, "amount": 1000, "expected_return": 1100},
+        {"router1": sushiswap_v2_address, "router2": uniswap_v2_address, "token1": WETH_address, "token2": USDC_address, "amount": 1000, "expected_return": 1200},
+        {"router1": uniswap_v2_address, "router2": sushiswap_v2_address, "token1": USDC_address, "token2": WETH_address, "amount": 500, "expected_return": 501},
+    ]
+    assert batch_opportunities(opportunities, 100) == [
+        (sushiswap_v2_address, uniswap_v2_address, WETH_address, USDC_address, 1000, 198),
+        (uniswap_v2_address, sushiswap_v2_address, USDC_address, WETH_address, 500, 1),
+    ]
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,43 @@
+import time
+import pytest
+from utilities.block_scheduler import BlockScheduler
+
+class FakeEth:
+    def __init__(self, block_numbers):
+        self.block_numbers = block_numbers
+
+    @property
+    def block_number(self):
+        if len(self.block_numbers) > 1:
+            return self.block_numbers.pop(0)
+        return self.block_numbers[0]
+
+class FakeWeb3:
+    def __init__(self, block_numbers):
+        self.eth = FakeEth(block_numbers)
+
+def test_blocks_yields_each_new_block_once():
+    scheduler = BlockScheduler(FakeWeb3([5, 5, 6, 9]), poll_interval=0)
+    blocks = []
+    for block_number in scheduler.blocks(time.time() + 0.2):
+        blocks.append(block_number)
+    assert blocks == [5, 6, 9]
+    assert sorted(scheduler.cycle_latencies) == [5, 6, 9]
+
+def test_deferred_work_is_scanned_first():
+    scheduler = BlockScheduler(FakeWeb3([1]))
+    spreads = {0: 0.01, 1: 0.03, 2: 0.02, 3: 0.05}
+    assert scheduler.prioritize([0, 1, 2], spreads) == [1, 2, 0]
+    scheduler.defer([2, 0])
+    # deferred routes that are no longer candidates are dropped
+    assert scheduler.prioritize([0, 1, 3], spreads) == [0, 3, 1]
+    assert scheduler.prioritize([0, 1, 3], spreads) == [3, 1, 0]
+
+def test_budget_exceeded():
+    scheduler = BlockScheduler(FakeWeb3([1]), time_budget=0)
+    for block_number in scheduler.blocks(time.time() + 0.1):
+        time.sleep(0.01)
+        assert scheduler.budget_exceeded()
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,58 @@
+import pytest
+from eth_abi import encode
+from hexbytes import HexBytes
+from utilities.trading_utilities import (TRANSFER_EVENT_TOPIC, get_token_flow)
+from opportunity_analysis.bot_trading import (log_trade_on_receipt)
+
+WETH_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+USDC_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+USDT_address = "0xdAC17F958D2ee523a2206206994597C13D831ec7"
+bot_address = "0x00B0517de6b2b09aBD3a7B69d66D85eFdb2c7d94"
+pair_address = "0xB4e16d0168e52d35CaCD2c6185b44281Ec28C9Dc"
+
+def address_topic(address):
+    return "0x" + address[2:].lower().rjust(64, "0")
+
+def transfer_log(token_address, sender, recipient, amount):
+    return {"address": token_address, "topics": [HexBytes(TRANSFER_EVENT_TOPIC), HexBytes(address_topic(sender)), HexBytes(address_topic(recipient))], "data": HexBytes(encode(["uint256"], [amount]))}
+
+def trade_receipt(amount, amount_out):
+    return {"status": 1, "blockNumber": 10, "gasUsed": 0, "effectiveGasPrice": 0, "logs": [
+        transfer_log(WETH_address, bot_address, pair_address, amount),
+        transfer_log(USDC_address, pair_address, bot_address, 3000 * 10**6),
+        transfer_log(WETH_address, pair_address, bot_address, amount_out),
+    ]}
+
+class FakeArbBot:
+    bot_address = bot_address
+
+class FakeTradeLogger:
+    def __init__(self):
+        self.trades = []
+
+    def log_trade(self, tx_receipt, **trade):
+        self.trades.append(trade)
+
+class FakePendingTx:
+    def __init__(self, receipt):
+        self.receipt = receipt
+        self.finalized_at = 2.0
+
+def test_token_flow_from_transfer_logs():
+    receipt = trade_receipt(10**18, 11 * 10**17)
+    assert get_token_flow(receipt, WETH_address, bot_address) == 10**17
+    assert get_token_flow(receipt, USDC_address, bot_address) == 3000 * 10**6
+    assert get_token_flow(receipt, USDT_address, bot_address) == 0
+
+def test_trades_of_a_block_are_logged_with_their_own_pnl():
+    trade_logger = FakeTradeLogger()
+    trades = [{"trade_amount": 10**18, "token1_wei_price": 1, "token1_balance": 5 * 10**18, "price_diff": 0.01,
+               "time_opportunity_found": 0.0, "time_tx_init": 1.0, "token1": WETH_address, "token2": token2,
+               "router_1": "0xSushi", "router_2": "0xUniswap"} for token2 in (USDC_address, USDT_address)]
+    # both trades on WETH are mined in block 10, one at a profit and one at a loss
+    log_trade_on_receipt(FakeArbBot(), trade_logger, trades[0])(FakePendingTx(trade_receipt(10**18, 11 * 10**17)))
+    log_trade_on_receipt(FakeArbBot(), trade_logger, trades[1])(FakePendingTx(trade_receipt(10**18, 9 * 10**17)))
+    assert [trade["token1_balance_after"] - trade["token1_balance"] for trade in trade_logger.trades] == [10**17, -10**17]
+
+if __name__ == "__main__":
+    pytest.main()
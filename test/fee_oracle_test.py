@@ -0,0 +1,52 @@
+import pytest
+from utilities.fee_oracle import FeeOracle
+
+class FakeEth:
+    def __init__(self):
+        self.fee_history_calls = 0
+
+    def fee_history(self, block_count, newest_block, reward_percentiles):
+        self.fee_history_calls += 1
+        return {
+            'oldestBlock': 91,
+            'baseFeePerGas': [10**10] * 10 + [2 * 10**10],
+            # tips of the blocks at the median, scaled up or down for higher or lower percentiles
+            'reward': [[tip * reward_percentiles[0] // 50] for tip in [3 * 10**9, 1 * 10**9, 2 * 10**9, 5 * 10**9, 4 * 10**9] * 2],
+        }
+
+class FakeWeb3:
+    def __init__(self):
+        self.eth = FakeEth()
+
+def test_update_predicts_fees():
+    fee_oracle = FeeOracle(FakeWeb3(), speed="fast")
+    fee_oracle.update(100)
+    assert fee_oracle.block_number == 100
+    assert fee_oracle.base_fee == 2 * 10**10
+    assert fee_oracle.max_priority_fee == 3 * 10**9 * 90 // 50
+    assert fee_oracle.max_fee == 2 * 10**10 * 1125 // 1000 + 3 * 10**9 * 90 // 50
+
+def test_headroom_grows_with_speed():
+    slow = FeeOracle(FakeWeb3(), speed="slow")
+    fast = FeeOracle(FakeWeb3(), speed="fast")
+    slow.update(100)
+    fast.update(100)
+    assert slow.max_priority_fee < fast.max_priority_fee
+    assert slow.max_fee - slow.max_priority_fee > fast.max_fee - fast.max_priority_fee
+
+def test_get_fees_reads_once_per_block():
+    web3 = FakeWeb3()
+    fee_oracle = FeeOracle(web3)
+    fee_oracle.update(100)
+    fee_oracle.update(100)
+    for _ in range(5):
+        fee_oracle.get_fees()
+    assert web3.eth.fee_history_calls == 1
+
+def test_min_priority_fee():
+    fee_oracle = FeeOracle(FakeWeb3(), speed="slow", min_priority_fee=2 * 10**9)
+    _, max_priority_fee = fee_oracle.get_fees()
+    assert max_priority_fee == 2 * 10**9
+
+if __name__ == "__main__":
+    pytest.main()
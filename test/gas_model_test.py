@@ -0,0 +1,54 @@
+from utilities.gas_model import (GasModel, DEFAULT_GAS_LIMIT, MAX_REFUND_QUOTIENT)
+
+route = ("0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D", "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F",
+         "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2", "0xdAC17F958D2ee523a2206206994597C13D831ec7")
+
+class FakePendingTx:
+    def __init__(self, receipt):
+        self.receipt = receipt
+
+def test_gas_limit_from_gas_used():
+    gas_model = GasModel(window=2, headroom=1.1)
+    for gas_used in (200000, 180000, 190000):
+        gas_model.record(route, {"status": 1, "gasUsed": gas_used})
+    gas_model.record(route, {"status": 0, "gasUsed": 50000}) # reverted trades are skipped
+    assert gas_model.get_stats(route) == {"count": 2, "mean": 185000, "max": 190000}
+    assert gas_model.get_gas_limit(route, estimate=lambda: 1 / 0) == int(190000 * MAX_REFUND_QUOTIENT / (MAX_REFUND_QUOTIENT - 1) * 1.1)
+
+def test_gas_limit_covers_refunded_gas():
+    gas_model = GasModel(headroom=1.0)
+    # the trade spends 240000 gas, of which the largest refund of a fifth is given back after execution
+    gas_model.record(route, {"status": 1, "gasUsed": 240000 - 240000 // 5})
+    assert gas_model.get_gas_limit(route) >= 240000
+
+def test_gas_limit_is_not_below_the_estimate():
+    gas_model = GasModel(headroom=1.0, estimate_headroom=1.0)
+    assert gas_model.get_gas_limit(route, lambda: 300000) == 300000
+    gas_model.record(route, {"status": 1, "gasUsed": 200000})
+    assert gas_model.get_gas_limit(route) == 300000
+
+def test_unseen_route_estimate_is_cached():
+    gas_model = GasModel(estimate_headroom=1.3)
+    estimates = []
+    def estimate():
+        estimates.append(1)
+        return 250000
+    assert gas_model.get_gas_limit(route, estimate) == int(250000 * 1.3)
+    assert gas_model.get_gas_limit(route, estimate) == int(250000 * 1.3)
+    assert len(estimates) == 1
+
+def test_failed_estimate_falls_back_to_default():
+    gas_model = GasModel(estimate_headroom=1.3)
+    def estimate():
+        raise ValueError("execution reverted")
+    assert gas_model.get_gas_limit(route, estimate) == DEFAULT_GAS_LIMIT
+    assert gas_model.get_gas_limit(route) == DEFAULT_GAS_LIMIT
+    assert gas_model.get_gas_limit(route, lambda: 250000) == int(250000 * 1.3) # the failed estimate isn't cached
+
+def test_track_records_before_callback():
+    gas_model = GasModel(headroom=1.0)
+    seen = []
+    callback = gas_model.track(route, lambda pending_tx: seen.append(gas_model.get_gas_limit(route)))
+    callback(FakePendingTx({"status": 1, "gasUsed": 210000}))
+    callback(FakePendingTx(None)) # dropped trades are skipped
+    assert seen == [262500, 262500] # 210000 gas used and up to a fifth of the gas spent refunded
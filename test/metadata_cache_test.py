@@ -0,0 +1,62 @@
+import json
+from utilities.metadata_cache import MetadataCache
+
+token_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+
+class FakeProvider:
+    def __init__(self, endpoint_uri):
+        self.endpoint_uri = endpoint_uri
+
+class FakeEth:
+    def __init__(self, chain_id, calls):
+        self.calls = calls
+        self._chain_id = chain_id
+
+    @property
+    def chain_id(self):
+        self.calls.append("chain_id")
+        return self._chain_id
+
+class FakeWeb3:
+    def __init__(self, endpoint_uri, chain_id):
+        self.calls = []
+        self.provider = FakeProvider(endpoint_uri)
+        self.eth = FakeEth(chain_id, self.calls)
+
+class FakeFunction:
+    def __init__(self, w3, address, fn_name, value):
+        self.w3 = w3
+        self.address = address
+        self.fn_name = fn_name
+        self.value = value
+
+    def call(self):
+        self.w3.calls.append(self.fn_name)
+        return self.value
+
+def test_reads_once():
+    web3 = FakeWeb3("http://127.0.0.1:8545", 31337)
+    cache = MetadataCache()
+    assert cache.call(FakeFunction(web3, token_address, "decimals", 6)) == 6
+    assert cache.call(FakeFunction(web3, token_address, "decimals", 6)) == 6
+    assert cache.call(FakeFunction(web3, token_address, "symbol", "USDC")) == "USDC"
+    assert web3.calls == ["chain_id", "decimals", "symbol"]
+
+def test_keyed_by_chain():
+    cache = MetadataCache()
+    fork = FakeWeb3("http://127.0.0.1:8545", 31337)
+    mainnet = FakeWeb3("http://127.0.0.1:18545", 1)
+    assert cache.call(FakeFunction(fork, token_address, "symbol", "USDC")) == "USDC"
+    assert cache.call(FakeFunction(mainnet, token_address, "symbol", "USDC.e")) == "USDC.e"
+    assert mainnet.calls == ["chain_id", "symbol"]
+
+def test_warm_from_file(tmp_path):
+    path = str(tmp_path / "metadata_cache.json")
+    cold = FakeWeb3("http://127.0.0.1:8545", 31337)
+    MetadataCache(path).call(FakeFunction(cold, token_address, "decimals", 6))
+    with open(path, "r") as cache_file:
+        assert json.load(cache_file) == {f"31337:{token_address}:decimals": 6}
+
+    warm = FakeWeb3("http://127.0.0.1:8545", 31337)
+    assert MetadataCache(path).call(FakeFunction(warm, token_address, "decimals", 6)) == 6
+    assert warm.calls == ["chain_id"]
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+from http.server import (ThreadingHTTPServer, BaseHTTPRequestHandler)
+import pytest
+from web3 import Web3
+from utilities.multi_endpoint_provider import (MultiEndpointProvider, is_block_pinned)
+
+class FakeNode(BaseHTTPRequestHandler):
+    """
+    Answers eth_blockNumber with the number of the node after its delay, or fails with a 500 if the node is down.
+    """
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.methods.append(request["method"])
+        time.sleep(self.server.delay)
+        if self.server.down:
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        response = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": hex(self.server.number)}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def nodes():
+    servers = []
+    for number in range(3):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeNode)
+        server.number, server.delay, server.down, server.methods = number, 0, False, []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    yield servers
+    for server in servers:
+        server.shutdown()
+
+def create_provider(nodes, **kwargs):
+    providers = [Web3.HTTPProvider(f"http://127.0.0.1:{node.server_port}", request_kwargs={'timeout': 5}) for node in nodes]
+    return MultiEndpointProvider(providers, **kwargs)
+
+def test_routes_to_fastest_node(nodes):
+    nodes[0].delay = 0.3
+    provider = create_provider(nodes, hedge_after=0.05)
+    assert int(provider.make_request("eth_call", [{}, "0x10"])["result"], 16) == 1 # hedged to node 1
+    deadline = time.time() + 1 # node 0 answers the first request late
+    while provider.endpoints[0].latency is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert int(provider.make_request("eth_call", [{}, "0x10"])["result"], 16) == 1
+    assert provider.endpoint_uri == f"http://127.0.0.1:{nodes[1].server_port}"
+
+def test_unmeasured_nodes_keep_their_order(nodes):
+    provider = create_provider(nodes, hedge_after=1)
+    provider.endpoints[0].latency = 0.5
+    assert provider.get_ranked_endpoints() == provider.endpoints # the primary is ranked ahead of unmeasured fallbacks
+    provider.endpoints[2].latency = 0.1
+    assert provider.get_ranked_endpoints() == [provider.endpoints[2], provider.endpoints[0], provider.endpoints[1]]
+
+def test_hedges_stalled_read(nodes):
+    nodes[0].delay = 2
+    provider = create_provider(nodes, hedge_after=0.1)
+    start = time.time()
+    assert int(provider.make_request("eth_call", [{}, "0x10"])["result"], 16) == 1
+    assert time.time() - start < 1 # bounded by the hedging threshold, not by the stalled node
+
+def test_unpinned_reads_are_not_hedged(nodes):
+    nodes[0].delay = 0.3
+    provider = create_provider(nodes, hedge_after=0.05)
+    assert int(provider.make_request("eth_blockNumber", [])["result"], 16) == 0 # a lagging node can't answer first
+    provider.make_request("eth_getLogs", [{}])
+    provider.make_request("eth_getTransactionCount", ["0x00", "pending"])
+    provider.make_request("eth_getTransactionReceipt", ["0x00"])
+    provider.make_request("eth_call", [{}, "latest"])
+    assert nodes[1].methods == []
+
+def test_is_block_pinned():
+    assert is_block_pinned("eth_call", [{}, "0x10"])
+    assert is_block_pinned("eth_call", [{}, {"blockHash": "0x" + "00" * 32}])
+    assert is_block_pinned("eth_chainId", [])
+    assert not is_block_pinned("eth_call", [{}, "latest"])
+    assert not is_block_pinned("eth_call", [{}])
+    assert not is_block_pinned("eth_getTransactionCount", ["0x00", "pending"])
+    assert not is_block_pinned("eth_getTransactionReceipt", ["0x00"])
+    assert not is_block_pinned("eth_sendRawTransaction", ["0x00"])
+
+def test_transactions_are_not_hedged(nodes):
+    nodes[0].delay = 0.3
+    provider = create_provider(nodes, hedge_after=0.05)
+    provider.make_request("eth_sendRawTransaction", ["0x00"])
+    assert nodes[0].methods == ["eth_sendRawTransaction"]
+    assert nodes[1].methods == []
+
+def test_circuit_breaks_failing_node(nodes):
+    nodes[0].down = True
+    provider = create_provider(nodes, hedge_after=1, failure_threshold=2, cooldown=60)
+    provider.endpoints[0].latency = 0.5
+    provider.endpoints[1].latency = provider.endpoints[2].latency = 1 # node 0 is preferred until it fails
+    for _ in range(4):
+        assert int(provider.make_request("eth_blockNumber", [])["result"], 16) != 0 # failed over
+    assert len(nodes[0].methods) == 2
+    assert provider.endpoints[0].open_until > time.time()
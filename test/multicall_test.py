@@ -0,0 +1,45 @@
+import pytest
+from web3 import Web3
+from web3.providers.base import BaseProvider
+from utilities.multicall import (MULTICALL3_ADDRESS, MULTICALL_BYTECODE, get_multicall)
+
+deployer_key = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+multicall_address = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+
+class FakeNode(BaseProvider):
+    """
+    Answers the requests of a deployment on a chain without Multicall3, and mines every transaction sent at once.
+    """
+    def __init__(self):
+        self.sent = []
+
+    def make_request(self, method, params):
+        if method == "eth_chainId":
+            result = hex(31337)
+        elif method == "eth_getCode":
+            result = "0x"
+        elif method == "eth_getTransactionCount":
+            result = hex(0)
+        elif method == "eth_sendRawTransaction":
+            self.sent.append(params[0])
+            result = Web3.to_hex(Web3.keccak(hexstr=params[0]))
+        elif method == "eth_getTransactionReceipt":
+            result = {"transactionHash": params[0], "blockNumber": hex(1), "status": hex(1), "gasUsed": hex(400000),
+                      "contractAddress": multicall_address, "logs": []}
+        else:
+            raise ValueError(f"unexpected request {method}")
+        return {"jsonrpc": "2.0", "id": 1, "result": result}
+
+def test_deploys_embedded_multicall_without_multicall3():
+    node = FakeNode()
+    multicall = get_multicall(Web3(node), deployer_key)
+    assert multicall.address == multicall_address
+    assert len(node.sent) == 1
+    assert MULTICALL_BYTECODE[2:] in node.sent[0] # the creation code is sent without any compiled artifact
+
+def test_requires_deployer_without_multicall3():
+    with pytest.raises(Exception, match=MULTICALL3_ADDRESS):
+        get_multicall(Web3(FakeNode()))
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,91 @@
+import threading
+import pytest
+from eth_account import Account
+from web3 import Web3
+from utilities.nonce_manager import (NonceManager, get_nonce_manager, is_nonce_error, is_already_known)
+from utilities.trading_utilities import send_tx
+
+sender_address = "0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266"
+
+class FakeEth:
+    def __init__(self, transaction_count):
+        self.transaction_count = transaction_count
+        self.count_calls = 0
+
+    def get_transaction_count(self, address, block_identifier='latest'):
+        self.count_calls += 1
+        return self.transaction_count
+
+class FakeWeb3:
+    def __init__(self, transaction_count):
+        self.eth = FakeEth(transaction_count)
+
+class FakeSendEth(FakeEth):
+    """
+    Rejects every transaction sent with an error, e.g. "already known" from a node that accepted it on an earlier send.
+    """
+    account = Account
+
+    def __init__(self, transaction_count, error):
+        super().__init__(transaction_count)
+        self.error = error
+        self.sent = []
+
+    def send_raw_transaction(self, raw_tx):
+        self.sent.append(raw_tx)
+        raise ValueError(self.error)
+
+def test_allocate_reads_chain_once():
+    web3 = FakeWeb3(5)
+    nonce_manager = NonceManager(web3, sender_address)
+    assert [nonce_manager.allocate() for _ in range(3)] == [5, 6, 7]
+    assert web3.eth.count_calls == 1
+
+def test_allocate_is_thread_safe():
+    nonce_manager = NonceManager(FakeWeb3(0), sender_address)
+    nonces = []
+    def allocate_many():
+        for _ in range(100):
+            nonces.append(nonce_manager.allocate())
+    threads = [threading.Thread(target=allocate_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(nonces) == list(range(800))
+
+def test_resync():
+    web3 = FakeWeb3(5)
+    nonce_manager = NonceManager(web3, sender_address)
+    nonce_manager.allocate()
+    nonce_manager.allocate()
+    web3.eth.transaction_count = 6 # the transaction with nonce 6 was dropped
+    assert nonce_manager.resync() == 6
+    assert nonce_manager.allocate() == 6
+
+def test_get_nonce_manager_is_shared():
+    web3 = FakeWeb3(0)
+    assert get_nonce_manager(web3, sender_address) is get_nonce_manager(web3, sender_address)
+
+def test_is_nonce_error():
+    assert is_nonce_error(ValueError({'code': -32000, 'message': 'Nonce too low. Expected nonce to be 7 but got 5.'}))
+    assert is_nonce_error(ValueError("invalid nonce"))
+    assert not is_nonce_error(ValueError("already known")) # the transaction is in flight, re-signing it would send the trade twice
+    assert not is_nonce_error(ValueError("replacement transaction underpriced"))
+    assert not is_nonce_error(ValueError("execution reverted"))
+
+def test_is_already_known():
+    assert is_already_known(ValueError({'code': -32000, 'message': 'already known'}))
+    assert not is_already_known(ValueError("nonce too low"))
+
+def test_send_tx_already_known_is_not_resigned():
+    private_key = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+    web3 = FakeWeb3(0)
+    web3.eth = FakeSendEth(0, {'code': -32000, 'message': 'already known'})
+    tx = {'to': sender_address, 'value': 0, 'gas': 21000, 'maxFeePerGas': 10**9, 'maxPriorityFeePerGas': 10**9, 'nonce': 0, 'chainId': 31337}
+    tx_hash = send_tx(web3, tx, private_key)
+    assert len(web3.eth.sent) == 1
+    assert tx_hash == Web3.keccak(web3.eth.sent[0])
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,81 @@
+import pytest
+from utilities.pair_registry import (
+    INIT_CODE_HASHES,
+    sort_tokens,
+    compute_pair_address,
+    PairRegistry,
+    )
+
+uniswap_v2_factory_address = "0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f"
+sushiswap_v2_factory_address = "0xC0AEe478e3658e2610c5F7A4A2E1777cE9e4f2Ac"
+pancakeswap_v2_factory_address = "0x1097053Fd2ea711dad45caCcc45EfF7548fCB362"
+
+WETH_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+USDC_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+USDT_address = "0xdAC17F958D2ee523a2206206994597C13D831ec7"
+
+class FakeProvider:
+    endpoint_uri = "http://pair-registry-test:8545"
+
+class FakeEth:
+    chain_id = 31337
+
+    def contract(self, address, abi):
+        return address
+
+class FakeWeb3:
+    provider = FakeProvider()
+    eth = FakeEth()
+
+class FakeCall:
+    def __init__(self, address, fn_name, value, counter):
+        self.w3 = FakeWeb3()
+        self.address = address
+        self.fn_name = fn_name
+        self.value = value
+        self.counter = counter
+
+    def call(self):
+        self.counter.append(self.value)
+        return self.value
+
+class FakeFunctions:
+    def __init__(self, address, factory_address, counter):
+        self.address = address
+        self.factory_address = factory_address
+        self.counter = counter
+
+    def factory(self):
+        return FakeCall(self.address, "factory", self.factory_address, self.counter)
+
+class FakeRouter:
+    def __init__(self, address, factory_address):
+        self.address = address
+        self.calls = []
+        self.functions = FakeFunctions(address, factory_address, self.calls)
+
+def test_sort_tokens():
+    assert sort_tokens(WETH_address, USDC_address) == (USDC_address, WETH_address)
+    assert sort_tokens(USDC_address, WETH_address) == (USDC_address, WETH_address)
+
+def test_compute_pair_address():
+    uniswap_hash = INIT_CODE_HASHES[uniswap_v2_factory_address]
+    assert compute_pair_address(uniswap_v2_factory_address, WETH_address, USDC_address, uniswap_hash) == "0xB4e16d0168e52d35CaCD2c6185b44281Ec28C9Dc"
+    assert compute_pair_address(uniswap_v2_factory_address, USDT_address, WETH_address, uniswap_hash) == "0x0d4a11d5EEaaC28EC3F61d100daF4d40471f1852"
+    sushiswap_hash = INIT_CODE_HASHES[sushiswap_v2_factory_address]
+    assert compute_pair_address(sushiswap_v2_factory_address, WETH_address, USDC_address, sushiswap_hash) == "0x397FF1542f962076d0BFE58eA045FfA2d347ACa0"
+    pancakeswap_hash = INIT_CODE_HASHES[pancakeswap_v2_factory_address]
+    assert compute_pair_address(pancakeswap_v2_factory_address, WETH_address, USDT_address, pancakeswap_hash) == "0x17C1Ae82D99379240059940093762c5e4539aba5"
+
+def test_registry_resolves_factory_once():
+    router = FakeRouter("0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D", uniswap_v2_factory_address)
+    registry = PairRegistry(FakeWeb3(), factory_abi=[])
+    assert registry.get_pair_contract(router, WETH_address, USDC_address) == "0xB4e16d0168e52d35CaCD2c6185b44281Ec28C9Dc"
+    assert registry.get_pair_contract(router, USDC_address, WETH_address) == "0xB4e16d0168e52d35CaCD2c6185b44281Ec28C9Dc"
+    assert len(router.calls) == 1
+    # the factory is read through the metadata cache of the process, so another registry doesn't read it again
+    assert PairRegistry(FakeWeb3(), factory_abi=[]).get_factory_address(router) == uniswap_v2_factory_address
+    assert len(router.calls) == 1
+
+if __name__ == "__main__":
+    pytest.main()
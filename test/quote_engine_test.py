@@ -0,0 +1,74 @@
+import pytest
+from web3.exceptions import ContractLogicError
+from utilities.reserve_snapshot import ReserveSnapshot
+from utilities.quote_engine import (
+    get_amount_out,
+    QuoteEngine,
+    )
+
+WETH_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+USDC_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+
+class FakeRouter:
+    def __init__(self, address):
+        self.address = address
+
+class FakePairRegistry:
+    def get_pair_address(self, router, tokenA_address, tokenB_address):
+        return "pair-" + router.address
+
+class FakeArbBot:
+    """
+    Estimates round trips on-chain the way the routers do, reverting on a zero input.
+    """
+    def __init__(self, estimate):
+        self.estimate = estimate
+        self.calls = []
+
+    def estimate_return(self, router1, router2, token1, token2, amount, block_identifier='latest'):
+        self.calls.append(amount)
+        if amount == 0:
+            raise ContractLogicError("execution reverted: UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT")
+        return self.estimate
+
+uniswap_v2 = FakeRouter("0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D")
+pancake_v2 = FakeRouter("0xEfF92A263d31888d860bD50809A8D171709b7b1c")
+
+# USDC (token0) / WETH (token1) reserves on each router
+snapshot = ReserveSnapshot(1, {
+    "pair-" + uniswap_v2.address: (30_000_000 * 10**6, 10_000 * 10**18, 0),
+    "pair-" + pancake_v2.address: (3_300_000 * 10**6, 1_000 * 10**18, 0),
+    })
+
+def test_get_amount_out():
+    assert get_amount_out(10**18, 10**21, 3 * 10**9) == (10**18 * 997 * 3 * 10**9) // (10**21 * 1000 + 10**18 * 997)
+    assert get_amount_out(1000, 10**6, 10**6, 9975, 10000) == (1000 * 9975 * 10**6) // (10**6 * 10000 + 1000 * 9975)
+    assert get_amount_out(0, 10**6, 10**6) == 0
+    assert get_amount_out(1000, 0, 10**6) == 0
+
+def test_quote_orients_reserves():
+    engine = QuoteEngine(FakePairRegistry(), snapshot)
+    assert engine.quote(uniswap_v2, WETH_address, USDC_address, 10**18) == get_amount_out(10**18, 10_000 * 10**18, 30_000_000 * 10**6)
+    assert engine.quote(uniswap_v2, USDC_address, WETH_address, 10**6) == get_amount_out(10**6, 30_000_000 * 10**6, 10_000 * 10**18)
+
+def test_quote_round_trip_uses_router_fees():
+    engine = QuoteEngine(FakePairRegistry(), snapshot)
+    amount_out1 = get_amount_out(10**18, 10_000 * 10**18, 30_000_000 * 10**6, 997, 1000)
+    amount_out2 = get_amount_out(amount_out1, 3_300_000 * 10**6, 1_000 * 10**18, 9975, 10000)
+    assert engine.quote_round_trip(uniswap_v2, pancake_v2, WETH_address, USDC_address, 10**18) == amount_out2
+
+def test_verify_skips_zero_amount():
+    arb_bot = FakeArbBot(0)
+    engine = QuoteEngine(FakePairRegistry(), snapshot, arb_bot=arb_bot, verify=True)
+    assert engine.quote_round_trip(uniswap_v2, pancake_v2, WETH_address, USDC_address, 0) == 0
+    assert arb_bot.calls == []
+
+def test_verify_reports_revert_as_mismatch():
+    engine = QuoteEngine(FakePairRegistry(), snapshot, arb_bot=FakeArbBot(0), verify=True)
+    assert not engine.verify_round_trip(uniswap_v2, pancake_v2, WETH_address, USDC_address, 0, 0)
+    quoted_return = engine.quote_round_trip(uniswap_v2, pancake_v2, WETH_address, USDC_address, 10**18)
+    engine.arb_bot = FakeArbBot(quoted_return)
+    assert engine.verify_round_trip(uniswap_v2, pancake_v2, WETH_address, USDC_address, 10**18, quoted_return)
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,74 @@
+import pytest
+from web3.exceptions import TransactionNotFound
+from utilities.receipt_tracker import ReceiptTracker
+from utilities.nonce_manager import get_nonce_manager
+
+class FakeEth:
+    def __init__(self):
+        self.block_number = 1
+        self.receipts = {}
+        self.receipt_calls = 0
+        self.transaction_count = 0
+
+    def get_transaction_count(self, address, block_identifier='latest'):
+        return self.transaction_count
+
+    def get_transaction_receipt(self, tx_hash):
+        self.receipt_calls += 1
+        if tx_hash not in self.receipts:
+            raise TransactionNotFound(f"Transaction {tx_hash} not found")
+        return self.receipts[tx_hash]
+
+class FakeWeb3:
+    def __init__(self):
+        self.eth = FakeEth()
+
+def test_poll_completes_mined_transactions():
+    web3 = FakeWeb3()
+    tracker = ReceiptTracker(web3)
+    completed = []
+    pending_tx = tracker.track("0x01", completed.append)
+    assert tracker.poll() == []
+    assert pending_tx.receipt is None
+
+    # receipts are only polled again once a new block is produced
+    web3.eth.receipts["0x01"] = {"status": 1, "blockNumber": 2}
+    assert tracker.poll() == []
+    web3.eth.block_number = 2
+    assert tracker.poll() == [pending_tx]
+    assert completed == [pending_tx]
+    assert pending_tx.wait(0) == {"status": 1, "blockNumber": 2}
+    assert tracker.pending == {}
+    assert web3.eth.receipt_calls == 2
+
+def test_poll_drops_stale_transactions():
+    web3 = FakeWeb3()
+    tracker = ReceiptTracker(web3, timeout=0)
+    pending_tx = tracker.track("0x02")
+    assert tracker.poll() == [pending_tx]
+    assert pending_tx.dropped
+    assert pending_tx.wait(0) is None
+
+def test_dropped_transaction_resyncs_sender_nonces():
+    web3 = FakeWeb3()
+    sender_address = "0x70997970C51812dc3A010C7d01b50e0d17dc79C8"
+    nonce_manager = get_nonce_manager(web3, sender_address)
+    assert [nonce_manager.allocate() for _ in range(3)] == [0, 1, 2]
+    web3.eth.transaction_count = 1 # the transaction with nonce 1 was dropped
+    tracker = ReceiptTracker(web3, timeout=0)
+    tracker.track("0x04", sender=sender_address)
+    assert tracker.poll()[0].dropped
+    assert nonce_manager.allocate() == 1
+
+def test_background_thread_fires_callbacks():
+    web3 = FakeWeb3()
+    tracker = ReceiptTracker(web3, poll_interval=0.01).start()
+    web3.eth.receipts["0x03"] = {"status": 1, "blockNumber": 1}
+    completed = []
+    pending_tx = tracker.track("0x03", completed.append)
+    assert pending_tx.wait(1) == {"status": 1, "blockNumber": 1}
+    tracker.stop()
+    assert completed == [pending_tx]
+
+if __name__ == "__main__":
+    pytest.main()
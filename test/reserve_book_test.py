@@ -0,0 +1,110 @@
+import pytest
+from eth_abi import encode
+from utilities.reserve_snapshot import ReserveSnapshot
+from utilities.reserve_book import (
+    SYNC_EVENT_TOPIC,
+    ReserveBook,
+    )
+
+pair_address_1 = "0xB4e16d0168e52d35CaCD2c6185b44281Ec28C9Dc"
+pair_address_2 = "0x0d4a11d5EEaaC28EC3F61d100daF4d40471f1852"
+
+class FakeEth:
+    def __init__(self, block_number, logs):
+        self.block_number = block_number
+        self.logs = logs
+        self.filters = []
+        self.reserves = {}
+        self.calls = []
+
+    def get_logs(self, filter_params):
+        self.filters.append(filter_params)
+        return self.logs
+
+    def call(self, transaction, block_identifier):
+        self.calls.append((transaction['to'], block_identifier))
+        return encode(['uint112', 'uint112', 'uint32'], self.reserves[transaction['to']])
+
+class FakeWeb3:
+    def __init__(self, block_number, logs):
+        self.eth = FakeEth(block_number, logs)
+
+def sync_log(pair_address, reserve0, reserve1, block_number=101):
+    return {'address': pair_address, 'data': encode(['uint112', 'uint112'], [reserve0, reserve1]), 'blockNumber': block_number}
+
+def create_book(web3):
+    snapshot = ReserveSnapshot(100, {pair_address_1: (10, 20, 1), pair_address_2: (30, 40, 1)})
+    return ReserveBook(web3, snapshot, [pair_address_1, pair_address_2])
+
+def test_update_applies_sync_logs():
+    web3 = FakeWeb3(102, [sync_log(pair_address_1, 11, 19), sync_log(pair_address_1, 12, 18)])
+    book = create_book(web3)
+    notified = []
+    book.subscribe(lambda pairs, block_number: notified.append((pairs, block_number)))
+
+    assert book.update() == {pair_address_1}
+    assert web3.eth.filters[0]['fromBlock'] == 101
+    assert web3.eth.filters[0]['toBlock'] == 102
+    assert web3.eth.filters[0]['topics'] == [SYNC_EVENT_TOPIC]
+    assert book.get_reserves(pair_address_1) == (12, 18, 1)
+    assert book.get_reserves(pair_address_2) == (30, 40, 1)
+    assert notified == [({pair_address_1}, 102)]
+
+def test_update_skips_seen_blocks():
+    web3 = FakeWeb3(100, [])
+    book = create_book(web3)
+    assert book.update() == set()
+    assert web3.eth.filters == []
+
+class FakeSubscriber:
+    def __init__(self, sync_logs, resync, removed_logs=()):
+        self.sync_logs = sync_logs
+        self.resync = resync
+        self.removed_logs = list(removed_logs)
+
+    def drain(self):
+        return self.sync_logs, [], self.resync, self.removed_logs
+
+def test_apply_subscription():
+    web3 = FakeWeb3(101, [sync_log(pair_address_2, 31, 39)])
+    book = create_book(web3)
+    assert book.apply_subscription(FakeSubscriber([sync_log(pair_address_1, 11, 19)], False), 101) == {pair_address_1}
+    assert web3.eth.filters == []
+
+    # logs may have been missed, so they are read from the node instead
+    web3.eth.block_number = 102
+    assert book.apply_subscription(FakeSubscriber([], True), 102) == {pair_address_2}
+    assert web3.eth.filters[0]['fromBlock'] == 102
+    assert book.block_number == 102
+
+def test_resync_keeps_logs_of_later_blocks():
+    web3 = FakeWeb3(101, [sync_log(pair_address_2, 31, 39)])
+    book = create_book(web3)
+    # the log of block 102 arrived before the head of 102, and isn't read again by the resync up to 101
+    assert book.apply_subscription(FakeSubscriber([sync_log(pair_address_1, 11, 19, 102)], True), 101) == {pair_address_2}
+    assert book.get_reserves(pair_address_1) == (10, 20, 1)
+    assert book.apply_subscription(FakeSubscriber([], False), 102) == {pair_address_1}
+    assert book.get_reserves(pair_address_1) == (11, 19, 1)
+
+def test_reorg_rolls_back_orphaned_blocks():
+    web3 = FakeWeb3(101, [])
+    book = create_book(web3)
+    assert book.apply_subscription(FakeSubscriber([sync_log(pair_address_1, 11, 19)], False), 101) == {pair_address_1}
+
+    # block 101 was orphaned, and pair 1 is back at its reserves before it on the new chain
+    web3.eth.reserves[pair_address_1] = (10, 20, 1)
+    web3.eth.logs = [sync_log(pair_address_2, 31, 39, 102)]
+    removed_log = dict(sync_log(pair_address_1, 11, 19), removed=True)
+    assert book.apply_subscription(FakeSubscriber([sync_log(pair_address_1, 12, 18)], False, [removed_log]), 102) == {pair_address_1, pair_address_2}
+    assert web3.eth.calls == [(pair_address_1, 102)]
+    assert web3.eth.filters[0]['fromBlock'] == 101
+    assert book.get_reserves(pair_address_1) == (10, 20, 1)
+    assert book.block_number == 102
+
+    # logs of the reorged blocks may still be arriving, so the next block is read from the node as well
+    web3.eth.logs = []
+    book.apply_subscription(FakeSubscriber([], False), 103)
+    assert web3.eth.filters[1]['fromBlock'] == 103
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,41 @@
+import pytest
+from eth_abi import encode
+from utilities.reserve_snapshot import (
+    GET_RESERVES_SELECTOR,
+    take_reserve_snapshot,
+    )
+
+pair_address_1 = "0xB4e16d0168e52d35CaCD2c6185b44281Ec28C9Dc"
+pair_address_2 = "0x0d4a11d5EEaaC28EC3F61d100daF4d40471f1852"
+
+class FakeAggregate:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def call(self, block_identifier):
+        return_data = [encode(['uint112', 'uint112', 'uint32'], [i + 1, 2 * (i + 1), 1700000000]) for i in range(len(self.calls))]
+        return 20283224, return_data
+
+class FakeFunctions:
+    def __init__(self):
+        self.requests = []
+
+    def aggregate(self, calls):
+        self.requests.append(calls)
+        return FakeAggregate(calls)
+
+class FakeMulticall:
+    def __init__(self):
+        self.functions = FakeFunctions()
+
+def test_take_reserve_snapshot():
+    multicall = FakeMulticall()
+    snapshot = take_reserve_snapshot(multicall, [pair_address_1, pair_address_2])
+    assert len(multicall.functions.requests) == 1
+    assert multicall.functions.requests[0][0] == (pair_address_1, GET_RESERVES_SELECTOR)
+    assert snapshot.block_number == 20283224
+    assert snapshot.get_reserves(pair_address_1) == (1, 2, 1700000000)
+    assert snapshot.get_reserves(pair_address_2) == (2, 4, 1700000000)
+
+if __name__ == "__main__":
+    pytest.main()
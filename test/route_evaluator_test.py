@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+from utilities.reserve_snapshot import ReserveSnapshot
+from utilities.route_evaluator import RouteEvaluator
+
+WETH_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+USDC_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+USDT_address = "0xdAC17F958D2ee523a2206206994597C13D831ec7"
+uniswap_v2_address = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+sushiswap_v2_address = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+
+class FakeRouter:
+    def __init__(self, address):
+        self.address = address
+
+class FakePairRegistry:
+    def get_pair_address(self, router, tokenA_address, tokenB_address):
+        return "-".join([router.address] + sorted([tokenA_address, tokenB_address]))
+
+router_dict = {uniswap_v2_address: FakeRouter(uniswap_v2_address), sushiswap_v2_address: FakeRouter(sushiswap_v2_address)}
+routes = [
+    {"router1": sushiswap_v2_address, "router2": uniswap_v2_address, "token1": WETH_address, "token2": USDC_address},
+    {"router1": sushiswap_v2_address, "router2": uniswap_v2_address, "token1": WETH_address, "token2": USDT_address},
+    ]
+registry = FakePairRegistry()
+
+def pair(router_address, tokenA_address, tokenB_address):
+    return registry.get_pair_address(router_dict[router_address], tokenA_address, tokenB_address)
+
+# USDC and USDT are token0 of their pairs with WETH. WETH trades at 3300 USDC on Sushi and 3000 USDC elsewhere.
+snapshot = ReserveSnapshot(1, {
+    pair(sushiswap_v2_address, WETH_address, USDC_address): (3_300_000 * 10**6, 1_000 * 10**18, 0),
+    pair(uniswap_v2_address, WETH_address, USDC_address): (3_000_000 * 10**6, 1_000 * 10**18, 0),
+    pair(sushiswap_v2_address, WETH_address, USDT_address): (3_000_000 * 10**6, 1_000 * 10**18, 0),
+    pair(uniswap_v2_address, WETH_address, USDT_address): (3_000_000 * 10**6, 1_000 * 10**18, 0),
+    })
+
+def test_evaluate_masks_profitable_routes():
+    evaluator = RouteEvaluator(routes, router_dict, registry)
+    evaluator.load_reserves(snapshot)
+    candidates, spreads = evaluator.evaluate(0.05)
+    assert list(candidates) == [0]
+    assert spreads[0] == pytest.approx(0.1)
+    assert spreads[1] == pytest.approx(0)
+    candidates, _ = evaluator.evaluate(0.2)
+    assert list(candidates) == []
+
+def test_dirty_routes():
+    evaluator = RouteEvaluator(routes, router_dict, registry)
+    evaluator.load_reserves(snapshot)
+    dirty_routes = evaluator.get_dirty_routes([pair(uniswap_v2_address, WETH_address, USDT_address)])
+    assert list(dirty_routes) == [1]
+    candidates, spreads = evaluator.evaluate(0.05, dirty_routes)
+    assert list(candidates) == []
+    assert spreads[1] == pytest.approx(0)
+    assert np.isnan(spreads[0])
+    assert list(evaluator.get_dirty_routes([pair(sushiswap_v2_address, WETH_address, USDC_address)])) == [0]
+    assert list(evaluator.get_dirty_routes(["0x0"])) == []
+
+if __name__ == "__main__":
+    pytest.main()
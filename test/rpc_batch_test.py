@@ -0,0 +1,70 @@
+import json
+import threading
+from http.server import (HTTPServer, BaseHTTPRequestHandler)
+import pytest
+from eth_abi import encode
+from web3 import Web3
+from utilities.rpc_batch import RpcBatch
+
+token_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+owner_address = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+erc20_abi = [{"constant": True, "inputs": [{"name": "_owner", "type": "address"}], "name": "balanceOf",
+              "outputs": [{"name": "balance", "type": "uint256"}], "type": "function"}]
+
+class FakeNode(BaseHTTPRequestHandler):
+    """
+    Answers JSON-RPC batches in reverse order, and records every HTTP request it receives.
+    """
+    posts = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeNode.posts.append(body)
+        responses = []
+        for request in reversed(body):
+            if request["method"] == "eth_getBalance":
+                result = hex(10**18)
+            elif request["method"] == "eth_call":
+                result = "0x" + encode(["uint256"], [int(request["params"][1], 16)]).hex() # echoes the block number
+            else:
+                responses.append({"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": "method not found"}})
+                continue
+            responses.append({"jsonrpc": "2.0", "id": request["id"], "result": result})
+        response = json.dumps(responses).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def web3():
+    server = HTTPServer(("127.0.0.1", 0), FakeNode)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeNode.posts.clear()
+    yield Web3(Web3.HTTPProvider(f"http://127.0.0.1:{server.server_port}"))
+    server.shutdown()
+
+def test_batch_is_one_request(web3):
+    token = web3.eth.contract(address=token_address, abi=erc20_abi)
+    batch = RpcBatch(web3)
+    assert batch.add_balance(owner_address) == 0
+    assert batch.add_call(token.functions.balanceOf(owner_address), 123) == 1
+    assert batch.add_call(token.functions.balanceOf(owner_address), 456) == 2
+    assert batch.execute() == [10**18, 123, 456] # in the order added, though answered in reverse
+    assert len(FakeNode.posts) == 1
+    assert [request["method"] for request in FakeNode.posts[0]] == ["eth_getBalance", "eth_call", "eth_call"]
+
+def test_empty_batch_sends_nothing(web3):
+    assert RpcBatch(web3).execute() == []
+    assert FakeNode.posts == []
+
+def test_batch_error_raises(web3):
+    batch = RpcBatch(web3)
+    batch.add_balance(owner_address)
+    batch.add("eth_unknown", [])
+    with pytest.raises(ValueError):
+        batch.execute()
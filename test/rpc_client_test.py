@@ -0,0 +1,19 @@
+from web3._utils.request import cache_and_return_session
+from utilities.rpc_client import (get_web3, get_async_web3)
+
+node_url = "http://127.0.0.1:18545" # never connected to by these tests
+
+def test_web3_is_shared():
+    web3 = get_web3(node_url, pool_size=4, timeout=3)
+    assert get_web3(node_url, pool_size=32, timeout=30) is web3
+    assert web3.provider.get_request_kwargs()["timeout"] == 3
+
+def test_session_pool_is_bounded():
+    web3 = get_web3(node_url, pool_size=4, timeout=3)
+    adapter = cache_and_return_session(web3.provider.endpoint_uri).get_adapter(node_url)
+    assert adapter._pool_maxsize == 4
+    assert adapter._pool_block
+
+def test_async_web3_timeout():
+    async_web3 = get_async_web3(node_url, timeout=5)
+    assert async_web3.provider.get_request_kwargs()["timeout"].total == 5
@@ -0,0 +1,103 @@
+import pytest
+from utilities.reserve_snapshot import ReserveSnapshot
+from utilities.quote_engine import QuoteEngine
+from opportunity_analysis.sharded_scanner import (ShardedScanner, shard_routes, get_shard, execute_candidate)
+
+WETH_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+USDC_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+USDT_address = "0xdAC17F958D2ee523a2206206994597C13D831ec7"
+uniswap_v2_address = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+sushiswap_v2_address = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+
+class FakeRouter:
+    def __init__(self, address):
+        self.address = address
+
+class FakePairRegistry:
+    def get_pair_address(self, router, tokenA_address, tokenB_address):
+        return "-".join([router.address] + sorted([tokenA_address, tokenB_address]))
+
+router_dict = {uniswap_v2_address: FakeRouter(uniswap_v2_address), sushiswap_v2_address: FakeRouter(sushiswap_v2_address)}
+routes = [
+    {"router1": sushiswap_v2_address, "router2": uniswap_v2_address, "token1": WETH_address, "token2": USDC_address},
+    {"router1": uniswap_v2_address, "router2": sushiswap_v2_address, "token1": WETH_address, "token2": USDC_address},
+    {"router1": sushiswap_v2_address, "router2": uniswap_v2_address, "token1": WETH_address, "token2": USDT_address},
+    ]
+registry = FakePairRegistry()
+
+class FakeArbBot:
+    def __init__(self, trade_mode, balance):
+        self.trade_mode = trade_mode
+        self.balance = balance
+        self.submitted = []
+        self.balance_reads = 0
+
+    def get_balances(self, addresses):
+        if self.trade_mode == "flash":
+            raise AssertionError("flash trades don't read the balance")
+        self.balance_reads += 1
+        return {address: self.balance for address in addresses}
+
+    def get_optimal_trade_amount(self, quote_engine, router1, router2, token1, token2, balance=None, capped=True):
+        optimal_amount = 10 * 10**18
+        return min(optimal_amount, balance) if capped else optimal_amount
+
+    def submit_trade_in_mode(self, quote_engine, router1, router2, token1, token2, amount, receipt_tracker, callback=None):
+        self.submitted.append((router1.address, router2.address, amount))
+        return "pending"
+
+def pair(router_address, tokenA_address, tokenB_address):
+    return registry.get_pair_address(router_dict[router_address], tokenA_address, tokenB_address)
+
+# USDC < WETH < USDT by address. WETH trades at 3300 USDC on Sushi and 3000 USDC or USDT elsewhere.
+snapshot = ReserveSnapshot(1, {
+    pair(sushiswap_v2_address, WETH_address, USDC_address): (3_300_000 * 10**6, 1_000 * 10**18, 0),
+    pair(uniswap_v2_address, WETH_address, USDC_address): (3_000_000 * 10**6, 1_000 * 10**18, 0),
+    pair(sushiswap_v2_address, WETH_address, USDT_address): (1_000 * 10**18, 3_000_000 * 10**6, 0),
+    pair(uniswap_v2_address, WETH_address, USDT_address): (1_000 * 10**18, 3_000_000 * 10**6, 0),
+    })
+
+def test_shard_routes_keeps_pairs_together():
+    shards = shard_routes(routes, 4)
+    assert sum(len(shard) for shard in shards) == len(routes)
+    assert get_shard(routes[0], 4) == get_shard(routes[1], 4)
+    assert routes[1] in shards[get_shard(routes[0], 4)]
+
+def test_scanner_streams_candidates():
+    scanner = ShardedScanner(routes, router_dict, registry, 0.05, num_shards=2)
+    scanner.start()
+    try:
+        pending_shards = scanner.submit(snapshot, 1, snapshot.reserves.keys())
+        candidates = list(scanner.candidates(1, pending_shards))
+        assert sorted(candidate["router1"] for candidate in candidates) == sorted([sushiswap_v2_address, uniswap_v2_address])
+        assert all(candidate["token2"] == USDC_address for candidate in candidates)
+        assert candidates[0]["price_diff"] == pytest.approx(0.1)
+
+        # only the shards trading the changed pair are sent the block
+        pending_shards = scanner.submit(snapshot, 2, [pair(uniswap_v2_address, WETH_address, USDT_address)])
+        assert pending_shards == 1
+        assert list(scanner.candidates(2, pending_shards)) == []
+    finally:
+        scanner.stop()
+
+@pytest.mark.parametrize("trade_mode, expected_amount", [("router", 10**18), ("flash", 10 * 10**18)])
+def test_execute_candidate_sizes_flash_trades_past_balance(trade_mode, expected_amount):
+    arb_bot = FakeArbBot(trade_mode, 10**18)
+    candidate = dict(routes[0], price_diff=0.1)
+    assert execute_candidate(arb_bot, QuoteEngine(registry, snapshot), router_dict, candidate, None) == "pending"
+    # WETH is dearer on Sushi, so it's sold there first and bought back on Uniswap
+    assert arb_bot.submitted == [(sushiswap_v2_address, uniswap_v2_address, expected_amount)]
+
+def test_execute_candidate_caps_trades_at_uncommitted_balance():
+    arb_bot = FakeArbBot("router", 10**18)
+    candidate = dict(routes[0], price_diff=0.1)
+    balances, committed = {WETH_address: 3 * 10**18}, {}
+    for _ in range(3):
+        execute_candidate(arb_bot, QuoteEngine(registry, snapshot), router_dict, candidate, None, balances=balances, committed=committed)
+    # the first trade is capped at the 3 WETH balance, so later trades of the block have nothing left to trade
+    assert [amount for _, _, amount in arb_bot.submitted] == [3 * 10**18]
+    assert committed == {WETH_address: 3 * 10**18}
+    assert arb_bot.balance_reads == 0
+
+if __name__ == "__main__":
+    pytest.main()
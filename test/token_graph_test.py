@@ -0,0 +1,120 @@
+import pytest
+from utilities.reserve_snapshot import ReserveSnapshot
+from utilities.token_graph import TokenGraph
+from utilities.trade_sizing import get_optimal_path_amount_in
+from utilities.quote_engine import get_amount_out
+from utilities.pair_registry import sort_tokens
+
+WETH_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+USDC_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+USDT_address = "0xdAC17F958D2ee523a2206206994597C13D831ec7"
+uniswap_v2_address = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+sushiswap_v2_address = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+
+class FakeRouter:
+    def __init__(self, address):
+        self.address = address
+
+class FakePairRegistry:
+    def get_pair_address(self, router, tokenA_address, tokenB_address):
+        return "-".join([router.address] + sorted([tokenA_address, tokenB_address]))
+
+router_dict = {uniswap_v2_address: FakeRouter(uniswap_v2_address), sushiswap_v2_address: FakeRouter(sushiswap_v2_address)}
+routes = [
+    {"router1": sushiswap_v2_address, "router2": uniswap_v2_address, "token1": WETH_address, "token2": USDC_address},
+    {"router1": sushiswap_v2_address, "router2": uniswap_v2_address, "token1": WETH_address, "token2": USDT_address},
+    {"router1": sushiswap_v2_address, "router2": uniswap_v2_address, "token1": USDC_address, "token2": USDT_address},
+    ]
+registry = FakePairRegistry()
+
+def pair(router_address, tokenA_address, tokenB_address):
+    return registry.get_pair_address(router_dict[router_address], tokenA_address, tokenB_address)
+
+# USDC < WETH < USDT by address. WETH trades at 3000 USDC and 3000 USDT on both routers. Once USDT
+# trades at 1.1 USDC on Sushi, WETH -> USDT -> USDC (Sushi) -> WETH is a profitable triangle.
+balanced = {
+    pair(sushiswap_v2_address, WETH_address, USDC_address): (3_000_000 * 10**6, 1_000 * 10**18, 0),
+    pair(uniswap_v2_address, WETH_address, USDC_address): (3_000_000 * 10**6, 1_000 * 10**18, 0),
+    pair(sushiswap_v2_address, WETH_address, USDT_address): (1_000 * 10**18, 3_000_000 * 10**6, 0),
+    pair(uniswap_v2_address, WETH_address, USDT_address): (1_000 * 10**18, 3_000_000 * 10**6, 0),
+    pair(sushiswap_v2_address, USDC_address, USDT_address): (1_000_000 * 10**6, 1_000_000 * 10**6, 0),
+    pair(uniswap_v2_address, USDC_address, USDT_address): (1_000_000 * 10**6, 1_000_000 * 10**6, 0),
+    }
+
+def test_score_cycles_none_when_balanced():
+    graph = TokenGraph(routes, router_dict, registry)
+    graph.index_cycles([WETH_address])
+    graph.update_reserves(ReserveSnapshot(1, balanced))
+    assert graph.score_cycles() == []
+
+def test_score_cycles_finds_triangle():
+    graph = TokenGraph(routes, router_dict, registry)
+    graph.index_cycles([WETH_address])
+    graph.update_reserves(ReserveSnapshot(1, balanced))
+
+    skewed = dict(balanced)
+    usdc_usdt_on_sushi = pair(sushiswap_v2_address, USDC_address, USDT_address)
+    skewed[usdc_usdt_on_sushi] = (1_100_000 * 10**6, 1_000_000 * 10**6, 0)
+    graph.update_reserves(ReserveSnapshot(2, skewed), [usdc_usdt_on_sushi])
+
+    cycles = graph.score_cycles()
+    assert len(cycles) > 0
+    best = cycles[0]
+    assert best["path"][0] == best["path"][-1] == WETH_address
+    assert len(best["pairs"]) == 3
+    assert usdc_usdt_on_sushi in best["pairs"]
+    assert best["weight"] < 0
+
+    # The cycle is profitable at its optimal size with exact integer quotes
+    pools = []
+    for pair_address, token_in, token_out in zip(best["pairs"], best["path"], best["path"][1:]):
+        reserve0, reserve1, _ = skewed[pair_address]
+        pools.append((reserve0, reserve1, (997, 1000)) if sort_tokens(token_in, token_out)[0] == token_in else (reserve1, reserve0, (997, 1000)))
+    amount = get_optimal_path_amount_in(pools)
+    amount_out = amount
+    for reserve_in, reserve_out, (fee_numerator, fee_denominator) in pools:
+        amount_out = get_amount_out(amount_out, reserve_in, reserve_out, fee_numerator, fee_denominator)
+    assert amount > 0
+    assert amount_out > amount
+
+def test_score_cycles_behind_two_hop_round_trip():
+    # USDT -> USDC on Sushi and back on Uniswap is a more profitable two-hop round trip, which must not hide the triangles
+    graph = TokenGraph(routes, router_dict, registry)
+    graph.index_cycles([USDC_address])
+    skewed = dict(balanced)
+    usdc_usdt_on_sushi = pair(sushiswap_v2_address, USDC_address, USDT_address)
+    skewed[usdc_usdt_on_sushi] = (1_100_000 * 10**6, 1_000_000 * 10**6, 0)
+    graph.update_reserves(ReserveSnapshot(1, skewed))
+
+    cycles = graph.score_cycles()
+    assert len(cycles) > 0
+    assert all(cycle["path"][0] == cycle["path"][-1] == USDC_address and len(cycle["pairs"]) == 3 for cycle in cycles)
+    assert all(usdc_usdt_on_sushi in cycle["pairs"] for cycle in cycles)
+
+def test_max_length_limits_cycles():
+    graph = TokenGraph(routes, router_dict, registry, max_length=2)
+    skewed = dict(balanced)
+    skewed[pair(sushiswap_v2_address, USDC_address, USDT_address)] = (1_100_000 * 10**6, 1_000_000 * 10**6, 0)
+    assert graph.index_cycles([WETH_address]) == 0
+    graph.update_reserves(ReserveSnapshot(1, skewed))
+    assert graph.score_cycles() == []
+
+def test_score_cycles_only_through_dirty_pairs():
+    graph = TokenGraph(routes, router_dict, registry)
+    assert graph.index_cycles([WETH_address]) > 0
+    graph.update_reserves(ReserveSnapshot(1, balanced))
+    assert graph.score_cycles() == []
+
+    skewed = dict(balanced)
+    usdc_usdt_on_sushi = pair(sushiswap_v2_address, USDC_address, USDT_address)
+    skewed[usdc_usdt_on_sushi] = (1_100_000 * 10**6, 1_000_000 * 10**6, 0)
+    graph.update_reserves(ReserveSnapshot(2, skewed), [usdc_usdt_on_sushi])
+
+    cycles = graph.score_cycles([usdc_usdt_on_sushi])
+    assert len(cycles) > 0
+    assert all(usdc_usdt_on_sushi in cycle["pairs"] for cycle in cycles)
+    assert cycles[0]["weight"] == graph.score_cycles()[0]["weight"]
+    assert graph.score_cycles([pair(uniswap_v2_address, USDC_address, USDT_address)]) == []
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,28 @@
+import csv
+import pytest
+from utilities.trade_logger import (TradeLogger, TRADE_LOG_HEADER, ETH_PRICE_PER_WEI)
+
+def test_log_trade(tmp_path):
+    log_path = tmp_path / "trade_logs_bot.csv"
+    trade_logger = TradeLogger(log_path=log_path, bot_balances=1000)
+    receipt = {"status": 1, "gasUsed": 100000, "effectiveGasPrice": 10**10}
+    trade_profit = trade_logger.log_trade(
+        receipt, trade_amount=10**18, token1_wei_price=3e-15, token1_balance=10**18, token1_balance_after=11 * 10**17,
+        price_diff=0.1, time_opportunity_found=1.0, time_tx_init=1.5, time_tx_finalized=3.0,
+        token1="0xWETH", token2="0xUSDC", router_1="0xSushi", router_2="0xUniswap")
+
+    assert trade_profit == pytest.approx(10**17 * 3e-15 - 100000 * 10**10 * ETH_PRICE_PER_WEI)
+    assert trade_logger.trade_count == 1
+    assert trade_logger.success_count == 1
+    assert trade_logger.net_profit == pytest.approx(trade_profit)
+    assert trade_logger.total_trade_volume_usd == pytest.approx(3000)
+
+    with open(log_path, newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == TRADE_LOG_HEADER
+    assert len(rows) == 2
+    assert float(rows[1][TRADE_LOG_HEADER.index("analysis_latency(ms)")]) == pytest.approx(500)
+    assert float(rows[1][TRADE_LOG_HEADER.index("on_chain_execution_time(ms)")]) == pytest.approx(1500)
+
+if __name__ == "__main__":
+    pytest.main()
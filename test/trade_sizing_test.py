@@ -0,0 +1,24 @@
+import pytest
+from utilities.quote_engine import (get_amount_out)
+from utilities.trade_sizing import (get_optimal_amount_in)
+
+def round_trip_profit(amount_in, reserve_a_in, reserve_a_out, reserve_b_in, reserve_b_out):
+    amount_out1 = get_amount_out(amount_in, reserve_a_in, reserve_a_out)
+    return get_amount_out(amount_out1, reserve_b_in, reserve_b_out) - amount_in
+
+def test_optimal_amount_maximizes_profit():
+    # token1 sells for 3300 token2 in pool A and buys back for 3000 token2 in pool B
+    reserves = (1_000 * 10**18, 3_300_000 * 10**18, 3_000_000 * 10**18, 1_000 * 10**18)
+    optimal_amount = get_optimal_amount_in(*reserves)
+    best_profit = round_trip_profit(optimal_amount, *reserves)
+    assert best_profit > 0
+    for amount_in in (optimal_amount * 9 // 10, optimal_amount * 11 // 10, optimal_amount // 2, optimal_amount * 2):
+        assert round_trip_profit(amount_in, *reserves) <= best_profit
+
+def test_no_trade_without_spread():
+    reserves = (1_000 * 10**18, 3_000_000 * 10**18, 3_000_000 * 10**18, 1_000 * 10**18)
+    assert get_optimal_amount_in(*reserves) == 0
+    assert get_optimal_amount_in(0, 1, 1, 1) == 0
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,68 @@
+from eth_account import Account
+from web3 import Web3
+from utilities.nonce_manager import NonceManager
+from utilities.tx_templates import TradeTxTemplates
+
+private_key = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80" # hardhat account 0
+bot_address = "0x00B0517de6b2b09aBD3a7B69d66D85eFdb2c7d94"
+uniswap_router = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+sushi_router = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+weth = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+usdt = "0xdAC17F958D2ee523a2206206994597C13D831ec7"
+execute_trade_abi = [{
+    "inputs": [
+        {"internalType": "address", "name": "router1", "type": "address"},
+        {"internalType": "address", "name": "router2", "type": "address"},
+        {"internalType": "address", "name": "token1", "type": "address"},
+        {"internalType": "address", "name": "token2", "type": "address"},
+        {"internalType": "uint256", "name": "amount", "type": "uint256"}
+    ],
+    "name": "executeTrade",
+    "outputs": [],
+    "stateMutability": "nonpayable",
+    "type": "function"
+}]
+
+class FakeEth:
+    def __init__(self, transaction_count):
+        self.transaction_count = transaction_count
+
+    def get_transaction_count(self, address, block_identifier='latest'):
+        return self.transaction_count
+
+class FakeWeb3:
+    def __init__(self, transaction_count):
+        self.eth = FakeEth(transaction_count)
+
+def make_templates(transaction_count=7):
+    account = Account.from_key(private_key)
+    return TradeTxTemplates(account, 1, bot_address, NonceManager(FakeWeb3(transaction_count), account.address))
+
+def test_encode_matches_contract_abi():
+    templates = make_templates()
+    bot = Web3().eth.contract(address=bot_address, abi=execute_trade_abi)
+    for amount in (1, 10**18, 2**256 - 1):
+        expected = bot.encode_abi(fn_name="executeTrade", args=[uniswap_router, sushi_router, weth, usdt, amount])
+        assert Web3.to_hex(templates.encode(uniswap_router, sushi_router, weth, usdt, amount)) == expected
+    assert len(templates.prefixes) == 1
+
+def test_presigned_tx_is_taken_once():
+    templates = make_templates()
+    trade = (uniswap_router, sushi_router, weth, usdt, 10**18)
+    assert templates.presign([trade], 30 * 10**9, 10**9) == 1
+    raw_tx = templates.take(*trade, 30 * 10**9, 10**9)
+    expected = Account.sign_transaction(templates.build(*trade, 7, 30 * 10**9, 10**9), private_key).rawTransaction
+    assert raw_tx == expected
+    assert templates.nonce_manager.allocate() == 8 # nonce 7 was claimed by the pre-signed trade
+    assert templates.take(*trade, 30 * 10**9, 10**9) is None
+
+def test_presigned_tx_is_stale():
+    templates = make_templates()
+    trade = (uniswap_router, sushi_router, weth, usdt, 10**18)
+    templates.presign([trade], 30 * 10**9, 10**9)
+    assert templates.take(*trade, 40 * 10**9, 10**9) is None # fees moved
+    templates.presign([trade], 30 * 10**9, 10**9)
+    templates.nonce_manager.allocate() # another transaction took the nonce
+    assert templates.take(*trade, 30 * 10**9, 10**9) is None
+    templates.presign([trade], 30 * 10**9, 10**9)
+    assert templates.take(uniswap_router, sushi_router, weth, usdt, 10**17, 30 * 10**9, 10**9) is None # resized
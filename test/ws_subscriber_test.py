@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+import time
+import websockets
+from eth_abi import encode
+from utilities.reserve_book import SYNC_EVENT_TOPIC
+from utilities.ws_subscriber import (WsSubscriber, SWAP_EVENT_TOPIC)
+
+pair_address = "0xB4e16d0168e52d35CaCD2c6185b44281Ec28C9Dc"
+
+class FakeNode:
+    """
+    Serves eth_subscribe over a local WebSocket and pushes notifications to every subscription.
+    """
+    def __init__(self, early_head=None):
+        self.early_head = early_head
+        self.loop = asyncio.new_event_loop()
+        self.connections = []
+        self.subscriptions = []
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.ready.wait(5)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(websockets.serve(self.handle, "127.0.0.1", 0))
+        self.url = f"ws://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        self.ready.set()
+        self.loop.run_forever()
+
+    async def handle(self, websocket):
+        self.connections.append(websocket)
+        async for message in websocket:
+            request = json.loads(message)
+            if self.early_head is not None:
+                # a head of the first subscription arrives ahead of the reply to the next one
+                for subscribed_websocket, subscribed_id, kind in self.subscriptions:
+                    if subscribed_websocket is websocket and kind == "newHeads":
+                        await websocket.send(json.dumps({"jsonrpc": "2.0", "method": "eth_subscription", "params": {"subscription": subscribed_id, "result": self.early_head}}))
+            subscription_id = hex(len(self.subscriptions) + 1)
+            self.subscriptions.append((websocket, subscription_id, request["params"][0]))
+            await websocket.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": subscription_id}))
+
+    def push(self, kind, result):
+        async def send():
+            for websocket, subscription_id, subscribed_kind in self.subscriptions:
+                if subscribed_kind == kind and websocket in self.connections:
+                    await websocket.send(json.dumps({"jsonrpc": "2.0", "method": "eth_subscription", "params": {"subscription": subscription_id, "result": result}}))
+        asyncio.run_coroutine_threadsafe(send(), self.loop).result(5)
+
+    def drop_connections(self):
+        async def close():
+            connections, self.connections = self.connections, []
+            for websocket in connections:
+                await websocket.close()
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result(5)
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+def sync_log(block_number, reserve0, reserve1):
+    return {"address": pair_address, "topics": [SYNC_EVENT_TOPIC], "data": "0x" + encode(["uint112", "uint112"], [reserve0, reserve1]).hex(), "blockNumber": hex(block_number), "removed": False}
+
+def test_heads_and_logs_are_pushed():
+    node = FakeNode()
+    subscriber = WsSubscriber([pair_address], ws_url=node.url).start()
+    try:
+        wait_until(lambda: len(node.subscriptions) == 2)
+        subscriber.drain() # the first drain resyncs from the node
+        node.push("logs", sync_log(10, 100, 200))
+        node.push("logs", {"address": pair_address, "topics": [SWAP_EVENT_TOPIC], "data": "0x" + "00" * 128, "blockNumber": hex(10), "removed": False})
+        node.push("newHeads", {"number": hex(10)})
+        node.push("newHeads", {"number": hex(11)}) # heads are coalesced for a slow consumer
+        wait_until(lambda: subscriber.latest_head == 11)
+        assert subscriber.wait_for_head(time.time() + 1) == 11
+        assert subscriber.wait_for_head(time.time() + 0.1) is None
+        sync_logs, swap_logs, resync, _ = subscriber.drain()
+        assert [log["data"] for log in sync_logs] == [encode(["uint112", "uint112"], [100, 200])]
+        assert len(swap_logs) == 1
+        assert not resync
+    finally:
+        subscriber.stop()
+
+def test_reconnect_resubscribes_and_resyncs():
+    node = FakeNode()
+    subscriber = WsSubscriber([pair_address], ws_url=node.url, reconnect_delay=0.05).start()
+    try:
+        wait_until(lambda: len(node.subscriptions) == 2)
+        subscriber.drain()
+        node.drop_connections()
+        wait_until(lambda: len(node.subscriptions) == 4 and subscriber.connections == 2)
+        node.push("newHeads", {"number": hex(12)})
+        assert subscriber.wait_for_head(time.time() + 1) == 12
+        _, _, resync, _ = subscriber.drain()
+        assert resync # logs may have been missed while disconnected
+    finally:
+        subscriber.stop()
+
+def test_notifications_received_while_subscribing_are_replayed():
+    node = FakeNode(early_head={"number": hex(10)})
+    subscriber = WsSubscriber([pair_address], ws_url=node.url).start()
+    try:
+        wait_until(lambda: len(node.subscriptions) == 2)
+        assert subscriber.wait_for_head(time.time() + 1) == 10
+    finally:
+        subscriber.stop()
+
+def test_stop_cancels_the_reconnect_wait():
+    node = FakeNode()
+    subscriber = WsSubscriber([pair_address], ws_url=node.url, reconnect_delay=30, max_reconnect_delay=30).start()
+    wait_until(lambda: len(node.subscriptions) == 2)
+    node.drop_connections()
+    wait_until(lambda: subscriber.websocket is None)
+    started = time.time()
+    subscriber.stop()
+    assert time.time() - started < 5
+    assert not subscriber.thread.is_alive()
+
+def test_log_buffer_is_bounded():
+    subscriber = WsSubscriber([pair_address], max_pending_logs=2)
+    subscriber.drain()
+    for reserve0 in range(3):
+        subscriber.on_log(sync_log(10, reserve0, 200))
+    sync_logs, _, resync, _ = subscriber.drain()
+    assert len(sync_logs) == 2
+    assert resync
+
+def test_removed_logs_are_handed_over():
+    subscriber = WsSubscriber([pair_address])
+    subscriber.drain()
+    subscriber.on_log(sync_log(10, 100, 200))
+    subscriber.on_log(dict(sync_log(10, 100, 200), removed=True))
+    sync_logs, _, resync, removed_logs = subscriber.drain()
+    assert len(sync_logs) == 1
+    assert [log["blockNumber"] for log in removed_logs] == [10]
+    assert not resync
@@ -2,6 +2,7 @@ from utilities.arb_bot import ArbBot
 from utilities.trading_utilities import (get_account_balances)
 from trading_env_sims.sim_utilities import (setup_sim_account)
 from utilities.approve_lp import (fund_pool)
+from utilities.metadata_cache import (get_factory)
 import json
 """
 Set up regular trader account and whale trader account with liquidity, and use 
@@ -34,7 +35,7 @@ def LP_base_pairs_for_all_routers(routers, base_assets, arb_bot):
     for router in routers:
         router_address = router["address"]
         router_contract = arb_bot.web3.eth.contract(address=router_address, abi=router_abi)
-        factory_address = router_contract.functions.factory().call()
+        factory_address = get_factory(router_contract)
         factory_contract = arb_bot.web3.eth.contract(address=factory_address, abi=factory_abi)
         print("")
         print(f'LPing for {router["dex"]}')
@@ -1,5 +1,6 @@
 from scripts.arb_liquidity_setup import (swap_ETH_for_ERC20)
 from utilities.trading_utilities import (get_account_balances, to_wei, swap_ERC20_for_ERC20, get_estimated_return, approve_tokens, wrap_ETH_to_WETH, from_wei)
+from utilities.metadata_cache import (get_symbol)
 import json
 import time
 import random
@@ -75,7 +76,7 @@ def trading_sims_eth_for_erc20(
                     swap_receipt
                     ])
         except Exception:
-            print(f"Swap failed from ETH to {asset_contract.functions.symbol().call()}.")
+            print(f"Swap failed from ETH to {get_symbol(asset_contract)}.")
         
         time.sleep(interval)
  
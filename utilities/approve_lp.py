@@ -4,6 +4,8 @@ from utilities.populate_routes import (
 import time
 import json
 from utilities.trading_utilities import (to_wei, sign_and_send_tx, approve_tokens)
+from utilities.nonce_manager import (get_nonce_manager)
+from utilities.metadata_cache import (get_symbol, get_factory, get_WETH)
 
 '''
 approve_lp_iCAN.py
@@ -28,14 +30,14 @@ def create_pair(web3, factory_contract, tokenA, tokenB, private_key):
         receipt (receipt): receipt of the pair creation transaction.
     """
     tx = factory_contract.functions.createPair(tokenA.address, tokenB.address).build_transaction({
-        'nonce': web3.eth.get_transaction_count(web3.eth.account.from_key(private_key).address),
+        'nonce': get_nonce_manager(web3, web3.eth.account.from_key(private_key).address).allocate(),
         'gas': 3000000,
         'maxFeePerGas': web3.to_wei('100', 'gwei'),  # Adjust these values according to network conditions
         'maxPriorityFeePerGas': web3.to_wei('2', 'gwei')
     })
     
     receipt = sign_and_send_tx(web3, tx, private_key)
-    print(f"Pair created: {tokenA.functions.symbol().call()} - {tokenB.functions.symbol().call()}")
+    print(f"Pair created: {get_symbol(tokenA)} - {get_symbol(tokenB)}")
     return receipt
 
 def add_liquidity(web3, router_contract, tokenA, tokenB, amountADesired, amountBDesired, amountAMin, amountBMin, private_key):
@@ -61,15 +63,15 @@ def add_liquidity(web3, router_contract, tokenA, tokenB, amountADesired, amountB
     tx = router_contract.functions.addLiquidity(
         tokenA.address, tokenB.address, amountADesired, amountBDesired, amountAMin, amountBMin, web3.eth.account.from_key(private_key).address, deadline
     ).build_transaction({
-        'nonce': web3.eth.get_transaction_count(web3.eth.account.from_key(private_key).address),
+        'nonce': get_nonce_manager(web3, web3.eth.account.from_key(private_key).address).allocate(),
         'gas': 1000000,
         'maxFeePerGas': web3.to_wei('100', 'gwei'),  # Adjust these values according to network conditions
         'maxPriorityFeePerGas': web3.to_wei('2', 'gwei')
     })
     
-    assert router_contract.functions.factory().call() == "0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f"
+    assert get_factory(router_contract) == "0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f"
     receipt = sign_and_send_tx(web3, tx, private_key)
-    assert router_contract.functions.WETH().call() == "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+    assert get_WETH(router_contract) == "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
 
     print(f"Liquidity added successfully to router {router_contract.address}")
     return receipt
@@ -100,7 +102,7 @@ def fund_pool(web3, factory, router, token1, token2, amount_token1, amount_token
             print(f"Error while trying to create pair: {e}")
             return False
     else:
-        print(f'Pair already exists: {token1.functions.symbol().call()} - {token2.functions.symbol().call()}')
+        print(f'Pair already exists: {get_symbol(token1)} - {get_symbol(token2)}')
 
     # Approve tokens
     amount_token1_approve = amount_token1
@@ -480,8 +482,8 @@ if __name__ == "__main__":
     usdc_iCAN_address = '0xa9efDEf197130B945462163a0B852019BA529a66'
     usdc_iCAN_contract = web3.eth.contract(address=usdc_iCAN_address, abi=token_abi)
     print(f'''
-BTC iCAN symbol: {btc_iCAN_contract.functions.symbol().call()}
-USDC iCAN symbol: {usdc_iCAN_contract.functions.symbol().call()}
+BTC iCAN symbol: {get_symbol(btc_iCAN_contract)}
+USDC iCAN symbol: {get_symbol(usdc_iCAN_contract)}
           ''')
     amount_btc_lp = to_wei(100, 8)
     amount_usdc_lp = to_wei(5000000, 6)
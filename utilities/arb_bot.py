@@ -1,5 +1,13 @@
 from web3 import Web3
-from utilities.trading_utilities import (sign_and_send_tx)
+from utilities.trading_utilities import (sign_and_send_tx, send_tx, send_raw_tx)
+from utilities.nonce_manager import (get_nonce_manager)
+from utilities.fee_oracle import FeeOracle
+from utilities.tx_templates import TradeTxTemplates
+from utilities.gas_model import GasModel
+from utilities.rpc_client import (get_web3, NODE_URL)
+from utilities.rpc_batch import RpcBatch
+from utilities.ws_subscriber import (WsSubscriber, NODE_WS_URL)
+from utilities.trade_sizing import (get_optimal_amount_in, get_optimal_path_amount_in)
 '''
 arb_bot.py
 
@@ -17,13 +25,20 @@ class ArbBot:
 
     Attributes:
         node_url (str): The url of the node.
+        ws_url (str): The WebSocket url of the node, used by opt-in subscriptions.
         web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
         chain_id (int): The ID of the connected chain.
         private_key (str): Hex value of a private key.
         sender_address (str): Address of the sender.
+        nonce_manager (NonceManager): local nonce allocator of the sender.
+        fee_oracle (FeeOracle): per-block fee predictor used to price transactions.
         bot_address (str): Address of the arbitrage bot contract.
         bot_abi (str): abi of the arbitrage bot contract.
         bot (Contract): Contract instance of the arbitrage bot contract.
+        tx_templates (TradeTxTemplates): cached and pre-signed executeTrade transactions.
+        gas_model (GasModel): route-keyed gas used by the trades, supplying their gas limits.
+        trade_mode (str): "router" to trade through executeTrade and the routers, "direct" to trade through executeTradeDirect and the pairs,
+            or "flash" to trade through executeFlashTrade with token1 borrowed from the first pair.
         min_profitBP (int): Basis point value of the minimum profitability accepted in a trade that's smaller than profit/(liquidity + gas).
         slippage_bufferBP (int): Basis point value of the slippage buffer percentage added for swaps.
     """
@@ -37,9 +52,10 @@ class ArbBot:
             private_key (str): Hex value of a private key.
             bot_address (str): Address of the arbitrage bot contract.
         """
-        # Connect to localhost
-        self.node_url = "http://127.0.0.1:8545"
-        self.web3 = Web3(Web3.HTTPProvider(self.node_url))
+        # Connect to localhost through the RPC client shared by the whole process
+        self.node_url = NODE_URL
+        self.ws_url = NODE_WS_URL
+        self.web3 = get_web3(self.node_url)
         self.chain_id = self.web3.eth.chain_id
 
         if not self.web3.is_connected():
@@ -49,6 +65,8 @@ class ArbBot:
         self.private_key = private_key
         signer_wallet = self.web3.eth.account.from_key(self.private_key)
         self.sender_address = signer_wallet.address
+        self.nonce_manager = get_nonce_manager(self.web3, self.sender_address)
+        self.fee_oracle = FeeOracle(self.web3)
 
         # Create a bot contract web3 instance
         self.bot_address = bot_address 
@@ -62,6 +80,58 @@ class ArbBot:
                 "stateMutability": "payable",
                 "type": "fallback"
             },
+            {
+                "inputs": [
+                {
+                    "internalType": "address[]",
+                    "name": "_routers",
+                    "type": "address[]"
+                },
+                {
+                    "internalType": "address[]",
+                    "name": "_path",
+                    "type": "address[]"
+                },
+                {
+                    "internalType": "uint256",
+                    "name": "_amount",
+                    "type": "uint256"
+                }
+                ],
+                "name": "estimatePathReturn",
+                "outputs": [
+                {
+                    "internalType": "uint256",
+                    "name": "",
+                    "type": "uint256"
+                }
+                ],
+                "stateMutability": "view",
+                "type": "function"
+            },
+            {
+                "inputs": [
+                {
+                    "internalType": "address[]",
+                    "name": "_routers",
+                    "type": "address[]"
+                },
+                {
+                    "internalType": "address[]",
+                    "name": "_path",
+                    "type": "address[]"
+                },
+                {
+                    "internalType": "uint256",
+                    "name": "_amount",
+                    "type": "uint256"
+                }
+                ],
+                "name": "executePath",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
             {
                 "inputs": [
                 {
@@ -101,6 +171,52 @@ class ArbBot:
                 "stateMutability": "view",
                 "type": "function"
             },
+            {
+                "inputs": [
+                {
+                    "components": [
+                    {
+                        "internalType": "address",
+                        "name": "router1",
+                        "type": "address"
+                    },
+                    {
+                        "internalType": "address",
+                        "name": "router2",
+                        "type": "address"
+                    },
+                    {
+                        "internalType": "address",
+                        "name": "token1",
+                        "type": "address"
+                    },
+                    {
+                        "internalType": "address",
+                        "name": "token2",
+                        "type": "address"
+                    }
+                    ],
+                    "internalType": "struct Arbitrage.Route[]",
+                    "name": "_routes",
+                    "type": "tuple[]"
+                },
+                {
+                    "internalType": "uint256[]",
+                    "name": "_amounts",
+                    "type": "uint256[]"
+                }
+                ],
+                "name": "estimateTradeReturns",
+                "outputs": [
+                {
+                    "internalType": "uint256[][]",
+                    "name": "",
+                    "type": "uint256[][]"
+                }
+                ],
+                "stateMutability": "view",
+                "type": "function"
+            },
             {
                 "inputs": [
                 {
@@ -134,6 +250,224 @@ class ArbBot:
                 "stateMutability": "nonpayable",
                 "type": "function"
             },
+            {
+                "inputs": [
+                {
+                    "internalType": "address",
+                    "name": "_pair1",
+                    "type": "address"
+                },
+                {
+                    "internalType": "address",
+                    "name": "_pair2",
+                    "type": "address"
+                },
+                {
+                    "internalType": "address",
+                    "name": "_token1",
+                    "type": "address"
+                },
+                {
+                    "internalType": "address",
+                    "name": "_token2",
+                    "type": "address"
+                },
+                {
+                    "internalType": "uint256",
+                    "name": "_amount",
+                    "type": "uint256"
+                },
+                {
+                    "internalType": "uint256",
+                    "name": "_amountOut1",
+                    "type": "uint256"
+                },
+                {
+                    "internalType": "uint256",
+                    "name": "_amountOut2",
+                    "type": "uint256"
+                }
+                ],
+                "name": "executeTradeDirect",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
+            {
+                "inputs": [
+                {
+                    "internalType": "address",
+                    "name": "_pair1",
+                    "type": "address"
+                },
+                {
+                    "internalType": "address",
+                    "name": "_pair2",
+                    "type": "address"
+                },
+                {
+                    "internalType": "address",
+                    "name": "_token1",
+                    "type": "address"
+                },
+                {
+                    "internalType": "address",
+                    "name": "_token2",
+                    "type": "address"
+                },
+                {
+                    "internalType": "uint256",
+                    "name": "_amount",
+                    "type": "uint256"
+                },
+                {
+                    "internalType": "uint256",
+                    "name": "_amountOut1",
+                    "type": "uint256"
+                },
+                {
+                    "internalType": "uint256",
+                    "name": "_amountOut2",
+                    "type": "uint256"
+                }
+                ],
+                "name": "executeFlashTrade",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
+            {
+                "inputs": [
+                {
+                    "internalType": "address[]",
+                    "name": "_tokens",
+                    "type": "address[]"
+                },
+                {
+                    "internalType": "address[]",
+                    "name": "_routers",
+                    "type": "address[]"
+                }
+                ],
+                "name": "approveRouters",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
+            {
+                "inputs": [
+                {
+                    "components": [
+                    {
+                        "internalType": "address",
+                        "name": "router1",
+                        "type": "address"
+                    },
+                    {
+                        "internalType": "address",
+                        "name": "router2",
+                        "type": "address"
+                    },
+                    {
+                        "internalType": "address",
+                        "name": "token1",
+                        "type": "address"
+                    },
+                    {
+                        "internalType": "address",
+                        "name": "token2",
+                        "type": "address"
+                    },
+                    {
+                        "internalType": "uint256",
+                        "name": "amount",
+                        "type": "uint256"
+                    },
+                    {
+                        "internalType": "uint256",
+                        "name": "minProfit",
+                        "type": "uint256"
+                    }
+                    ],
+                    "internalType": "struct Arbitrage.TradeLeg[]",
+                    "name": "_legs",
+                    "type": "tuple[]"
+                }
+                ],
+                "name": "executeTrades",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
+            {
+                "inputs": [
+                {
+                    "internalType": "address",
+                    "name": "_router1",
+                    "type": "address"
+                },
+                {
+                    "internalType": "address",
+                    "name": "_router2",
+                    "type": "address"
+                },
+                {
+                    "internalType": "address",
+                    "name": "_token1",
+                    "type": "address"
+                },
+                {
+                    "internalType": "address",
+                    "name": "_token2",
+                    "type": "address"
+                },
+                {
+                    "internalType": "uint256",
+                    "name": "_amount",
+                    "type": "uint256"
+                },
+                {
+                    "internalType": "uint256",
+                    "name": "_minProfit",
+                    "type": "uint256"
+                }
+                ],
+                "name": "executeTradeLeg",
+                "outputs": [
+                {
+                    "internalType": "uint256",
+                    "name": "",
+                    "type": "uint256"
+                }
+                ],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
+            {
+                "anonymous": False,
+                "inputs": [
+                {
+                    "indexed": True,
+                    "internalType": "uint256",
+                    "name": "index",
+                    "type": "uint256"
+                },
+                {
+                    "indexed": False,
+                    "internalType": "bool",
+                    "name": "success",
+                    "type": "bool"
+                },
+                {
+                    "indexed": False,
+                    "internalType": "uint256",
+                    "name": "profit",
+                    "type": "uint256"
+                }
+                ],
+                "name": "TradeLegResult",
+                "type": "event"
+            },
             {
                 "inputs": [
                 {
@@ -192,13 +526,54 @@ class ArbBot:
             }
         ]
         self.bot = self.web3.eth.contract(address=self.bot_address, abi=self.bot_abi)
+        self.tx_templates = TradeTxTemplates(signer_wallet, self.chain_id, self.bot_address, self.nonce_manager)
+        self.gas_model = GasModel()
+        self.trade_mode = "router"
 
         self.min_profitBP = min_profitBP
         self.slippage_bufferBP = slippage_bufferBP
     
+    def build_trade_tx(self, router1, router2, token1, token2, amount):
+        """
+        Builds the transaction of an arbitrage trade that swaps a specified amount of token1 to token2 on router1, and from token2 to token1 on router2.
+        
+        Params:
+            router1 (str): The address of a router contract.
+            router2 (str): The address of a router contract.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+
+        Returns:
+            tx(dict): the dictionary representation of the trade transaction.
+        """
+        max_fee_per_gas, max_priority_fee_per_gas = self.fee_oracle.get_fees()
+        gas = self.get_trade_gas_limit(router1, router2, token1, token2, amount)
+        return self.tx_templates.build(router1, router2, token1, token2, amount, self.get_sender_nonce(), max_fee_per_gas, max_priority_fee_per_gas, gas)
+
+    def get_trade_gas_limit(self, router1, router2, token1, token2, amount):
+        """
+        Gets the gas limit of an arbitrage trade from the gas model. The route is only estimated on-chain if it was never traded or estimated before.
+
+        Params:
+            router1 (str): The address of a router contract.
+            router2 (str): The address of a router contract.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+
+        Returns:
+            (int): the gas limit of the trade transaction.
+        """
+        return self.gas_model.get_gas_limit(
+            (router1, router2, token1, token2),
+            lambda: self.bot.functions.executeTrade(router1, router2, token1, token2, amount).estimate_gas({'from': self.sender_address})
+            )
+
     def execute_trade(self, router1, router2, token1, token2, amount):
         """
         Executes an arbitrage trade that swaps a specified amount of token1 to token2 on router1, and from token2 to token1 on router2.
+        Blocks until the trade is mined.
         
         Params:
             router1 (str): The address of a router contract.
@@ -208,20 +583,13 @@ class ArbBot:
             amount (int): The amount of token1 to trade with.
 
         Returns:
-            none
+            (receipt): The receipt of the trade transaction, or "N/A" if it failed.
         """
         receipt = "N/A"
         try:
-            tx = self.bot.functions.executeTrade(
-            router1, router2, token1, token2, amount
-            ).build_transaction({
-                'chainId': self.chain_id,
-                'gas': 320173,
-                'maxFeePerGas': self.get_max_feePerGas()*2,
-                'nonce': self.get_sender_nonce()
-            })
-
+            tx = self.build_trade_tx(router1, router2, token1, token2, amount)
             receipt = sign_and_send_tx(self.web3, tx, self.private_key)
+            self.gas_model.record((router1, router2, token1, token2), receipt)
             print('''
     ****************************
     *         Success!         *
@@ -231,10 +599,404 @@ class ArbBot:
 
         except:
             print("executeTrade() failed! Arb trade failed.")
+            self.nonce_manager.resync() # the allocated nonce may never have been sent
 
         return receipt
-    
-    def estimate_return(self, router1, router2, token1, token2, amount):
+
+    def submit_trade(self, router1, router2, token1, token2, amount, receipt_tracker, callback=None):
+        """
+        Sends an arbitrage trade without waiting for it to be mined, and hands it to a receipt tracker.
+        
+        Params:
+            router1 (str): The address of a router contract.
+            router2 (str): The address of a router contract.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+            receipt_tracker (ReceiptTracker): the tracker polling the receipt in the background.
+            callback (function): called with the PendingTx once the trade is mined or dropped.
+
+        Returns:
+            (PendingTx): The handle of the trade transaction, or "N/A" if it couldn't be sent.
+        """
+        max_fee_per_gas, max_priority_fee_per_gas = self.fee_oracle.get_fees()
+        callback = self.gas_model.track((router1, router2, token1, token2), callback)
+        raw_tx = self.tx_templates.take(router1, router2, token1, token2, amount, max_fee_per_gas, max_priority_fee_per_gas)
+        if raw_tx is not None:
+            try:
+                return receipt_tracker.track(send_raw_tx(self.web3, raw_tx), callback, self.sender_address)
+            except:
+                self.nonce_manager.resync() # the pre-signed nonce was claimed but never accepted; sign the trade afresh
+        try:
+            tx = self.build_trade_tx(router1, router2, token1, token2, amount)
+            return receipt_tracker.track(send_tx(self.web3, tx, self.private_key), callback, self.sender_address)
+        except:
+            print("executeTrade() failed to send! Arb trade failed.")
+            self.nonce_manager.resync() # the allocated nonce may never have been sent
+            return "N/A"
+
+    def presign_trades(self, trades):
+        """
+        Speculatively signs the transactions of the most promising trades of a block against the next nonce and the current
+        oracle fees, so that submit_trade can send any one of them without encoding or signing.
+
+        Params:
+            trades (list): (router1, router2, token1, token2, amount) of every trade to pre-sign.
+
+        Returns:
+            (int): the number of pre-signed transactions.
+        """
+        max_fee_per_gas, max_priority_fee_per_gas = self.fee_oracle.get_fees()
+        gas_limits = [self.get_trade_gas_limit(*trade) for trade in trades]
+        return self.tx_templates.presign(trades, max_fee_per_gas, max_priority_fee_per_gas, gas_limits)
+
+    def get_direct_trade(self, quote_engine, router1, router2, token1, token2, amount):
+        """
+        Gets the arguments of executeTradeDirect for a trade, with the pairs and amounts out computed off-chain from the cached reserves.
+
+        Params:
+            quote_engine (QuoteEngine): quote engine holding the cached reserves and router fees.
+            router1 (Contract): Contract instance of a router.
+            router2 (Contract): Contract instance of a router.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+
+        Returns:
+            (tuple): (pair1, pair2, token1, token2, amount, amount_out1, amount_out2) to pass to executeTradeDirect.
+        """
+        pair1 = quote_engine.pair_registry.get_pair_address(router1, token1, token2)
+        pair2 = quote_engine.pair_registry.get_pair_address(router2, token1, token2)
+        amount_out1 = quote_engine.quote(router1, token1, token2, amount)
+        amount_out2 = quote_engine.quote(router2, token2, token1, amount_out1)
+        return pair1, pair2, token1, token2, amount, amount_out1, amount_out2
+
+    def build_direct_trade_tx(self, quote_engine, router1, router2, token1, token2, amount):
+        """
+        Builds the transaction of an arbitrage trade that swaps through the pairs of router1 and router2 directly with executeTradeDirect.
+
+        Params:
+            quote_engine (QuoteEngine): quote engine holding the cached reserves and router fees.
+            router1 (Contract): Contract instance of a router.
+            router2 (Contract): Contract instance of a router.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+
+        Returns:
+            tx(dict): the dictionary representation of the trade transaction.
+        """
+        direct_trade = self.get_direct_trade(quote_engine, router1, router2, token1, token2, amount)
+        max_fee_per_gas, max_priority_fee_per_gas = self.fee_oracle.get_fees()
+        gas = self.gas_model.get_gas_limit(
+            ("direct", router1.address, router2.address, token1, token2),
+            lambda: self.bot.functions.executeTradeDirect(*direct_trade).estimate_gas({'from': self.sender_address})
+            )
+        return self.bot.functions.executeTradeDirect(
+        *direct_trade
+        ).build_transaction({
+            'chainId': self.chain_id,
+            'gas': gas,
+            'maxFeePerGas': max_fee_per_gas,
+            'maxPriorityFeePerGas': max_priority_fee_per_gas,
+            'nonce': self.get_sender_nonce()
+        })
+
+    def submit_trade_direct(self, quote_engine, router1, router2, token1, token2, amount, receipt_tracker, callback=None):
+        """
+        Sends an arbitrage trade through the pairs directly without waiting for it to be mined, and hands it to a receipt tracker.
+
+        Params:
+            quote_engine (QuoteEngine): quote engine holding the cached reserves and router fees.
+            router1 (Contract): Contract instance of a router.
+            router2 (Contract): Contract instance of a router.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+            receipt_tracker (ReceiptTracker): the tracker polling the receipt in the background.
+            callback (function): called with the PendingTx once the trade is mined or dropped.
+
+        Returns:
+            (PendingTx): The handle of the trade transaction, or "N/A" if it couldn't be sent.
+        """
+        callback = self.gas_model.track(("direct", router1.address, router2.address, token1, token2), callback)
+        try:
+            tx = self.build_direct_trade_tx(quote_engine, router1, router2, token1, token2, amount)
+            return receipt_tracker.track(send_tx(self.web3, tx, self.private_key), callback, self.sender_address)
+        except:
+            print("executeTradeDirect() failed to send! Arb trade failed.")
+            self.nonce_manager.resync() # the allocated nonce may never have been sent
+            return "N/A"
+
+    def build_flash_trade_tx(self, quote_engine, router1, router2, token1, token2, amount):
+        """
+        Builds the transaction of an arbitrage trade that flash-borrows from the pair of router1 with executeFlashTrade,
+        so the amount traded isn't limited by the balance of token1 in the arbitrage contract.
+
+        Params:
+            quote_engine (QuoteEngine): quote engine holding the cached reserves and router fees.
+            router1 (Contract): Contract instance of a router.
+            router2 (Contract): Contract instance of a router.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+
+        Returns:
+            tx(dict): the dictionary representation of the trade transaction.
+        """
+        flash_trade = self.get_direct_trade(quote_engine, router1, router2, token1, token2, amount)
+        max_fee_per_gas, max_priority_fee_per_gas = self.fee_oracle.get_fees()
+        gas = self.gas_model.get_gas_limit(
+            ("flash", router1.address, router2.address, token1, token2),
+            lambda: self.bot.functions.executeFlashTrade(*flash_trade).estimate_gas({'from': self.sender_address})
+            )
+        return self.bot.functions.executeFlashTrade(
+        *flash_trade
+        ).build_transaction({
+            'chainId': self.chain_id,
+            'gas': gas,
+            'maxFeePerGas': max_fee_per_gas,
+            'maxPriorityFeePerGas': max_priority_fee_per_gas,
+            'nonce': self.get_sender_nonce()
+        })
+
+    def submit_trade_flash(self, quote_engine, router1, router2, token1, token2, amount, receipt_tracker, callback=None):
+        """
+        Sends a flash-borrowed arbitrage trade without waiting for it to be mined, and hands it to a receipt tracker.
+
+        Params:
+            quote_engine (QuoteEngine): quote engine holding the cached reserves and router fees.
+            router1 (Contract): Contract instance of a router.
+            router2 (Contract): Contract instance of a router.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+            receipt_tracker (ReceiptTracker): the tracker polling the receipt in the background.
+            callback (function): called with the PendingTx once the trade is mined or dropped.
+
+        Returns:
+            (PendingTx): The handle of the trade transaction, or "N/A" if it couldn't be sent.
+        """
+        callback = self.gas_model.track(("flash", router1.address, router2.address, token1, token2), callback)
+        try:
+            tx = self.build_flash_trade_tx(quote_engine, router1, router2, token1, token2, amount)
+            return receipt_tracker.track(send_tx(self.web3, tx, self.private_key), callback, self.sender_address)
+        except:
+            print("executeFlashTrade() failed to send! Arb trade failed.")
+            self.nonce_manager.resync() # the allocated nonce may never have been sent
+            return "N/A"
+
+    def submit_trade_in_mode(self, quote_engine, router1, router2, token1, token2, amount, receipt_tracker, callback=None):
+        """
+        Sends an arbitrage trade with submit_trade, submit_trade_direct or submit_trade_flash, depending on the trade mode of the bot.
+
+        Params:
+            quote_engine (QuoteEngine): quote engine holding the cached reserves and router fees.
+            router1 (Contract): Contract instance of a router.
+            router2 (Contract): Contract instance of a router.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+            receipt_tracker (ReceiptTracker): the tracker polling the receipt in the background.
+            callback (function): called with the PendingTx once the trade is mined or dropped.
+
+        Returns:
+            (PendingTx): The handle of the trade transaction, or "N/A" if it couldn't be sent.
+        """
+        if self.trade_mode == "direct":
+            return self.submit_trade_direct(quote_engine, router1, router2, token1, token2, amount, receipt_tracker, callback)
+        if self.trade_mode == "flash":
+            return self.submit_trade_flash(quote_engine, router1, router2, token1, token2, amount, receipt_tracker, callback)
+        return self.submit_trade(router1.address, router2.address, token1, token2, amount, receipt_tracker, callback)
+
+    def approve_routers(self, token_addresses, router_addresses):
+        """
+        Approves routers to spend an unlimited amount of tokens held by the arbitrage contract, so that router trades
+        stop paying for an approval on every swap.
+
+        Params:
+            token_addresses (list): addresses of token contracts.
+            router_addresses (list): addresses of router contracts.
+
+        Returns:
+            (receipt): The receipt of the approval transaction.
+        """
+        tx = self.bot.functions.approveRouters(token_addresses, router_addresses).build_transaction(
+            self.build_tx('approveRouters', token_addresses, router_addresses))
+        return sign_and_send_tx(self.web3, tx, self.private_key)
+
+    def build_trades_tx(self, legs):
+        """
+        Builds the transaction of a batch of arbitrage trades sent through executeTrades. The gas limit is the sum of the
+        gas limits of the legs, less the base transaction cost that every leg after the first one shares.
+
+        Params:
+            legs (list): (router1, router2, token1, token2, amount, min_profit) of every trade of the batch.
+
+        Returns:
+            tx(dict): the dictionary representation of the batch transaction.
+        """
+        max_fee_per_gas, max_priority_fee_per_gas = self.fee_oracle.get_fees()
+        gas = sum(self.get_trade_gas_limit(*leg[:5]) for leg in legs) - 21000 * (len(legs) - 1)
+        return self.bot.functions.executeTrades(
+        [tuple(leg) for leg in legs]
+        ).build_transaction({
+            'chainId': self.chain_id,
+            'gas': gas,
+            'maxFeePerGas': max_fee_per_gas,
+            'maxPriorityFeePerGas': max_priority_fee_per_gas,
+            'nonce': self.get_sender_nonce()
+        })
+
+    def execute_trades(self, legs):
+        """
+        Executes a batch of arbitrage trades in one transaction. A leg that fails or falls short of its minimum profit
+        is skipped without reverting the other legs. Blocks until the batch is mined.
+
+        Params:
+            legs (list): (router1, router2, token1, token2, amount, min_profit) of every trade of the batch.
+
+        Returns:
+            (receipt): The receipt of the batch transaction, or "N/A" if it failed.
+        """
+        receipt = "N/A"
+        try:
+            tx = self.build_trades_tx(legs)
+            receipt = sign_and_send_tx(self.web3, tx, self.private_key)
+            print(f"Batch of {len(legs)} arb trades completed with {sum(success for _, success, _ in self.get_trade_leg_results(receipt))} profitable legs.")
+
+        except:
+            print("executeTrades() failed! Arb trades failed.")
+            self.nonce_manager.resync() # the allocated nonce may never have been sent
+
+        return receipt
+
+    def submit_trades(self, legs, receipt_tracker, callback=None):
+        """
+        Sends a batch of arbitrage trades in one transaction without waiting for it to be mined, and hands it to a receipt tracker.
+
+        Params:
+            legs (list): (router1, router2, token1, token2, amount, min_profit) of every trade of the batch.
+            receipt_tracker (ReceiptTracker): the tracker polling the receipt in the background.
+            callback (function): called with the PendingTx once the batch is mined or dropped.
+
+        Returns:
+            (PendingTx): The handle of the batch transaction, or "N/A" if it couldn't be sent.
+        """
+        try:
+            tx = self.build_trades_tx(legs)
+            return receipt_tracker.track(send_tx(self.web3, tx, self.private_key), callback, self.sender_address)
+        except:
+            print("executeTrades() failed to send! Arb trades failed.")
+            self.nonce_manager.resync() # the allocated nonce may never have been sent
+            return "N/A"
+
+    def get_trade_leg_results(self, receipt):
+        """
+        Decodes the outcome of every leg of a batch of arbitrage trades from the TradeLegResult events of its receipt.
+
+        Params:
+            receipt (receipt): the receipt of an executeTrades transaction.
+
+        Returns:
+            (list): (index, success, profit) of every leg, in the order of the legs.
+        """
+        events = self.bot.events.TradeLegResult().process_receipt(receipt)
+        return sorted((event["args"]["index"], event["args"]["success"], event["args"]["profit"]) for event in events)
+
+    def build_path_tx(self, routers, path, amount):
+        """
+        Builds the transaction of a multi-hop arbitrage trade that swaps a specified amount of path[0] along path.
+        
+        Params:
+            routers (list): The addresses of the router contract of every hop.
+            path (list): The addresses of the token contracts along the path.
+            amount (int): The amount of path[0] to trade with.
+
+        Returns:
+            tx(dict): the dictionary representation of the trade transaction.
+        """
+        max_fee_per_gas, max_priority_fee_per_gas = self.fee_oracle.get_fees()
+        gas = self.gas_model.get_gas_limit(
+            (tuple(routers), tuple(path)),
+            lambda: self.bot.functions.executePath(routers, path, amount).estimate_gas({'from': self.sender_address}),
+            default=150000 * len(routers) + 100000
+            )
+        return self.bot.functions.executePath(
+        routers, path, amount
+        ).build_transaction({
+            'chainId': self.chain_id,
+            'gas': gas,
+            'maxFeePerGas': max_fee_per_gas,
+            'maxPriorityFeePerGas': max_priority_fee_per_gas,
+            'nonce': self.get_sender_nonce()
+        })
+
+    def execute_path(self, routers, path, amount):
+        """
+        Executes a multi-hop arbitrage trade that swaps a specified amount of path[0] along path, 
+        hop i trading path[i] to path[i+1] on routers[i], and ends back in path[0]. Blocks until the trade is mined.
+        
+        Params:
+            routers (list): The addresses of the router contract of every hop.
+            path (list): The addresses of the token contracts along the path.
+            amount (int): The amount of path[0] to trade with.
+
+        Returns:
+            (receipt): The receipt of the trade transaction, or "N/A" if it failed.
+        """
+        receipt = "N/A"
+        try:
+            tx = self.build_path_tx(routers, path, amount)
+            receipt = sign_and_send_tx(self.web3, tx, self.private_key)
+            self.gas_model.record((tuple(routers), tuple(path)), receipt)
+            print(f"Multi-hop arb trade completed through {len(routers)} hops.")
+
+        except:
+            print("executePath() failed! Arb trade failed.")
+            self.nonce_manager.resync() # the allocated nonce may never have been sent
+
+        return receipt
+
+    def submit_path(self, routers, path, amount, receipt_tracker, callback=None):
+        """
+        Sends a multi-hop arbitrage trade without waiting for it to be mined, and hands it to a receipt tracker.
+        
+        Params:
+            routers (list): The addresses of the router contract of every hop.
+            path (list): The addresses of the token contracts along the path.
+            amount (int): The amount of path[0] to trade with.
+            receipt_tracker (ReceiptTracker): the tracker polling the receipt in the background.
+            callback (function): called with the PendingTx once the trade is mined or dropped.
+
+        Returns:
+            (PendingTx): The handle of the trade transaction, or "N/A" if it couldn't be sent.
+        """
+        callback = self.gas_model.track((tuple(routers), tuple(path)), callback)
+        try:
+            tx = self.build_path_tx(routers, path, amount)
+            return receipt_tracker.track(send_tx(self.web3, tx, self.private_key), callback, self.sender_address)
+        except:
+            print("executePath() failed to send! Arb trade failed.")
+            self.nonce_manager.resync() # the allocated nonce may never have been sent
+            return "N/A"
+
+    def estimate_path_return(self, routers, path, amount, block_identifier='latest'):
+        """
+        Estimates the return of a multi-hop arbitrage trade that swaps a specified amount of path[0] along path.
+        
+        Params:
+            routers (list): The addresses of the router contract of every hop.
+            path (list): The addresses of the token contracts along the path.
+            amount (int): The amount of path[0] to trade with.
+            block_identifier (int or str): block number or tag to estimate the return at.
+
+        Returns:
+            int: The estimated amount of return in path[-1]. 
+        """
+        return self.bot.functions.estimatePathReturn(routers, path, amount).call(block_identifier=block_identifier)
+
+    def estimate_return(self, router1, router2, token1, token2, amount, block_identifier='latest'):
         """
         Estimates the return of an arbitrage trade that swaps a specified amount of token1 to token2 on router1, and from token2 to token1 on router2.
         
@@ -244,6 +1006,7 @@ class ArbBot:
             token1 (str): The address of a token contract.
             token2 (str): The address of a token contract.
             amount (int): The amount of token1 to trade with.
+            block_identifier (int or str): block number or tag to estimate the return at.
 
         Returns:
             int: The estimated amount of return in token2. 
@@ -254,20 +1017,140 @@ class ArbBot:
             router2,
             token1,
             token2,
-            amount).call()
+            amount).call(block_identifier=block_identifier)
         return est_return
 
-    def get_balance(self, address):
+    def estimate_trade_returns(self, routes, amounts, block_identifier='latest'):
+        """
+        Estimates the returns of many arbitrage trades at many amounts in a single eth_call to Arbitrage.estimateTradeReturns.
+
+        Params:
+            routes (list): (router1, router2, token1, token2) of every route, swapping token1 to token2 on router1 and back on router2.
+            amounts (list): the ladder of token1 amounts to quote every route at.
+            block_identifier (int or str): block number or tag to estimate the returns at.
+
+        Returns:
+            (list): the estimated return in token1 of every route at every amount, one row per route. A route that can't be quoted returns 0.
+        """
+        return self.bot.functions.estimateTradeReturns([tuple(route) for route in routes], list(amounts)).call(block_identifier=block_identifier)
+
+    def get_profit_curves(self, routes, amounts, block_identifier='latest'):
+        """
+        Gets the profit curve of every route over an amount ladder from one batched estimate.
+
+        Params:
+            routes (list): (router1, router2, token1, token2) of every route.
+            amounts (list): the ladder of token1 amounts to quote every route at.
+            block_identifier (int or str): block number or tag to estimate the returns at.
+
+        Returns:
+            (list): one curve per route, each a list of (amount, profit) with the profit in token1 wei, negative for a loss.
+        """
+        trade_returns = self.estimate_trade_returns(routes, amounts, block_identifier)
+        return [
+            [(amount, trade_return - amount) for amount, trade_return in zip(amounts, route_returns)]
+            for route_returns in trade_returns
+            ]
+
+    def get_optimal_trade_amount(self, quote_engine, router1, router2, token1, token2, balance=None, capped=True):
+        """
+        Computes the profit-maximizing amount of token1 to trade on router1 then router2 from cached reserves,
+        capped at the balance of token1 available in the arbitrage contract unless the trade is flash-borrowed.
+
+        Params:
+            quote_engine (QuoteEngine): quote engine holding the cached reserves and router fees.
+            router1 (Contract): Contract instance of a router.
+            router2 (Contract): Contract instance of a router.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            balance (int): The available balance of token1. Read from the arbitrage contract if none.
+            capped (bool): whether the amount is capped at the balance. Flash trades borrow the amount instead.
+
+        Returns:
+            (int): The amount of token1 to trade with, or 0 if the round trip can't be profitable.
+        """
+        reserve_a_in, reserve_a_out = quote_engine.get_reserves(router1, token1, token2)
+        reserve_b_in, reserve_b_out = quote_engine.get_reserves(router2, token2, token1)
+        optimal_amount = get_optimal_amount_in(
+            reserve_a_in,
+            reserve_a_out,
+            reserve_b_in,
+            reserve_b_out,
+            quote_engine.get_fee(router1),
+            quote_engine.get_fee(router2))
+
+        if not capped:
+            return optimal_amount
+        if balance is None:
+            balance = self.get_balance(token1)
+        return min(optimal_amount, balance)
+
+    def get_optimal_path_amount(self, quote_engine, routers, path, balance=None):
+        """
+        Computes the profit-maximizing amount of path[0] to trade along a multi-hop path from cached reserves,
+        capped at the balance of path[0] available in the arbitrage contract.
+
+        Params:
+            quote_engine (QuoteEngine): quote engine holding the cached reserves and router fees.
+            routers (list): Contract instances of the router of every hop.
+            path (list): The addresses of the token contracts along the path.
+            balance (int): The available balance of path[0]. Read from the arbitrage contract if none.
+
+        Returns:
+            (int): The amount of path[0] to trade with, or 0 if the path can't be profitable.
+        """
+        pools = []
+        for router, token_in, token_out in zip(routers, path, path[1:]):
+            reserve_in, reserve_out = quote_engine.get_reserves(router, token_in, token_out)
+            pools.append((reserve_in, reserve_out, quote_engine.get_fee(router)))
+        optimal_amount = get_optimal_path_amount_in(pools)
+
+        if balance is None:
+            balance = self.get_balance(path[0])
+        return min(optimal_amount, balance)
+
+    def subscribe(self, pair_addresses, max_pending_logs=10000):
+        """
+        Opens a WebSocket subscription to the new blocks and to the Sync and Swap logs of pairs.
+
+        Params:
+            pair_addresses (list): addresses of the pair contracts whose logs are subscribed to.
+            max_pending_logs (int): the number of logs buffered for the consumer at most.
+
+        Returns:
+            (WsSubscriber): the started subscriber.
+        """
+        return WsSubscriber(pair_addresses, ws_url=self.ws_url, max_pending_logs=max_pending_logs).start()
+
+    def get_balance(self, address, block_identifier='latest'):
         """
         Gets the balance of a token in the arbitrage contract.
 
         Params:
             address (str): The address of a token contract.
+            block_identifier (int or str): block number or tag to read the balance at.
 
         Returns:
             (int): The wei amount of the token balance.
         """
-        return self.bot.functions.getBalance(address).call()
+        return self.bot.functions.getBalance(address).call(block_identifier=block_identifier)
+
+    def get_balances(self, addresses, block_identifier='latest'):
+        """
+        Gets the balances of several tokens in the arbitrage contract in a single JSON-RPC batch request.
+
+        Params:
+            addresses (iterable): The addresses of the token contracts.
+            block_identifier (int or str): block number or tag to read the balances at.
+
+        Returns:
+            (dict): The wei amount of every token balance keyed by token address.
+        """
+        addresses = list(dict.fromkeys(addresses))
+        batch = RpcBatch(self.web3)
+        for address in addresses:
+            batch.add_call(self.bot.functions.getBalance(address), block_identifier)
+        return dict(zip(addresses, batch.execute()))
     
     def get_owner(self):
         """
@@ -289,6 +1172,7 @@ class ArbBot:
             self.build_tx('withdrawETH'))
         
         receipt = sign_and_send_tx(self.web3, tx, self.private_key)
+        self.gas_model.record(self.get_function_route('withdrawETH'), receipt)
         return receipt
     
     def withdraw_token(self, token_address):
@@ -354,19 +1238,12 @@ class ArbBot:
 
     def get_max_feePerGas(self):
         """
-        Returns the latest MaxFeePerGas on the network.
+        Returns the MaxFeePerGas predicted by the fee oracle for the latest block.
 
         Returns:
-            (int): the latest MaxFeePerGas on the network. 
+            (int): the predicted MaxFeePerGas on the network. 
         """
-        base_fee_per_gas = self.web3.eth.get_block('latest')['baseFeePerGas']
-        max_priority_fee_per_gas = self.web3.eth.max_priority_fee
-        max_fee_per_gas = base_fee_per_gas + max_priority_fee_per_gas
-
-        print(f"Base Fee per Gas: {base_fee_per_gas}")
-        print(f"Max Priority Fee per Gas: {max_priority_fee_per_gas}")
-        print(f"Max Fee per Gas: {max_fee_per_gas}")
-
+        max_fee_per_gas, _ = self.fee_oracle.get_fees()
         return max_fee_per_gas
 
     def estimate_function_gas(self, func_to_call, *args):
@@ -392,16 +1269,31 @@ class ArbBot:
     
     def get_sender_nonce(self):
         """
-        Returns the nonce of the sender in transaction count.
+        Allocates the next nonce of the sender from the local nonce manager.
+        The chain is only read on the first allocation and whenever the nonce manager resyncs.
         
         Returns:
-            (int): the nonce of the sender in transaction count.
+            (int): the next nonce of the sender.
+        """
+        return self.nonce_manager.allocate()
+
+    def get_function_route(self, func_to_call, *args):
+        """
+        Gets the key of a contract function call in the gas model, as read by build_tx.
+
+        Params:
+            func_to_call (str): the name of the function to call.
+            *args: arguments of the func_to_call as in the contract function definition.
+
+        Returns:
+            (tuple): the route of the call in the gas model.
         """
-        return self.web3.eth.get_transaction_count(self.sender_address)
+        return (func_to_call, repr(args))
     
     def build_tx(self, func_to_call, *args):
         """
-        Builds a transaction for an arbitrage bot contract function call.
+        Builds a transaction for an arbitrage bot contract function call. The gas limit comes from the gas model,
+        so the function is only estimated on-chain until one of its calls is recorded.
         
         Params:
             func_to_call (str): the name of the function to call.
@@ -410,12 +1302,17 @@ class ArbBot:
         Returns:
             tx(dict): the dictionary representation of a transaction.
         """
-        gas = int(self.estimate_function_gas(func_to_call, *args)) + 100
+        gas = self.gas_model.get_gas_limit(
+            self.get_function_route(func_to_call, *args),
+            lambda: self.bot.functions[func_to_call](*args).estimate_gas({'from': self.sender_address})
+            ) + 100
         print(f'gas estimate for {func_to_call} is: {gas}')
+        max_fee_per_gas, max_priority_fee_per_gas = self.fee_oracle.get_fees()
         tx = {
             'chainId': self.chain_id,
             'gas': gas,
-            'maxFeePerGas': self.get_max_feePerGas()*2,
+            'maxFeePerGas': max_fee_per_gas,
+            'maxPriorityFeePerGas': max_priority_fee_per_gas,
             'nonce': self.get_sender_nonce()
         }
         return tx
\ No newline at end of file
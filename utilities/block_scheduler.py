@@ -0,0 +1,137 @@
+import time
+'''
+block_scheduler.py
+
+Wakes the bot once per new block by polling eth_blockNumber, or as soon as a WebSocket subscriber
+is pushed the block, so that the whole route set is evaluated against each block's state within a
+configurable time budget. Work cut off by the budget is deferred to the front of the next block's
+scan, so that busy blocks never starve it. Records and reports the scan-cycle latency of every block.
+'''
+class BlockScheduler:
+    """
+    Represents a block-synchronous scan scheduler.
+
+    Attributes:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        time_budget (float): seconds a scan cycle may take before remaining work is deferred to the next block.
+        poll_interval (float): seconds between two eth_blockNumber polls.
+        subscriber (WsSubscriber): WebSocket subscriber pushing new blocks, or None to poll.
+        last_block (int): the last block a scan cycle was started for.
+        cycle_start (float): the time the current scan cycle started.
+        cycle_latencies (dict): scan-cycle latency in ms keyed by block number.
+        deferred (list): the work cut off by the time budget of the last scan cycle, scanned first in the next one.
+    """
+    def __init__(self, web3, time_budget=1.0, poll_interval=0.2, subscriber=None):
+        """
+        Initialize the BlockScheduler instance with the scan time budget and the block polling interval.
+
+        Params:
+            web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+            time_budget (float): seconds a scan cycle may take before remaining work is deferred to the next block.
+            poll_interval (float): seconds between two eth_blockNumber polls.
+            subscriber (WsSubscriber): WebSocket subscriber pushing new blocks, or None to poll.
+        """
+        self.web3 = web3
+        self.time_budget = time_budget
+        self.poll_interval = poll_interval
+        self.subscriber = subscriber
+        self.last_block = None
+        self.cycle_start = None
+        self.cycle_latencies = {}
+        self.deferred = []
+
+    def wait_for_block(self, end_time):
+        """
+        Polls eth_blockNumber, or waits for the subscriber, until a block newer than the last scanned one is found.
+        Skips straight to the latest block if several blocks were produced in between.
+
+        Params:
+            end_time (float): the time to stop waiting at.
+
+        Returns:
+            (int): the new block number, or None if end_time was reached.
+        """
+        if self.subscriber is not None:
+            block_number = self.subscriber.wait_for_head(end_time)
+            if block_number is not None:
+                self.last_block = block_number
+            return block_number
+        while time.time() < end_time:
+            block_number = self.web3.eth.block_number
+            if self.last_block is None or block_number > self.last_block:
+                self.last_block = block_number
+                return block_number
+            time.sleep(self.poll_interval)
+        return None
+
+    def budget_exceeded(self):
+        """
+        Checks whether the current scan cycle has used up its time budget.
+
+        Returns:
+            (bool): true if the time budget of the current scan cycle is used up; false otherwise.
+        """
+        return time.time() - self.cycle_start > self.time_budget
+
+    def prioritize(self, items, priorities):
+        """
+        Orders the work of a scan cycle: the work deferred from the last cycle comes first, then the rest by descending priority.
+
+        Params:
+            items (iterable): the work of the scan cycle, e.g. the indices of the candidate routes.
+            priorities (indexable): the priority of every item, e.g. the spread of every route.
+
+        Returns:
+            (list): the work of the scan cycle in the order to scan it.
+        """
+        items = list(items)
+        remaining = set(items)
+        deferred = [item for item in self.deferred if item in remaining]
+        remaining.difference_update(deferred)
+        self.deferred = []
+        return deferred + sorted((item for item in items if item in remaining), key=lambda item: priorities[item], reverse=True)
+
+    def defer(self, items):
+        """
+        Defers the work the time budget cut off to the front of the next scan cycle.
+
+        Params:
+            items (iterable): the work not reached in the scan cycle.
+
+        Returns:
+            none
+        """
+        self.deferred = list(items)
+
+    def blocks(self, end_time):
+        """
+        Yields every new block until end_time, timing the scan cycle run between two yields.
+
+        Params:
+            end_time (float): the time to stop scheduling at.
+
+        Yields:
+            (int): the number of the block to scan.
+        """
+        while True:
+            block_number = self.wait_for_block(end_time)
+            if block_number is None:
+                return
+            self.cycle_start = time.time()
+            yield block_number
+            self.record_cycle(block_number)
+
+    def record_cycle(self, block_number):
+        """
+        Records and reports the latency of the scan cycle of a block.
+
+        Params:
+            block_number (int): the block the scan cycle ran for.
+
+        Returns:
+            (float): latency of the scan cycle in ms.
+        """
+        latency = (time.time() - self.cycle_start) * 1000 # convert to ms
+        self.cycle_latencies[block_number] = latency
+        print(f"Block {block_number} scanned in {round(latency, 2)}ms")
+        return latency
@@ -0,0 +1,82 @@
+'''
+fee_oracle.py
+
+Predicts EIP-1559 fees once per block from eth_feeHistory, so that transactions can be priced without
+any RPC call on the submission path. The tip is the median over recent blocks of a reward percentile
+matching the target inclusion speed, and the max fee leaves room for the base fee to rise by the
+protocol maximum of 12.5% per block for as many blocks as the target speed allows.
+'''
+# (reward percentile of the tip, blocks of base fee headroom) keyed by target inclusion speed
+INCLUSION_SPEEDS = {
+    "slow": (25, 6),
+    "standard": (50, 3),
+    "fast": (90, 1),
+}
+
+class FeeOracle:
+    """
+    Represents a per-block EIP-1559 fee predictor.
+
+    Attributes:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        speed (str): the target inclusion speed, a key of INCLUSION_SPEEDS.
+        block_count (int): the number of recent blocks the fee history is read over.
+        min_priority_fee (int): the lowest tip in wei to offer.
+        block_number (int): the block the fees were last predicted at.
+        base_fee (int): the predicted base fee in wei of the next block.
+        max_priority_fee (int): the predicted tip in wei.
+        max_fee (int): the max fee per gas in wei to offer.
+    """
+    def __init__(self, web3, speed="standard", block_count=10, min_priority_fee=10**9):
+        """
+        Initialize the FeeOracle instance with the target inclusion speed. Fees are read on the first update.
+
+        Params:
+            web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+            speed (str): the target inclusion speed, a key of INCLUSION_SPEEDS.
+            block_count (int): the number of recent blocks the fee history is read over.
+            min_priority_fee (int): the lowest tip in wei to offer.
+        """
+        self.web3 = web3
+        self.speed = speed
+        self.block_count = block_count
+        self.min_priority_fee = min_priority_fee
+        self.block_number = None
+        self.base_fee = None
+        self.max_priority_fee = None
+        self.max_fee = None
+
+    def update(self, block_number='latest'):
+        """
+        Predicts the fees from the fee history up to a block. Does nothing if the fees were already predicted at that block.
+
+        Params:
+            block_number (int or str): the newest block of the fee history.
+
+        Returns:
+            none
+        """
+        if block_number != 'latest' and block_number == self.block_number:
+            return
+        percentile, headroom_blocks = INCLUSION_SPEEDS[self.speed]
+        fee_history = self.web3.eth.fee_history(self.block_count, block_number, [percentile])
+
+        # the last base fee of the history is the one of the block after the newest block
+        self.base_fee = fee_history['baseFeePerGas'][-1]
+        rewards = sorted(reward[0] for reward in fee_history.get('reward', []) if reward)
+        tip = rewards[len(rewards) // 2] if rewards else 0
+        self.max_priority_fee = max(tip, self.min_priority_fee)
+        self.max_fee = self.base_fee * 1125**headroom_blocks // 1000**headroom_blocks + self.max_priority_fee
+        self.block_number = fee_history['oldestBlock'] + len(fee_history['baseFeePerGas']) - 2
+
+    def get_fees(self):
+        """
+        Gets the predicted fees. Only reads the chain if the fees were never predicted.
+
+        Returns:
+            max_fee (int): the max fee per gas in wei.
+            max_priority_fee (int): the max priority fee per gas in wei.
+        """
+        if self.max_fee is None:
+            self.update()
+        return self.max_fee, self.max_priority_fee
@@ -0,0 +1,119 @@
+import threading
+from collections import deque
+'''
+gas_model.py
+
+Supplies gas limits of arb trades from the gas they actually used. The gasUsed of every successful
+receipt is recorded per route, and a route seen before gets the highest gas used over a rolling
+window of its recent trades plus a small headroom, without any eth_estimateGas round trip. gasUsed
+is counted after the storage refunds, while the limit has to cover the gas spent before them, so the
+gas used is first scaled up by the largest refund EIP-3529 allows, and never falls below the gas
+estimate of the route if one was made. A route not seen yet falls back to one gas estimate cached
+for the route, or to a default limit if the estimate can't be made, in which case the route is
+estimated again next time.
+'''
+DEFAULT_GAS_LIMIT = 320173 # gas limit of an executeTrade call on a route neither traded nor estimated yet
+MAX_REFUND_QUOTIENT = 5 # EIP-3529 caps the refund at a fifth of the gas spent, so the gas spent is at most 5/4 of gasUsed
+
+class GasModel:
+    """
+    Represents a route-keyed model of the gas used by arb trades.
+
+    Attributes:
+        window (int): the number of recent trades of a route the statistics are kept over.
+        headroom (float): multiplier of the highest gas used in the window, on top of the largest refund.
+        estimate_headroom (float): multiplier of a gas estimate, less reliable than gas used.
+        gas_used (dict): deques of the recent gas used keyed by route.
+        estimates (dict): cached gas estimates keyed by route.
+        lock (Lock): lock guarding gas_used, as receipts are recorded from the receipt tracker thread.
+    """
+    def __init__(self, window=50, headroom=1.1, estimate_headroom=1.3):
+        """
+        Initialize the GasModel instance with no recorded trade.
+
+        Params:
+            window (int): the number of recent trades of a route the statistics are kept over.
+            headroom (float): multiplier of the highest gas used in the window, on top of the largest refund.
+            estimate_headroom (float): multiplier of a gas estimate, less reliable than gas used.
+        """
+        self.window = window
+        self.headroom = headroom
+        self.estimate_headroom = estimate_headroom
+        self.gas_used = {}
+        self.estimates = {}
+        self.lock = threading.Lock()
+
+    def record(self, route, receipt):
+        """
+        Records the gas used by a mined trade of a route. Reverted trades are skipped, as they stop short of the full trade.
+
+        Params:
+            route (tuple): the route of the trade, e.g. (router1, router2, token1, token2).
+            receipt (receipt): the receipt of the trade transaction.
+
+        Returns:
+            none
+        """
+        if receipt is None or receipt["status"] != 1:
+            return
+        with self.lock:
+            if route not in self.gas_used:
+                self.gas_used[route] = deque(maxlen=self.window)
+            self.gas_used[route].append(receipt["gasUsed"])
+
+    def get_stats(self, route):
+        """
+        Gets the rolling statistics of the gas used by a route.
+
+        Params:
+            route (tuple): the route of the trades.
+
+        Returns:
+            (dict): the "count", "mean" and "max" gas used over the window, or None if the route has no recorded trade.
+        """
+        with self.lock:
+            gas_used = list(self.gas_used.get(route, ()))
+        if not gas_used:
+            return None
+        return {"count": len(gas_used), "mean": sum(gas_used) / len(gas_used), "max": max(gas_used)}
+
+    def get_gas_limit(self, route, estimate=None, default=DEFAULT_GAS_LIMIT):
+        """
+        Gets the gas limit of a trade on a route, from the recorded gas used if any, or else from the cached estimate of the route.
+        The gas used is scaled up by the largest possible refund, as gasUsed is measured after the refunds.
+
+        Params:
+            route (tuple): the route of the trade.
+            estimate (function): called without arguments to estimate the gas of the route if it has neither trades nor an estimate yet.
+            default (int): the gas limit if the route can't be estimated.
+
+        Returns:
+            (int): the gas limit of the trade.
+        """
+        stats = self.get_stats(route)
+        if stats is not None:
+            gas_spent = stats["max"] * MAX_REFUND_QUOTIENT / (MAX_REFUND_QUOTIENT - 1)
+            return max(int(gas_spent * self.headroom), self.estimates.get(route, 0))
+        if route not in self.estimates and estimate is not None:
+            try:
+                self.estimates[route] = int(estimate() * self.estimate_headroom)
+            except Exception:
+                return default # the estimate reverted, e.g. the route isn't profitable right now, so it's not cached
+        return self.estimates.get(route, default)
+
+    def track(self, route, callback=None):
+        """
+        Wraps a receipt tracker callback so that the gas used by the trade is recorded before the callback runs.
+
+        Params:
+            route (tuple): the route of the trade.
+            callback (function): called with the PendingTx once the trade is mined or dropped.
+
+        Returns:
+            (function): the callback to pass to the receipt tracker.
+        """
+        def on_receipt(pending_tx):
+            self.record(route, pending_tx.receipt)
+            if callback is not None:
+                callback(pending_tx)
+        return on_receipt
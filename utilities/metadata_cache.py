@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+'''
+metadata_cache.py
+
+Memoizes reads of on-chain values that never change once a contract is deployed, such as the decimals
+and symbol of a token, or the factory and WETH of a router. Values are keyed by chain ID, contract
+address and function name, and kept in memory for the whole process, so each one is read from the
+node once. The cache can also be kept in a JSON file, so that a warm restart reads none of them.
+
+A local hardhat node keeps the chain ID of its fork across restarts, so the cache file should be
+deleted after contracts are re-deployed on a restarted node.
+'''
+class MetadataCache:
+    """
+    Represents a cache of immutable contract reads.
+
+    Attributes:
+        path (str): the JSON file the cache is kept in, or None to keep it in memory only.
+        values (dict): the values read, keyed by "chain ID:address:function name".
+        chain_ids (dict): the chain ID of every node, keyed by node url.
+        lock (Lock): lock guarding values and the cache file.
+    """
+    def __init__(self, path=None):
+        """
+        Initialize the MetadataCache instance, loading the cache file if it exists.
+
+        Params:
+            path (str): the JSON file the cache is kept in, or None to keep it in memory only.
+        """
+        self.path = path
+        self.values = {}
+        self.chain_ids = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """
+        Loads the values kept in the cache file, if any.
+
+        Returns:
+            none
+        """
+        if self.path is not None and os.path.exists(self.path):
+            with open(self.path, "r") as cache_file:
+                self.values.update(json.load(cache_file))
+
+    def save(self):
+        """
+        Writes the values to the cache file, if any. The file is replaced at once, so a crash never leaves it half written.
+
+        Returns:
+            none
+        """
+        if self.path is None:
+            return
+        with open(self.path + ".tmp", "w") as cache_file:
+            json.dump(self.values, cache_file, indent=4)
+        os.replace(self.path + ".tmp", self.path)
+
+    def get_chain_id(self, web3):
+        """
+        Gets the chain ID of a node, reading it only the first time the node is seen.
+
+        Params:
+            web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+
+        Returns:
+            (int): the chain ID.
+        """
+        node = getattr(web3.provider, "endpoint_uri", None) or id(web3.provider)
+        if node not in self.chain_ids:
+            self.chain_ids[node] = web3.eth.chain_id
+        return self.chain_ids[node]
+
+    def call(self, contract_function):
+        """
+        Calls an immutable contract function without arguments, reading it from the node only on a cache miss.
+
+        Params:
+            contract_function (ContractFunction): the bound contract function to call, e.g. token.functions.decimals().
+
+        Returns:
+            the value returned by the function.
+        """
+        key = f"{self.get_chain_id(contract_function.w3)}:{contract_function.address}:{contract_function.fn_name}"
+        if key not in self.values:
+            value = contract_function.call()
+            with self.lock:
+                self.values[key] = value
+                self.save()
+        return self.values[key]
+
+metadata_cache = MetadataCache()
+
+def configure_metadata_cache(path):
+    """
+    Keeps the metadata cache of the process in a JSON file, and loads the values already in it.
+
+    Params:
+        path (str): the JSON file the cache is kept in.
+
+    Returns:
+        (MetadataCache): the metadata cache of the process.
+    """
+    with metadata_cache.lock:
+        metadata_cache.path = path
+        metadata_cache.load()
+    return metadata_cache
+
+def get_decimals(token_contract):
+    """
+    Gets the decimals of a token, read from the node once.
+
+    Params:
+        token_contract (Contract): Contract instance of the token.
+
+    Returns:
+        (int): the decimals of the token.
+    """
+    return metadata_cache.call(token_contract.functions.decimals())
+
+def get_symbol(token_contract):
+    """
+    Gets the symbol of a token, read from the node once.
+
+    Params:
+        token_contract (Contract): Contract instance of the token.
+
+    Returns:
+        (str): the symbol of the token.
+    """
+    return metadata_cache.call(token_contract.functions.symbol())
+
+def get_factory(router_contract):
+    """
+    Gets the factory address of a router, read from the node once.
+
+    Params:
+        router_contract (Contract): Contract instance of the router.
+
+    Returns:
+        (str): the address of the factory contract.
+    """
+    return metadata_cache.call(router_contract.functions.factory())
+
+def get_WETH(router_contract):
+    """
+    Gets the WETH address of a router, read from the node once.
+
+    Params:
+        router_contract (Contract): Contract instance of the router.
+
+    Returns:
+        (str): the address of the WETH contract.
+    """
+    return metadata_cache.call(router_contract.functions.WETH())
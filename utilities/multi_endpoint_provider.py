@@ -0,0 +1,223 @@
+import threading
+import time
+from concurrent.futures import (ThreadPoolExecutor, wait, FIRST_COMPLETED)
+from web3 import Web3
+from web3.providers.base import JSONBaseProvider
+'''
+multi_endpoint_provider.py
+
+Spreads the JSON-RPC requests of the bot over several nodes of the same chain, so that one slow or
+stalled node doesn't stall the bot. Every request goes to the fastest healthy node by its recent
+latency. Reads pinned to a block and still unanswered after a tail-latency threshold are hedged with a
+second request to the next node, and whichever answers first wins, which bounds the tail latency of the
+hot path. Nodes that keep failing are circuit-broken: they are skipped for a cooldown, then ranked with
+the other nodes again, and their circuit opens again on their next failure.
+
+Every other request is sent to one node at a time, and only fails over to the next node if a node can't
+be reached. Transactions would be broadcast twice, and the answer to a read of the latest or pending
+state depends on how far the node has synced: a lagging node could answer first with an old head, a
+short log range, a stale nonce or no receipt at all.
+'''
+# Position of the block parameter of the reads that can be pinned to a block
+BLOCK_PARAMS = {
+    "eth_call": 1,
+    "eth_getBalance": 1,
+    "eth_getCode": 1,
+    "eth_getStorageAt": 2,
+    "eth_getTransactionCount": 1,
+    "eth_getBlockByNumber": 0,
+}
+# Block tags whose block depends on how far the node has synced
+MOVING_BLOCK_TAGS = ("latest", "pending", "safe", "finalized")
+
+def is_block_pinned(method, params):
+    """
+    Checks whether a request is a read pinned to a block number or hash, which every synced node answers the same.
+
+    Params:
+        method (str): the JSON-RPC method.
+        params (list): the parameters of the method.
+
+    Returns:
+        (bool): true if the request can be hedged; false otherwise.
+    """
+    if method == "eth_chainId":
+        return True
+    index = BLOCK_PARAMS.get(method)
+    if index is None or len(params) <= index:
+        return False
+    block = params[index]
+    if isinstance(block, dict): # EIP-1898 block parameter
+        block = block.get("blockHash") or block.get("blockNumber")
+    return isinstance(block, int) or (isinstance(block, str) and block not in MOVING_BLOCK_TAGS)
+
+class Endpoint:
+    """
+    Represents a node behind the MultiEndpointProvider, and the health it was last seen in.
+
+    Attributes:
+        provider (HTTPProvider): the provider of the node.
+        latency (float): the moving average of the response time of the node in seconds, or None until it answers.
+        failures (int): the number of requests failed in a row.
+        open_until (float): the time the circuit of the node is open until, during which it is skipped.
+    """
+    def __init__(self, provider):
+        """
+        Initialize the Endpoint instance of a node.
+
+        Params:
+            provider (HTTPProvider): the provider of the node.
+        """
+        self.provider = provider
+        self.latency = None
+        self.failures = 0
+        self.open_until = 0
+
+class MultiEndpointProvider(JSONBaseProvider):
+    """
+    Represents a JSON-RPC provider routing every request to the fastest healthy of several nodes.
+
+    Attributes:
+        endpoints (list): the Endpoint of every node, in the order given.
+        hedge_after (float): seconds to wait for a read before hedging it with a request to the next node.
+        failure_threshold (int): the number of requests failing in a row that opens the circuit of a node.
+        cooldown (float): seconds the circuit of a node stays open before the node is tried again.
+        smoothing (float): weight of the last response time in the moving average latency of a node.
+        executor (ThreadPoolExecutor): the threads sending requests to the nodes.
+        lock (Lock): lock guarding the health of the endpoints.
+    """
+    def __init__(self, providers, hedge_after=0.25, failure_threshold=3, cooldown=5, smoothing=0.2, max_workers=32):
+        """
+        Initialize the MultiEndpointProvider instance.
+
+        Params:
+            providers (list): the HTTPProvider of every node, in order of preference until their latency is known.
+            hedge_after (float): seconds to wait for a read before hedging it with a request to the next node.
+            failure_threshold (int): the number of requests failing in a row that opens the circuit of a node.
+            cooldown (float): seconds the circuit of a node stays open before the node is tried again.
+            smoothing (float): weight of the last response time in the moving average latency of a node.
+            max_workers (int): the number of requests in flight at once at most, across all nodes.
+        """
+        super().__init__()
+        self.endpoints = [Endpoint(provider) for provider in providers]
+        self.hedge_after = hedge_after
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+
+    def get_ranked_endpoints(self):
+        """
+        Ranks the nodes by health, then by latency. Nodes with an open circuit come last, in case every node is failing,
+        and nodes whose latency isn't known yet come after the measured ones, in the order they were given.
+
+        Returns:
+            (list): the endpoints, the one to send the next request to first.
+        """
+        now = time.time()
+        with self.lock:
+            return sorted(self.endpoints, key=lambda endpoint: (endpoint.open_until > now, float('inf') if endpoint.latency is None else endpoint.latency))
+
+    @property
+    def endpoint_uri(self):
+        """
+        The url of the fastest healthy node, for callers posting to the node directly, e.g. RpcBatch.
+        """
+        return self.get_ranked_endpoints()[0].provider.endpoint_uri
+
+    def get_request_kwargs(self):
+        """
+        The keyword arguments of the HTTP requests to the fastest healthy node.
+        """
+        return self.get_ranked_endpoints()[0].provider.get_request_kwargs()
+
+    def record(self, endpoint, latency=None):
+        """
+        Records the outcome of a request to a node, and opens its circuit once it has failed failure_threshold times in a row.
+
+        Params:
+            endpoint (Endpoint): the endpoint of the node.
+            latency (float): the response time of the node in seconds, or None if the request failed.
+
+        Returns:
+            none
+        """
+        with self.lock:
+            if latency is None:
+                endpoint.failures += 1
+                if endpoint.failures >= self.failure_threshold:
+                    endpoint.open_until = time.time() + self.cooldown
+            else:
+                endpoint.failures = 0
+                endpoint.open_until = 0
+                if endpoint.latency is None:
+                    endpoint.latency = latency
+                else:
+                    endpoint.latency += self.smoothing * (latency - endpoint.latency)
+
+    def send(self, endpoint, method, params):
+        """
+        Sends a request to a node and records its outcome. A JSON-RPC error, e.g. a reverted call, is an answer and not a failure of the node.
+
+        Params:
+            endpoint (Endpoint): the endpoint of the node.
+            method (str): the JSON-RPC method.
+            params (list): the parameters of the method.
+
+        Returns:
+            (dict): the JSON-RPC response of the node.
+        """
+        start = time.time()
+        try:
+            response = endpoint.provider.make_request(method, params)
+        except Exception:
+            self.record(endpoint)
+            raise
+        self.record(endpoint, time.time() - start)
+        return response
+
+    def make_request(self, method, params):
+        """
+        Sends a request to the fastest healthy node. A read pinned to a block still unanswered after hedge_after seconds is
+        also sent to the next node, and a request that failed is sent to the next node right away. The first answer is returned.
+
+        Params:
+            method (str): the JSON-RPC method.
+            params (list): the parameters of the method.
+
+        Returns:
+            (dict): the JSON-RPC response of the first node to answer.
+        """
+        endpoints = self.get_ranked_endpoints()
+        hedged = is_block_pinned(method, params)
+        pending = set()
+        error = None
+        while endpoints or pending:
+            if endpoints:
+                pending.add(self.executor.submit(self.send, endpoints.pop(0), method, params))
+            # wait for an answer, or for the hedging threshold if there's a node left to hedge with
+            done, pending = wait(pending, timeout=self.hedge_after if hedged and endpoints else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+def create_multi_endpoint_provider(node_urls, session_factory, timeout, hedge_after=0.25, failure_threshold=3, cooldown=5):
+    """
+    Creates a MultiEndpointProvider with a keep-alive session per node.
+
+    Params:
+        node_urls (list): the urls of the nodes, in order of preference until their latency is known.
+        session_factory (function): creates the keep-alive HTTP session of a node.
+        timeout (float): seconds to wait for a response of a node.
+        hedge_after (float): seconds to wait for a read before hedging it with a request to the next node.
+        failure_threshold (int): the number of requests failing in a row that opens the circuit of a node.
+        cooldown (float): seconds the circuit of a node stays open before the node is tried again.
+
+    Returns:
+        (MultiEndpointProvider): the provider.
+    """
+    providers = [Web3.HTTPProvider(node_url, request_kwargs={'timeout': timeout}, session=session_factory()) for node_url in node_urls]
+    return MultiEndpointProvider(providers, hedge_after=hedge_after, failure_threshold=failure_threshold, cooldown=cooldown)
@@ -0,0 +1,173 @@
+from utilities.trading_utilities import (sign_and_send_tx)
+from utilities.nonce_manager import (get_nonce_manager)
+'''
+multicall.py
+
+Aggregates read-only contract calls into a single eth_call through a Multicall contract.
+Uses the canonical Multicall3 deployment when the chain has it, and otherwise deploys the
+Multicall contract in contracts/Multicall.vy from the creation code embedded below, so that no
+compile step is needed before the fallback is used.
+'''
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+# Creation code of contracts/Multicall.vy, compiled with vyper 0.4.3: vyper -f bytecode contracts/Multicall.vy
+MULTICALL_BYTECODE = (
+    "0x61062161001161000039610621610000f35f3560e01c60026003821660011b61061901601e395f51565b63252dba42"
+    "8118610611576023361115610615576004356004016104008135116106155780355f8161040081116106155780156100"
+    "a457905b8060051b6020850101356020850101610140820260600181358060a01c610615578152602082013582018035"
+    "61010081116106155750602081350160208301818382375050505050600101818118610051575b50508060405250505f"
+    "62050060525f604051610400811161061557801561021e57905b61014081026060018051620980805260208101602081"
+    "51018082620980a05e505050604036620981c03762098080515a620980a0610100620983208251602084015f8787f190"
+    "509050905062098420523d61010081183d61010010021862098300526209830060208151018082620984405e50506209"
+    "842051620981c05260206209844051018062098440620981e05e50620981c0516101e057602080620983605260206209"
+    "8300527f4d756c746963616c6c206167677265676174653a2063616c6c206661696c6564620983205262098300816209"
+    "836001604082825e8051806020830101601f825f03163682375050601f19601f82516020010116905090508101905063"
+    "08c379a06209834052806004016209835cfd5b62050060516103ff8111610615576020620981e0510161012082026205"
+    "00800181620981e0825e5050600181016205006052506001018181186100c7575b5050604043620980805280620980a0"
+    "528062098080015f62050060518083528060051b5f8261040081116106155780156102ab57905b828160051b60208801"
+    "01526101208102620500800183602088010160208251018083835e508051806020830101601f825f0316368237505060"
+    "1f19601f825160200101169050905083019250600101818118610254575b505082016020019150509050810190506209"
+    "8080f35b63bce38bd78118610611576043361115610615576004358060011c6106155760405260243560040161040081"
+    "35116106155780355f81610400811161061557801561035b57905b8060051b6020850101356020850101610140820260"
+    "800181358060a01c61061557815260208201358201803561010081116106155750602081350160208301818382375050"
+    "505050600101818118610308575b50508060605250505f62050080525f606051610400811161061557801561050f5790"
+    "5b61014081026080018051620a00a0526020810160208151018082620a00c05e505050604036620a01e037620a00a051"
+    "5a620a00c0610100620a03408251602084015f8787f1905090509050620a0440523d61010081183d610100100218620a"
+    "032052620a032060208151018082620a04605e5050620a044051620a01e0526020620a0460510180620a0460620a0200"
+    "5e50604051156104c557620a01e0516104c557602080620a03a0526023620a0320527f4d756c746963616c6c20747279"
+    "4167677265676174653a2063616c6c20666169620a0340527f6c65640000000000000000000000000000000000000000"
+    "000000000000000000620a036052620a032081620a03a001604382825e8051806020830101601f825f03163682375050"
+    "601f19601f8251602001011690509050810190506308c379a0620a03805280600401620a039cfd5b62050080516103ff"
+    "8111610615576101408102620500a001620a01e05181526020620a020051016020820181620a0200825e505050600181"
+    "0162050080525060010181811861037e575b5050602080620a00a05280620a00a0015f62050080518083528060051b5f"
+    "8261040081116106155780156105b157905b828160051b6020880101526101408102620500a001836020880101604082"
+    "5182528060208301526020830181830160208251018083835e508051806020830101601f825f03163682375050601f19"
+    "601f825160200101169050905081019050905090508301925060010181811861053f575b505082016020019150509050"
+    "81019050620a00a0f35b6342cbb15c81186105e15734610615574360405260206040f35b634d2301cc81186106115760"
+    "2436103417610615576004358060a01c610615576040526040513160605260206060f35b5f5ffd5b5f80fd05c7061100"
+    "1802c18558202dd2f03007937291d531bfbb50313549e3214c2318cb24938a072c9150b60751190621810800a1657679"
+    "706572830004030036"
+)
+
+MULTICALL_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall.Call[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate",
+        "outputs": [
+            {"internalType": "uint256", "name": "blockNumber", "type": "uint256"},
+            {"internalType": "bytes[]", "name": "returnData", "type": "bytes[]"}
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "bool", "name": "requireSuccess", "type": "bool"},
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall.Call[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "tryAggregate",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getBlockNumber",
+        "outputs": [{"internalType": "uint256", "name": "blockNumber", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "addr", "type": "address"}],
+        "name": "getEthBalance",
+        "outputs": [{"internalType": "uint256", "name": "balance", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+def deploy_multicall(web3, private_key):
+    """
+    Deploys the Multicall contract from its embedded creation code on the connected chain.
+
+    Params:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        private_key (str): private key of the deployer.
+
+    Returns:
+        (str): address of the deployed Multicall contract.
+    """
+    deployer_address = web3.eth.account.from_key(private_key).address
+    multicall_factory = web3.eth.contract(abi=MULTICALL_ABI, bytecode=MULTICALL_BYTECODE)
+    tx = multicall_factory.constructor().build_transaction({
+        'from': deployer_address,
+        'chainId': web3.eth.chain_id,
+        'nonce': get_nonce_manager(web3, deployer_address).allocate(),
+        'gas': 1000000,
+        'maxFeePerGas': web3.to_wei('100', 'gwei'),  # Adjust these values according to network conditions
+        'maxPriorityFeePerGas': web3.to_wei('2', 'gwei')
+    })
+    receipt = sign_and_send_tx(web3, tx, private_key)
+    print(f"Multicall deployed at {receipt['contractAddress']}")
+    return receipt['contractAddress']
+
+def get_multicall(web3, private_key=None, multicall_address=MULTICALL3_ADDRESS):
+    """
+    Gets a Multicall contract instance, deploying the Multicall contract if none exists at multicall_address.
+
+    Params:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        private_key (str): private key of the deployer, only used when a deployment is needed.
+        multicall_address (str): address of an already deployed Multicall contract.
+
+    Returns:
+        (Contract): Contract instance of the Multicall contract.
+    """
+    if len(web3.eth.get_code(multicall_address)) == 0:
+        if private_key is None:
+            raise Exception(f"No Multicall contract at {multicall_address} and no deployer key provided")
+        multicall_address = deploy_multicall(web3, private_key)
+    return web3.eth.contract(address=multicall_address, abi=MULTICALL_ABI)
+
+def aggregate(multicall, calls, block_identifier='latest'):
+    """
+    Executes a list of read-only calls in a single eth_call.
+
+    Params:
+        multicall (Contract): Contract instance of the Multicall contract.
+        calls (list): list of (target address, call data bytes) tuples.
+        block_identifier (int or str): block number or tag to pin the calls to.
+
+    Returns:
+        block_number (int): the block number the calls were executed against.
+        return_data (list): raw return data bytes of each call, in the order of calls.
+    """
+    block_number, return_data = multicall.functions.aggregate(calls).call(block_identifier=block_identifier)
+    return block_number, return_data
@@ -0,0 +1,142 @@
+import threading
+'''
+nonce_manager.py
+
+Allocates transaction nonces locally so that a sender only reads its transaction count from the
+chain once, and several transactions of the same sender can be in flight at once. Allocation is
+thread-safe, and the allocator resyncs with the pending transaction count of the chain whenever a
+nonce is rejected, a transaction is dropped, or an allocated nonce is never sent.
+'''
+# Fragments of the JSON-RPC error messages of nodes rejecting a transaction for its nonce
+NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "invalid nonce",
+)
+# Fragments of the JSON-RPC error messages of nodes that already have the exact transaction sent
+ALREADY_KNOWN_ERRORS = (
+    "already known",
+    "known transaction",
+)
+
+nonce_managers = {}
+nonce_managers_lock = threading.Lock()
+
+class NonceManager:
+    """
+    Represents the local nonce allocator of a sender.
+
+    Attributes:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        address (str): address of the sender.
+        next_nonce (int): the next nonce to allocate, or None until synced with the chain.
+        lock (Lock): lock guarding next_nonce.
+    """
+    def __init__(self, web3, address):
+        """
+        Initialize the NonceManager instance of a sender. The chain is only read on the first allocation.
+
+        Params:
+            web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+            address (str): address of the sender.
+        """
+        self.web3 = web3
+        self.address = address
+        self.next_nonce = None
+        self.lock = threading.Lock()
+
+    def allocate(self):
+        """
+        Allocates the next nonce of the sender.
+
+        Returns:
+            (int): the allocated nonce.
+        """
+        with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = self.web3.eth.get_transaction_count(self.address, 'pending')
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    def peek(self):
+        """
+        Gets the next nonce of the sender without allocating it, e.g. to pre-sign a transaction that may never be sent.
+
+        Returns:
+            (int): the next nonce to allocate.
+        """
+        with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = self.web3.eth.get_transaction_count(self.address, 'pending')
+            return self.next_nonce
+
+    def claim(self, nonce):
+        """
+        Allocates a peeked nonce if it's still the next one.
+
+        Params:
+            nonce (int): the nonce returned by peek.
+
+        Returns:
+            (bool): true if the nonce was allocated; false if it was allocated to another transaction in between.
+        """
+        with self.lock:
+            if self.next_nonce != nonce:
+                return False
+            self.next_nonce += 1
+            return True
+
+    def resync(self):
+        """
+        Resets the next nonce to the pending transaction count of the sender on the chain.
+
+        Returns:
+            (int): the next nonce to allocate.
+        """
+        with self.lock:
+            self.next_nonce = self.web3.eth.get_transaction_count(self.address, 'pending')
+            return self.next_nonce
+
+def get_nonce_manager(web3, address):
+    """
+    Gets the nonce manager of a sender, shared by every transaction helper of the process.
+
+    Params:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        address (str): address of the sender.
+
+    Returns:
+        (NonceManager): the nonce manager of the sender.
+    """
+    with nonce_managers_lock:
+        if address not in nonce_managers:
+            nonce_managers[address] = NonceManager(web3, address)
+        return nonce_managers[address]
+
+def is_nonce_error(error):
+    """
+    Checks whether a node rejected a transaction for its nonce.
+
+    Params:
+        error (Exception): the error raised when sending the transaction.
+
+    Returns:
+        (bool): true if the transaction was rejected for its nonce; false otherwise.
+    """
+    message = str(error).lower()
+    return any(fragment in message for fragment in NONCE_ERRORS)
+
+def is_already_known(error):
+    """
+    Checks whether a node rejected a transaction because it already has it, e.g. from an earlier send that timed out.
+    The transaction is in flight, so it must not be signed again with another nonce.
+
+    Params:
+        error (Exception): the error raised when sending the transaction.
+
+    Returns:
+        (bool): true if the node already has the transaction; false otherwise.
+    """
+    message = str(error).lower()
+    return any(fragment in message for fragment in ALREADY_KNOWN_ERRORS)
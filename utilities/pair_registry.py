@@ -0,0 +1,195 @@
+from web3 import Web3
+from utilities.metadata_cache import (get_factory)
+'''
+pair_registry.py
+
+Keeps a persistent registry of Uniswap V2-style pair contracts so that a pair only needs to be
+resolved once per process. Pair addresses are derived offline with CREATE2 from the factory address,
+the sorted token addresses and the init code hash of the dex, and only fall back to an on-chain
+factory.getPair() call when the init code hash of the dex is unknown.
+'''
+# keccak256 of the pair creation code, keyed by the factory address of each dex.
+# Dexes missing from this dict are resolved through factory.getPair() once per pair.
+INIT_CODE_HASHES = {
+    "0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f": "0x96e8ac4277198ff8b6f785478aa9a39f403cb768dd02cbee326c3e7da348845f", # UniswapV2Factory
+    "0xC0AEe478e3658e2610c5F7A4A2E1777cE9e4f2Ac": "0xe18a34eb0e04b04f7a0ac29a6e80748dca96319b42c54d679cb821dca90c6303", # SushiSwap UniswapV2Factory
+    "0x1097053Fd2ea711dad45caCcc45EfF7548fCB362": "0x57224589c67f3f30a6b0d7a1b54cf3153ab84563bc609ef41dfb34f8b2974d2d", # PancakeFactory
+}
+
+UNISWAP_V2_PAIR_ABI = [
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "getReserves",
+        "outputs": [
+            {"name": "_reserve0", "type": "uint112"},
+            {"name": "_reserve1", "type": "uint112"},
+            {"name": "_blockTimestampLast", "type": "uint32"},
+        ],
+        "payable": False,
+        "stateMutability": "view",
+        "type": "function",
+    },
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "token0",
+        "outputs": [{"name": "", "type": "address"}],
+        "payable": False,
+        "stateMutability": "view",
+        "type": "function",
+    },
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "token1",
+        "outputs": [{"name": "", "type": "address"}],
+        "payable": False,
+        "stateMutability": "view",
+        "type": "function",
+    },
+]
+
+def sort_tokens(tokenA_address, tokenB_address):
+    """
+    Sorts two token addresses the same way a Uniswap V2 factory does.
+
+    Params:
+        tokenA_address (str): address of a token contract.
+        tokenB_address (str): address of a token contract.
+
+    Returns:
+        (tuple): (token0, token1) where token0 has the smaller address.
+    """
+    if int(tokenA_address, 16) < int(tokenB_address, 16):
+        return tokenA_address, tokenB_address
+    return tokenB_address, tokenA_address
+
+def compute_pair_address(factory_address, tokenA_address, tokenB_address, init_code_hash):
+    """
+    Derives the CREATE2 address of the tokenA/tokenB pair deployed by a Uniswap V2-style factory.
+
+    Params:
+        factory_address (str): address of the factory contract.
+        tokenA_address (str): address of a token contract.
+        tokenB_address (str): address of a token contract.
+        init_code_hash (str): hex value of keccak256 of the pair creation code of the dex.
+
+    Returns:
+        (str): checksum address of the pair contract.
+    """
+    token0, token1 = sort_tokens(tokenA_address, tokenB_address)
+    salt = Web3.keccak(bytes.fromhex(token0[2:]) + bytes.fromhex(token1[2:]))
+    pair_address = Web3.keccak(
+        b'\xff'
+        + bytes.fromhex(factory_address[2:])
+        + salt
+        + bytes.fromhex(init_code_hash[2:])
+        )[12:]
+    return Web3.to_checksum_address(pair_address)
+
+class PairRegistry:
+    """
+    Represents a persistent registry of pair contracts across dexes.
+
+    Attributes:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        factory_abi (str): abi of a uniswap v2 factory contract.
+        pair_abi (str): abi of a uniswap v2 pair contract.
+        init_code_hashes (dict): init code hash of the pair contract keyed by factory address.
+        pair_addresses (dict): pair address keyed by (factory address, token0, token1).
+        pairs (dict): pair Contract instance keyed by pair address.
+    """
+    def __init__(self, web3, factory_abi, pair_abi=UNISWAP_V2_PAIR_ABI, init_code_hashes=INIT_CODE_HASHES):
+        """
+        Initialize the PairRegistry instance with the ABIs used to build factory and pair contracts.
+
+        Params:
+            web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+            factory_abi (str): abi of a uniswap v2 factory contract.
+            pair_abi (str): abi of a uniswap v2 pair contract.
+            init_code_hashes (dict): init code hash of the pair contract keyed by factory address.
+        """
+        self.web3 = web3
+        self.factory_abi = factory_abi
+        self.pair_abi = pair_abi
+        self.init_code_hashes = init_code_hashes
+        self.pair_addresses = {}
+        self.pairs = {}
+
+    def get_factory_address(self, router):
+        """
+        Gets the factory address of a router from the metadata cache, so router.factory() is only called on a cache miss.
+
+        Params:
+            router (Contract): Contract instance of a router.
+
+        Returns:
+            (str): address of the factory contract of the router.
+        """
+        return get_factory(router)
+
+    def get_pair_address(self, router, tokenA_address, tokenB_address):
+        """
+        Gets the address of the tokenA/tokenB pair on a router. The address is derived offline when the
+        init code hash of the factory is known, and is otherwise looked up once through factory.getPair().
+        A derived address is not checked on-chain, so routes should only hold pairs that exist, as populate_routes checks.
+
+        Params:
+            router (Contract): Contract instance of a router.
+            tokenA_address (str): address of a token contract.
+            tokenB_address (str): address of a token contract.
+
+        Returns:
+            (str): address of the pair contract. If the pair does not exist, the derived address has no code,
+                and the address looked up through factory.getPair() is the zero address.
+        """
+        factory_address = self.get_factory_address(router)
+        token0, token1 = sort_tokens(tokenA_address, tokenB_address)
+        key = (factory_address, token0, token1)
+        if key not in self.pair_addresses:
+            init_code_hash = self.init_code_hashes.get(factory_address)
+            if init_code_hash is not None:
+                pair_address = compute_pair_address(factory_address, token0, token1, init_code_hash)
+            else:
+                factory = self.web3.eth.contract(address=factory_address, abi=self.factory_abi)
+                pair_address = factory.functions.getPair(token0, token1).call()
+            self.pair_addresses[key] = pair_address
+        return self.pair_addresses[key]
+
+    def get_pair_contract(self, router, tokenA_address, tokenB_address):
+        """
+        Gets the ready-built pair contract of tokenA/tokenB on a router.
+
+        Params:
+            router (Contract): Contract instance of a router.
+            tokenA_address (str): address of a token contract.
+            tokenB_address (str): address of a token contract.
+
+        Returns:
+            (Contract): the pair contract of two tokens on the router.
+        """
+        pair_address = self.get_pair_address(router, tokenA_address, tokenB_address)
+        if pair_address not in self.pairs:
+            self.pairs[pair_address] = self.web3.eth.contract(address=pair_address, abi=self.pair_abi)
+        return self.pairs[pair_address]
+
+    def register_routes(self, routes, router_dict):
+        """
+        Resolves the pair contracts behind every route ahead of the first scan.
+
+        Params:
+            routes (list): routes as in data["routes"] of the mainnet config.
+            router_dict (dict): router Contract instances keyed by router address.
+
+        Returns:
+            pair_addresses (list): distinct addresses of the pair contracts behind the routes.
+        """
+        pair_addresses = []
+        for route in routes:
+            for router_address in (route["router1"], route["router2"]):
+                pair_address = self.get_pair_address(router_dict[router_address], route["token1"], route["token2"])
+                self.get_pair_contract(router_dict[router_address], route["token1"], route["token2"])
+                if pair_address not in pair_addresses:
+                    pair_addresses.append(pair_address)
+        return pair_addresses
@@ -1,10 +1,11 @@
-from web3 import Web3
 import json
 import requests
 import os
 import argparse
 from dotenv import load_dotenv
 from utilities.trading_utilities import(get_token_decimals)
+from utilities.metadata_cache import (get_symbol)
+from utilities.rpc_client import (get_web3)
 '''
 populate_routes.py
 
@@ -15,23 +16,28 @@ Command-line arguments:
   -h, --help  show this help message and exit
   --ABI       Populate ABI files for the router contracts in mainnet.json.
   --route     Populate viable trade routes for two tokens on two dexes in mainnet.json.
+  --config    Path of the config to use instead of configs/mainnet.json, e.g. configs/mainnet_full.json.
 
 Author: ILnaw
 Version: 08-14-2024
 '''
-def setup():
+CONFIG_PATH = "configs/mainnet.json"
+
+def setup(config_path=CONFIG_PATH):
     '''
     Connect to the localhost, and loads configs.
 
+    Params:
+        config_path (str): path of the mainnet json config to load.
+
     Returns:
         web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
         data (dict): mainnet json config data.
         api_key (str): key of the Etherscan api.
         api_url (str): url of Etherscan.
     '''
-    # Connect to a mainnet node.
-    node_url = "http://127.0.0.1:8545"
-    web3 = Web3(Web3.HTTPProvider(node_url))
+    # Connect to a mainnet node through the RPC client shared by the whole process.
+    web3 = get_web3()
 
     if not web3.is_connected():
         raise Exception("Unable to connect to localhost")
@@ -39,7 +45,7 @@ def setup():
         print("Connected to localhost")
         
     #Convert JSON file into a Python dictionary
-    with open("configs/mainnet.json", "r") as file:
+    with open(config_path, "r") as file:
         data = json.load(file)
         print("Data read from json file.")
     
@@ -127,7 +133,7 @@ def create_contract_ABI(dex_contract, api_key, api_url):
     else:
         print("Failed to fetch ABI")
 
-def populate_routes(data, web3):
+def populate_routes(data, web3, config_path=CONFIG_PATH):
     '''
     Populates routes in mainnet.json by permutating the combination of routers and tokens, 
     and checking if there's a viable trade route on-chain.
@@ -135,6 +141,7 @@ def populate_routes(data, web3):
     Param:
         web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
         data (dict): mainnet json config data.
+        config_path (str): path of the mainnet json config the routes are written to.
     '''
     # Remove all existing routes
     data["routes"] = []
@@ -161,7 +168,7 @@ def populate_routes(data, web3):
                         data["routes"].append(route)
     
     # Write the updated data back to the JSON file
-    with open("configs/mainnet.json", "w") as file:
+    with open(config_path, "w") as file:
         json.dump(data, file, indent=4)
         print("All possible routes checked and written to json.")
                             
@@ -197,7 +204,7 @@ def check_route(router1_name, router1_address, router2_name, router2_address, to
     is_valid_on_router2 = is_valid_pair(router2, token1_address, token2_address, web3)
 
     if is_valid_on_router1 and is_valid_on_router2:
-        print(f"Route valid on {router1_name} and {router2_name} for {token1.functions.symbol().call()} and {token2.functions.symbol().call()}")
+        print(f"Route valid on {router1_name} and {router2_name} for {get_symbol(token1)} and {get_symbol(token2)}")
         return True
     return False
 
@@ -227,8 +234,6 @@ def is_valid_pair(router, token1, token2, web3):
         return False
 
 if __name__ == "__main__":
-    web3, data, api_key, api_url = setup()
-
     # create the command-line parser
     parser = argparse.ArgumentParser(description="Completed arbitrage config setup process, parsing arguments...")
 
@@ -236,19 +241,21 @@ if __name__ == "__main__":
     parser.add_argument('--ABI', action='store_true', help='Populate ABI files for the router contracts in mainnet.json.')
     parser.add_argument('--route', action='store_true', help='Populate viable trade routes for two tokens on two dexes in mainnet.json.')
     parser.add_argument('--checksum', action='store_true', help='Convert addresses in mainnet.json to checksum format.')
+    parser.add_argument('--config', default=CONFIG_PATH, help='Path of the config to use instead of configs/mainnet.json.')
 
     # parse the arguments
     args = parser.parse_args()
+    web3, data, api_key, api_url = setup(args.config)
 
     # access the arguments
     if args.ABI:
         populate_ABIs(data, api_key, api_url)
     if args.route:
-        populate_routes(data, web3)
+        populate_routes(data, web3, args.config)
     if args.checksum:
         checksum(web3, data)
         # Write the updated data back to the JSON file
-        with open("configs/mainnet.json", "w") as file:
+        with open(args.config, "w") as file:
             json.dump(data, file, indent=4)
             print("Updated routes and addresses written to json file.")
 
@@ -0,0 +1,180 @@
+from web3.exceptions import ContractLogicError
+from utilities.pair_registry import (sort_tokens)
+'''
+quote_engine.py
+
+Quotes Uniswap V2-style swaps off-chain from cached reserves with the exact integer rounding of
+UniswapV2Library.getAmountOut, so a round-trip arbitrage can be priced without any eth_call.
+A verification mode checks every quote against Arbitrage.estimateTradeReturn on the local fork.
+'''
+# (fee numerator, fee denominator) of the swap fee charged by each router, keyed by router address.
+DEX_FEES = {
+    "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D": (997, 1000), # UniswapV2Router02, 0.3%
+    "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F": (997, 1000), # SushiSwapV2Router02, 0.3%
+    "0xEfF92A263d31888d860bD50809A8D171709b7b1c": (9975, 10000), # PancakeRouter, 0.25%
+}
+DEFAULT_FEE = (997, 1000)
+
+def get_amount_out(amount_in, reserve_in, reserve_out, fee_numerator=997, fee_denominator=1000):
+    """
+    Computes the output amount of a swap the same way UniswapV2Library.getAmountOut does.
+    The library reverts on a zero input or empty reserves, which is quoted as a zero output here.
+
+    Params:
+        amount_in (int): the amount in wei to be traded in.
+        reserve_in (int): reserve of the token traded in.
+        reserve_out (int): reserve of the token traded out.
+        fee_numerator (int): numerator of the share of amount_in left after the swap fee.
+        fee_denominator (int): denominator of the share of amount_in left after the swap fee.
+
+    Returns:
+        (int): the amount in wei of the token traded out.
+    """
+    if amount_in <= 0 or reserve_in <= 0 or reserve_out <= 0:
+        return 0
+    amount_in_with_fee = amount_in * fee_numerator
+    numerator = amount_in_with_fee * reserve_out
+    denominator = reserve_in * fee_denominator + amount_in_with_fee
+    return numerator // denominator
+
+class QuoteEngine:
+    """
+    Represents an off-chain quote engine for round-trip arbitrage trades on two routers.
+
+    Attributes:
+        pair_registry (PairRegistry): registry of the pair contracts on all routers.
+        reserves (ReserveSnapshot or ReserveBook): cached reserves to quote from.
+        fees (dict): (fee numerator, fee denominator) keyed by router address.
+        arb_bot (ArbBot): ArbBot instance used to verify quotes on-chain.
+        verify (bool): whether every round-trip quote is checked against estimateTradeReturn.
+    """
+    def __init__(self, pair_registry, reserves, fees=DEX_FEES, arb_bot=None, verify=False):
+        """
+        Initialize the QuoteEngine instance with the pair registry, the reserves to quote from and the router fees.
+
+        Params:
+            pair_registry (PairRegistry): registry of the pair contracts on all routers.
+            reserves (ReserveSnapshot or ReserveBook): cached reserves to quote from.
+            fees (dict): (fee numerator, fee denominator) keyed by router address.
+            arb_bot (ArbBot): ArbBot instance used to verify quotes on-chain.
+            verify (bool): whether every round-trip quote is checked against estimateTradeReturn.
+        """
+        self.pair_registry = pair_registry
+        self.reserves = reserves
+        self.fees = fees
+        self.arb_bot = arb_bot
+        self.verify = verify
+
+    def get_fee(self, router):
+        """
+        Gets the swap fee of a router.
+
+        Params:
+            router (Contract): Contract instance of a router.
+
+        Returns:
+            (tuple): (fee numerator, fee denominator) of the router.
+        """
+        return self.fees.get(router.address, DEFAULT_FEE)
+
+    def get_reserves(self, router, token_in, token_out):
+        """
+        Gets the reserves of the token_in/token_out pair on a router ordered as (reserve_in, reserve_out).
+
+        Params:
+            router (Contract): Contract instance of a router.
+            token_in (str): the address of the token to be traded in.
+            token_out (str): the address of the trade return token.
+
+        Returns:
+            (tuple): (reserve_in, reserve_out) of the pair.
+        """
+        pair_address = self.pair_registry.get_pair_address(router, token_in, token_out)
+        reserve0, reserve1, _ = self.reserves.get_reserves(pair_address)
+        token0, _ = sort_tokens(token_in, token_out)
+        if token_in == token0:
+            return reserve0, reserve1
+        return reserve1, reserve0
+
+    def quote(self, router, token_in, token_out, amount_in):
+        """
+        Quotes a single swap on a router from the cached reserves.
+
+        Params:
+            router (Contract): Contract instance of a router.
+            token_in (str): the address of the token to be traded in.
+            token_out (str): the address of the trade return token.
+            amount_in (int): the amount in wei to be traded in.
+
+        Returns:
+            (int): the amount in wei of token_out returned by the swap.
+        """
+        reserve_in, reserve_out = self.get_reserves(router, token_in, token_out)
+        fee_numerator, fee_denominator = self.get_fee(router)
+        return get_amount_out(amount_in, reserve_in, reserve_out, fee_numerator, fee_denominator)
+
+    def quote_round_trip(self, router1, router2, token1, token2, amount):
+        """
+        Quotes swapping amount of token1 to token2 on router1, and token2 back to token1 on router2,
+        mirroring Arbitrage.estimateTradeReturn.
+
+        Params:
+            router1 (Contract): Contract instance of a router.
+            router2 (Contract): Contract instance of a router.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+
+        Returns:
+            (int): The estimated amount of return in token1.
+        """
+        amount_out1 = self.quote(router1, token1, token2, amount)
+        amount_out2 = self.quote(router2, token2, token1, amount_out1)
+        if self.verify and amount > 0: # the routers revert on a zero input, which is quoted as a zero return
+            self.verify_round_trip(router1, router2, token1, token2, amount, amount_out2)
+        return amount_out2
+
+    def quote_path(self, routers, path, amount):
+        """
+        Quotes swapping amount of path[0] along a multi-hop path, hop i trading path[i] to path[i+1] on routers[i].
+
+        Params:
+            routers (list): Contract instances of the router of every hop.
+            path (list): addresses of the tokens along the path.
+            amount (int): The amount of path[0] to trade with.
+
+        Returns:
+            (int): The estimated amount of return in path[-1].
+        """
+        amount_out = amount
+        for router, token_in, token_out in zip(routers, path, path[1:]):
+            amount_out = self.quote(router, token_in, token_out, amount_out)
+        return amount_out
+
+    def verify_round_trip(self, router1, router2, token1, token2, amount, quoted_return):
+        """
+        Checks an off-chain round-trip quote against Arbitrage.estimateTradeReturn at the block of the cached reserves.
+        An estimate that reverts is reported as a mismatch rather than raised, so verification never stops the scan.
+
+        Params:
+            router1 (Contract): Contract instance of a router.
+            router2 (Contract): Contract instance of a router.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+            quoted_return (int): The off-chain quote to check.
+
+        Returns:
+            (bool): true if the off-chain quote matches the on-chain estimate; false otherwise.
+        """
+        try:
+            on_chain_return = self.arb_bot.estimate_return(
+                router1.address, router2.address, token1, token2, amount,
+                block_identifier=self.reserves.block_number)
+        except ContractLogicError as error:
+            print(f"Quote mismatch for {token1} -> {token2} on {router1.address} then {router2.address}: off-chain {quoted_return}, on-chain reverted: {error}")
+            return False
+        if on_chain_return != quoted_return:
+            print(f"Quote mismatch for {token1} -> {token2} on {router1.address} then {router2.address}: off-chain {quoted_return}, on-chain {on_chain_return}")
+            return False
+        return True
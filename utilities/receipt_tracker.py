@@ -0,0 +1,189 @@
+import threading
+import time
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+from utilities.nonce_manager import get_nonce_manager
+'''
+receipt_tracker.py
+
+Tracks sent transactions in a background thread so that the scanner never blocks on a receipt.
+Receipts of all pending transactions are polled together once per new block, and a completion
+callback is fired for every transaction once it is mined or given up on as dropped. A dropped
+transaction leaves a gap in the nonces of its sender, so the nonce manager of the sender is resynced.
+'''
+class PendingTx:
+    """
+    Represents the handle of a sent transaction.
+
+    Attributes:
+        tx_hash (HexBytes): the hash of the transaction.
+        callback (function): called with the PendingTx once the transaction is mined or dropped.
+        sender (str): address of the sender, whose nonces are resynced if the transaction is dropped.
+        sent_at (float): the time the transaction was sent.
+        finalized_at (float): the time the receipt was found, or None while pending.
+        receipt (receipt): the receipt of the transaction, or None while pending or if dropped.
+        dropped (bool): whether the transaction was given up on before a receipt was found.
+        checked_block (int): the last block the receipt was polled at.
+        done (Event): set once the transaction is mined or dropped.
+    """
+    def __init__(self, tx_hash, callback=None, sender=None):
+        """
+        Initialize the PendingTx instance of a transaction that was just sent.
+
+        Params:
+            tx_hash (HexBytes): the hash of the transaction.
+            callback (function): called with the PendingTx once the transaction is mined or dropped.
+            sender (str): address of the sender, whose nonces are resynced if the transaction is dropped.
+        """
+        self.tx_hash = tx_hash
+        self.callback = callback
+        self.sender = sender
+        self.sent_at = time.time()
+        self.finalized_at = None
+        self.receipt = None
+        self.dropped = False
+        self.checked_block = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the transaction is mined or dropped.
+
+        Params:
+            timeout (float): seconds to wait at most. Waits forever if none.
+
+        Returns:
+            (receipt): the receipt of the transaction, or None if it's still pending or was dropped.
+        """
+        self.done.wait(timeout)
+        return self.receipt
+
+class ReceiptTracker:
+    """
+    Represents a background tracker of pending transaction receipts.
+
+    Attributes:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        poll_interval (float): seconds between two polls for a new block.
+        timeout (float): seconds after which a pending transaction is considered dropped.
+        pending (dict): PendingTx instances keyed by transaction hash.
+        lock (Lock): lock guarding pending.
+        thread (Thread): the background polling thread.
+        running (bool): whether the background thread should keep polling.
+    """
+    def __init__(self, web3, poll_interval=0.2, timeout=120):
+        """
+        Initialize the ReceiptTracker instance. Polling starts with start().
+
+        Params:
+            web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+            poll_interval (float): seconds between two polls for a new block.
+            timeout (float): seconds after which a pending transaction is considered dropped.
+        """
+        self.web3 = web3
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+
+    def track(self, tx_hash, callback=None, sender=None):
+        """
+        Starts tracking a sent transaction.
+
+        Params:
+            tx_hash (HexBytes): the hash of the transaction.
+            callback (function): called with the PendingTx once the transaction is mined or dropped.
+            sender (str): address of the sender, whose nonces are resynced if the transaction is dropped.
+
+        Returns:
+            (PendingTx): the handle of the transaction.
+        """
+        pending_tx = PendingTx(tx_hash, callback, sender)
+        with self.lock:
+            self.pending[tx_hash] = pending_tx
+        return pending_tx
+
+    def poll(self):
+        """
+        Polls the receipts of the pending transactions not yet polled at the latest block, and completes the mined or dropped ones.
+
+        Returns:
+            (list): the PendingTx instances completed by this poll.
+        """
+        if not self.pending:
+            return []
+        block_number = self.web3.eth.block_number
+        with self.lock:
+            pending_txs = [pending_tx for pending_tx in self.pending.values() if pending_tx.checked_block != block_number]
+
+        completed = []
+        for pending_tx in pending_txs:
+            pending_tx.checked_block = block_number
+            try:
+                pending_tx.receipt = self.web3.eth.get_transaction_receipt(pending_tx.tx_hash)
+            except TransactionNotFound:
+                if time.time() - pending_tx.sent_at < self.timeout:
+                    continue
+                pending_tx.dropped = True
+            pending_tx.finalized_at = time.time()
+            completed.append(pending_tx)
+
+        with self.lock:
+            for pending_tx in completed:
+                self.pending.pop(pending_tx.tx_hash, None)
+        # later nonces of the sender would queue forever behind the nonce of a dropped transaction
+        for sender in {pending_tx.sender for pending_tx in completed if pending_tx.dropped and pending_tx.sender is not None}:
+            get_nonce_manager(self.web3, sender).resync()
+        for pending_tx in completed:
+            if pending_tx.callback is not None:
+                try:
+                    pending_tx.callback(pending_tx)
+                except Exception as error:
+                    print(f"Receipt callback failed for {Web3.to_hex(pending_tx.tx_hash)}: {error}")
+            pending_tx.done.set()
+        return completed
+
+    def run(self):
+        """
+        Polls receipts until stopped. Runs in the background thread.
+
+        Returns:
+            none
+        """
+        while self.running:
+            try:
+                self.poll()
+            except Exception as error:
+                print(f"Receipt polling failed: {error}")
+            time.sleep(self.poll_interval)
+
+    def start(self):
+        """
+        Starts the background polling thread.
+
+        Returns:
+            (ReceiptTracker): the tracker itself.
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, drain_timeout=None):
+        """
+        Stops the background polling thread, first waiting for the pending transactions to complete.
+
+        Params:
+            drain_timeout (float): seconds to wait for the pending transactions at most. Defaults to the tracker timeout.
+
+        Returns:
+            none
+        """
+        deadline = time.time() + (self.timeout if drain_timeout is None else drain_timeout)
+        while self.pending and time.time() < deadline:
+            time.sleep(self.poll_interval)
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,173 @@
+from eth_abi import decode
+from web3 import Web3
+from utilities.reserve_snapshot import GET_RESERVES_SELECTOR
+'''
+reserve_book.py
+
+Keeps the reserves of the pairs behind the configured routes up to date from their Sync events.
+The book starts from one reserve snapshot, then reads only the Sync logs emitted since the last
+block it has seen with a bulk eth_getLogs filtered to the pair addresses, so a quiet block costs
+one eth_getLogs request and no reserve reads. Pairs that changed are pushed to the subscribers.
+After a reorg, the book rewinds to the block before the orphaned one and reads the pairs it touched again.
+'''
+SYNC_EVENT_TOPIC = Web3.to_hex(Web3.keccak(text="Sync(uint112,uint112)"))
+
+class ReserveBook:
+    """
+    Represents an event-driven book of pair reserves.
+
+    Attributes:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        pair_addresses (list): addresses of the pair contracts tracked by the book.
+        block_number (int): the last block applied to the book.
+        reserves (dict): (reserve0, reserve1, blockTimestampLast) keyed by pair address.
+            blockTimestampLast is only as fresh as the starting snapshot as Sync events don't carry it.
+        subscribers (list): callbacks called with (changed_pairs, block_number) after every update.
+        pending_logs (list): Sync logs pushed for blocks after the last one applied, kept for the next block.
+        stale (bool): whether the blocks after the last one applied must be read from the node on the next block.
+    """
+    def __init__(self, web3, reserve_snapshot, pair_addresses):
+        """
+        Initialize the ReserveBook instance from a reserve snapshot.
+
+        Params:
+            web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+            reserve_snapshot (ReserveSnapshot): reserves of the pairs at the starting block.
+            pair_addresses (list): addresses of the pair contracts to track.
+        """
+        self.web3 = web3
+        self.pair_addresses = list(pair_addresses)
+        self.block_number = reserve_snapshot.block_number
+        self.reserves = dict(reserve_snapshot.reserves)
+        self.subscribers = []
+        self.pending_logs = []
+        self.stale = False
+
+    def get_reserves(self, pair_address):
+        """
+        Gets the reserves of a pair in the same shape as pair.getReserves().
+
+        Params:
+            pair_address (str): address of a pair contract.
+
+        Returns:
+            (tuple): (reserve0, reserve1, blockTimestampLast) of the pair.
+        """
+        return self.reserves[pair_address]
+
+    def subscribe(self, callback):
+        """
+        Registers a callback to be notified of the pairs changed by every update.
+
+        Params:
+            callback (function): called with (changed_pairs (set), block_number (int)).
+
+        Returns:
+            none
+        """
+        self.subscribers.append(callback)
+
+    def apply_logs(self, logs, block_number, changed_pairs=None):
+        """
+        Applies Sync logs to the book in the order they were emitted and notifies the subscribers.
+
+        Params:
+            logs (list): Sync event logs of tracked pairs, ordered by block and log index.
+            block_number (int): the last block covered by the logs.
+            changed_pairs (set): addresses of the pairs already changed by the update, e.g. by read_reserves.
+
+        Returns:
+            changed_pairs (set): addresses of the pairs whose reserves changed.
+        """
+        changed_pairs = set() if changed_pairs is None else changed_pairs
+        for log in logs:
+            pair_address = Web3.to_checksum_address(log['address'])
+            if pair_address not in self.reserves:
+                continue
+            reserve0, reserve1 = decode(['uint112', 'uint112'], bytes(log['data']))
+            _, _, block_timestamp_last = self.reserves[pair_address]
+            if self.reserves[pair_address][:2] != (reserve0, reserve1):
+                changed_pairs.add(pair_address)
+            self.reserves[pair_address] = (reserve0, reserve1, block_timestamp_last)
+        self.block_number = max(self.block_number, block_number)
+
+        for callback in self.subscribers:
+            callback(changed_pairs, self.block_number)
+        return changed_pairs
+
+    def apply_subscription(self, subscriber, block_number):
+        """
+        Applies the Sync logs pushed to a WebSocket subscriber since the last block. Falls back to reading the logs
+        with update if the subscriber may have missed some, e.g. after a reconnect. After a reorg, the book rewinds to
+        the block before the first orphaned block, and the pairs whose logs were removed are read again.
+
+        Params:
+            subscriber (WsSubscriber): WebSocket subscriber to the Sync logs of the tracked pairs.
+            block_number (int): the block the subscriber announced last.
+
+        Returns:
+            changed_pairs (set): addresses of the pairs whose reserves changed.
+        """
+        sync_logs, _, resync, removed_logs = subscriber.drain()
+        sync_logs, self.pending_logs = self.pending_logs + sync_logs, []
+        if removed_logs:
+            self.block_number = min(self.block_number, min(log['blockNumber'] for log in removed_logs) - 1)
+            # logs pushed along with the removed ones may be from the orphaned blocks, so none are trusted,
+            # and the blocks after block_number are read from the node on the next block as well
+            self.stale = True
+            stale_pairs = {Web3.to_checksum_address(log['address']) for log in removed_logs}
+            return self.update(block_number, stale_pairs)
+        if resync or self.stale:
+            self.stale = False
+            # update reads the logs up to block_number again, so only the logs of later blocks are kept
+            self.pending_logs = [log for log in sync_logs if log['blockNumber'] > block_number]
+            return self.update(block_number)
+        return self.apply_logs(sync_logs, block_number)
+
+    def read_reserves(self, pair_addresses, block_number):
+        """
+        Reads the reserves of pairs from the node, e.g. of the pairs touched by the orphaned blocks of a reorg.
+
+        Params:
+            pair_addresses (iterable): addresses of the pair contracts to read.
+            block_number (int): the block to read the reserves at.
+
+        Returns:
+            changed_pairs (set): addresses of the pairs whose reserves changed.
+        """
+        changed_pairs = set()
+        for pair_address in pair_addresses:
+            if pair_address not in self.reserves:
+                continue
+            return_data = self.web3.eth.call({'to': pair_address, 'data': Web3.to_hex(GET_RESERVES_SELECTOR)}, block_number)
+            reserves = decode(['uint112', 'uint112', 'uint32'], bytes(return_data))
+            if self.reserves[pair_address][:2] != reserves[:2]:
+                changed_pairs.add(pair_address)
+            self.reserves[pair_address] = reserves
+        return changed_pairs
+
+    def update(self, to_block='latest', stale_pairs=()):
+        """
+        Reads the Sync logs of all tracked pairs from the block after the last one applied up to to_block.
+
+        Params:
+            to_block (int or str): the last block to read logs for.
+            stale_pairs (iterable): addresses of pairs whose reserves are read again at to_block, e.g. after a reorg.
+
+        Returns:
+            changed_pairs (set): addresses of the pairs whose reserves changed.
+        """
+        if to_block == 'latest':
+            to_block = self.web3.eth.block_number
+        if to_block <= self.block_number:
+            return set()
+
+        # the reserves at to_block are applied first, so that the logs read next leave every pair at its state at to_block
+        changed_pairs = self.read_reserves(stale_pairs, to_block)
+        logs = self.web3.eth.get_logs({
+            'fromBlock': self.block_number + 1,
+            'toBlock': to_block,
+            'address': self.pair_addresses,
+            'topics': [SYNC_EVENT_TOPIC]
+        })
+        return self.apply_logs(logs, to_block, changed_pairs)
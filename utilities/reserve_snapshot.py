@@ -0,0 +1,60 @@
+from eth_abi import decode
+from utilities.multicall import (aggregate)
+'''
+reserve_snapshot.py
+
+Reads the reserves of every pair behind the configured routes with a single aggregated eth_call,
+so that all price differences of a scan are computed against the same block.
+'''
+GET_RESERVES_SELECTOR = bytes.fromhex("0902f1ac") # bytes4(keccak256("getReserves()"))
+
+class ReserveSnapshot:
+    """
+    Represents the reserves of a set of pairs at a single block.
+
+    Attributes:
+        block_number (int): the block number the reserves were read at.
+        reserves (dict): (reserve0, reserve1, blockTimestampLast) keyed by pair address.
+    """
+    def __init__(self, block_number, reserves):
+        """
+        Initialize the ReserveSnapshot instance with the block number and the reserves read at that block.
+
+        Params:
+            block_number (int): the block number the reserves were read at.
+            reserves (dict): (reserve0, reserve1, blockTimestampLast) keyed by pair address.
+        """
+        self.block_number = block_number
+        self.reserves = reserves
+
+    def get_reserves(self, pair_address):
+        """
+        Gets the reserves of a pair in the same shape as pair.getReserves().
+
+        Params:
+            pair_address (str): address of a pair contract.
+
+        Returns:
+            (tuple): (reserve0, reserve1, blockTimestampLast) of the pair.
+        """
+        return self.reserves[pair_address]
+
+def take_reserve_snapshot(multicall, pair_addresses, block_identifier='latest'):
+    """
+    Reads the reserves of all pairs in one Multicall aggregate eth_call pinned to one block.
+
+    Params:
+        multicall (Contract): Contract instance of the Multicall contract.
+        pair_addresses (list): addresses of the pair contracts to read.
+        block_identifier (int or str): block number or tag to pin the read to.
+
+    Returns:
+        (ReserveSnapshot): reserves of every pair at the block the call executed against.
+    """
+    calls = [(pair_address, GET_RESERVES_SELECTOR) for pair_address in pair_addresses]
+    block_number, return_data = aggregate(multicall, calls, block_identifier)
+
+    reserves = {}
+    for pair_address, data in zip(pair_addresses, return_data):
+        reserves[pair_address] = tuple(decode(['uint112', 'uint112', 'uint32'], data))
+    return ReserveSnapshot(block_number, reserves)
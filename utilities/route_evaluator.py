@@ -0,0 +1,172 @@
+import numpy as np
+from utilities.pair_registry import (sort_tokens)
+from utilities.quote_engine import (DEX_FEES, DEFAULT_FEE)
+'''
+route_evaluator.py
+
+Evaluates the price spread of every route in one vectorized NumPy pass. Reserves are kept in
+struct-of-arrays buffers indexed by pair, and the routes are described by index arrays into those
+buffers, so spreads, fee-adjusted edges and threshold masks of all routes in both directions cost a
+handful of array operations. Only the routes passing the mask need an exact integer re-check.
+A reverse index from every pair to the routes trading through it limits each pass to the routes
+whose pairs changed, so the scan cost follows market activity rather than the size of the route set.
+'''
+class RouteEvaluator:
+    """
+    Represents a batch evaluator of route spreads.
+
+    Attributes:
+        routes (list): routes as in data["routes"] of the mainnet config.
+        pair_addresses (list): distinct addresses of the pair contracts behind the routes.
+        pair_index (dict): index into the reserve buffers keyed by pair address.
+        reserve0 (ndarray): reserve0 of every pair.
+        reserve1 (ndarray): reserve1 of every pair.
+        pair1 (ndarray): index of the pair on router1 of every route.
+        pair2 (ndarray): index of the pair on router2 of every route.
+        token1_is_token0 (ndarray): whether token1 of every route is token0 of its pairs.
+        fee1 (ndarray): share of the input left after the swap fee of router1 of every route.
+        fee2 (ndarray): share of the input left after the swap fee of router2 of every route.
+        pair_routes (dict): indices of the routes trading through a pair keyed by pair index.
+        spreads (ndarray): the last evaluated spread of every route.
+    """
+    def __init__(self, routes, router_dict, pair_registry, fees=DEX_FEES):
+        """
+        Initialize the RouteEvaluator instance by laying the routes out as index arrays into the pair reserve buffers.
+
+        Params:
+            routes (list): routes as in data["routes"] of the mainnet config.
+            router_dict (dict): router Contract instances keyed by router address.
+            pair_registry (PairRegistry): registry of the pair contracts on all routers.
+            fees (dict): (fee numerator, fee denominator) keyed by router address.
+        """
+        self.routes = routes
+        self.pair_addresses = []
+        self.pair_index = {}
+        pair1 = []
+        pair2 = []
+        token1_is_token0 = []
+        fee1 = []
+        fee2 = []
+        for route in routes:
+            router1 = router_dict[route["router1"]]
+            router2 = router_dict[route["router2"]]
+            pair1.append(self.add_pair(pair_registry.get_pair_address(router1, route["token1"], route["token2"])))
+            pair2.append(self.add_pair(pair_registry.get_pair_address(router2, route["token1"], route["token2"])))
+            token1_is_token0.append(sort_tokens(route["token1"], route["token2"])[0] == route["token1"])
+            fee1_numerator, fee1_denominator = fees.get(route["router1"], DEFAULT_FEE)
+            fee2_numerator, fee2_denominator = fees.get(route["router2"], DEFAULT_FEE)
+            fee1.append(fee1_numerator / fee1_denominator)
+            fee2.append(fee2_numerator / fee2_denominator)
+
+        self.reserve0 = np.zeros(len(self.pair_addresses), dtype=np.float64)
+        self.reserve1 = np.zeros(len(self.pair_addresses), dtype=np.float64)
+        self.pair1 = np.array(pair1, dtype=np.int64)
+        self.pair2 = np.array(pair2, dtype=np.int64)
+        self.token1_is_token0 = np.array(token1_is_token0, dtype=bool)
+        self.fee1 = np.array(fee1, dtype=np.float64)
+        self.fee2 = np.array(fee2, dtype=np.float64)
+        self.spreads = np.full(len(routes), np.nan, dtype=np.float64)
+
+        self.pair_routes = {}
+        for route_index, (index1, index2) in enumerate(zip(pair1, pair2)):
+            self.pair_routes.setdefault(index1, []).append(route_index)
+            if index2 != index1:
+                self.pair_routes.setdefault(index2, []).append(route_index)
+
+    def add_pair(self, pair_address):
+        """
+        Adds a pair to the reserve buffers if it is not there yet.
+
+        Params:
+            pair_address (str): address of a pair contract.
+
+        Returns:
+            (int): index of the pair in the reserve buffers.
+        """
+        if pair_address not in self.pair_index:
+            self.pair_index[pair_address] = len(self.pair_addresses)
+            self.pair_addresses.append(pair_address)
+        return self.pair_index[pair_address]
+
+    def load_reserves(self, reserves, pair_addresses=None):
+        """
+        Copies reserves into the reserve buffers.
+
+        Params:
+            reserves (ReserveSnapshot or ReserveBook): reserves to copy.
+            pair_addresses (iterable): addresses of the pairs to copy. Copies every pair if none.
+
+        Returns:
+            none
+        """
+        if pair_addresses is None:
+            pair_addresses = self.pair_addresses
+        for pair_address in pair_addresses:
+            if pair_address in self.pair_index:
+                reserve0, reserve1, _ = reserves.get_reserves(pair_address)
+                self.reserve0[self.pair_index[pair_address]] = reserve0
+                self.reserve1[self.pair_index[pair_address]] = reserve1
+
+    def get_dirty_routes(self, pair_addresses):
+        """
+        Looks up the routes that trade through any of the given pairs in the pair to routes index.
+
+        Params:
+            pair_addresses (iterable): addresses of the pair contracts whose reserves changed.
+
+        Returns:
+            (ndarray): sorted indices of the affected routes.
+        """
+        route_indices = set()
+        for pair_address in pair_addresses:
+            if pair_address in self.pair_index:
+                route_indices.update(self.pair_routes.get(self.pair_index[pair_address], []))
+        return np.array(sorted(route_indices), dtype=np.int64)
+
+    def evaluate(self, threshold, route_indices=None):
+        """
+        Computes the spreads and fee-adjusted edges of the given routes in both directions, and masks the
+        routes whose spread passes the threshold in a direction that still has an edge after fees.
+
+        Params:
+            threshold (float): the spread a route needs to exceed, as in hit_profit_target.
+            route_indices (ndarray): indices of the routes to re-score. Re-scores every route if none.
+
+        Returns:
+            candidates (ndarray): indices of the routes passing the mask.
+            spreads (ndarray): the larger spread of the two directions of every route, as of its last evaluation.
+        """
+        if route_indices is None:
+            route_indices = np.arange(len(self.routes))
+        pair1 = self.pair1[route_indices]
+        pair2 = self.pair2[route_indices]
+        token1_is_token0 = self.token1_is_token0[route_indices]
+        fees = self.fee1[route_indices] * self.fee2[route_indices]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # token1 and token2 reserves of the pair on each router
+            token1_on_1 = np.where(token1_is_token0, self.reserve0[pair1], self.reserve1[pair1])
+            token2_on_1 = np.where(token1_is_token0, self.reserve1[pair1], self.reserve0[pair1])
+            token1_on_2 = np.where(token1_is_token0, self.reserve0[pair2], self.reserve1[pair2])
+            token2_on_2 = np.where(token1_is_token0, self.reserve1[pair2], self.reserve0[pair2])
+
+            # price of token1 in token2 on each router
+            price_on_1 = token2_on_1 / token1_on_1
+            price_on_2 = token2_on_2 / token1_on_2
+
+            # spread of selling token1 on router1 then buying it back on router2, and the reverse order
+            spread_router1_then_router2 = (price_on_1 - price_on_2) / price_on_2
+            spread_router2_then_router1 = (price_on_2 - price_on_1) / price_on_1
+
+            # marginal round-trip rate after both swap fees, minus 1
+            edge_router1_then_router2 = fees * price_on_1 / price_on_2 - 1
+            edge_router2_then_router1 = fees * price_on_2 / price_on_1 - 1
+
+        mask = (
+            ((spread_router1_then_router2 > threshold) & (edge_router1_then_router2 > 0))
+            | ((spread_router2_then_router1 > threshold) & (edge_router2_then_router1 > 0))
+            )
+        mask &= np.isfinite(price_on_1) & np.isfinite(price_on_2) & (price_on_1 > 0) & (price_on_2 > 0)
+
+        self.spreads[route_indices] = np.fmax(spread_router1_then_router2, spread_router2_then_router1)
+        return route_indices[mask], self.spreads
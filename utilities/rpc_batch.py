@@ -0,0 +1,134 @@
+import json
+from eth_abi import decode
+from web3._utils.abi import get_abi_output_types
+from web3._utils.request import make_post_request
+'''
+rpc_batch.py
+
+Collects independent read-only JSON-RPC calls, such as balances, contract view calls and fee reads,
+and sends them to the node as one JSON-RPC batch in a single HTTP request. The batch is posted
+through the keep-alive session of the shared RPC client, and every result is decoded the same way
+web3 would decode it, so N reads cost one round trip instead of N.
+'''
+def to_block_param(block_identifier):
+    """
+    Formats a block identifier as a JSON-RPC block parameter.
+
+    Params:
+        block_identifier (int or str): block number or tag.
+
+    Returns:
+        (str): the hex block number, or the tag as it is.
+    """
+    if isinstance(block_identifier, int):
+        return hex(block_identifier)
+    return block_identifier
+
+class RpcBatch:
+    """
+    Represents a JSON-RPC batch of independent read-only calls.
+
+    Attributes:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        requests (list): the JSON-RPC requests of the batch, in the order they were added.
+        formatters (list): the function decoding the raw result of every request.
+    """
+    def __init__(self, web3):
+        """
+        Initialize an empty RpcBatch instance.
+
+        Params:
+            web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        """
+        self.web3 = web3
+        self.requests = []
+        self.formatters = []
+
+    def add(self, method, params, formatter=None):
+        """
+        Adds a raw JSON-RPC request to the batch.
+
+        Params:
+            method (str): the JSON-RPC method.
+            params (list): the parameters of the method.
+            formatter (function): decodes the raw result. The raw result is returned if none.
+
+        Returns:
+            (int): the index of the result in the list returned by execute.
+        """
+        self.requests.append({"jsonrpc": "2.0", "id": len(self.requests), "method": method, "params": params})
+        self.formatters.append(formatter)
+        return len(self.requests) - 1
+
+    def add_call(self, contract_function, block_identifier='latest'):
+        """
+        Adds a contract view call to the batch, as with contract_function.call().
+
+        Params:
+            contract_function (ContractFunction): the bound contract function to call.
+            block_identifier (int or str): block number or tag to call at.
+
+        Returns:
+            (int): the index of the result in the list returned by execute.
+        """
+        output_types = get_abi_output_types(contract_function.abi)
+        def formatter(result):
+            output = decode(output_types, bytes.fromhex(result[2:]))
+            return output[0] if len(output) == 1 else list(output)
+        return self.add("eth_call", [{"to": contract_function.address, "data": contract_function._encode_transaction_data()}, to_block_param(block_identifier)], formatter)
+
+    def add_balance(self, address, block_identifier='latest'):
+        """
+        Adds an ETH balance read to the batch, as with web3.eth.get_balance().
+
+        Params:
+            address (str): the address to read the balance of.
+            block_identifier (int or str): block number or tag to read at.
+
+        Returns:
+            (int): the index of the result in the list returned by execute.
+        """
+        return self.add("eth_getBalance", [address, to_block_param(block_identifier)], lambda result: int(result, 16))
+
+    def add_block(self, block_identifier='latest'):
+        """
+        Adds a block header read to the batch, as with web3.eth.get_block(). Only number, timestamp and baseFeePerGas are decoded.
+
+        Params:
+            block_identifier (int or str): block number or tag to read.
+
+        Returns:
+            (int): the index of the result in the list returned by execute.
+        """
+        def formatter(result):
+            return dict(result, **{key: int(result[key], 16) for key in ("number", "timestamp", "baseFeePerGas") if key in result})
+        return self.add("eth_getBlockByNumber", [to_block_param(block_identifier), False], formatter)
+
+    def add_max_priority_fee(self):
+        """
+        Adds a read of the tip suggested by the node to the batch, as with web3.eth.max_priority_fee.
+
+        Returns:
+            (int): the index of the result in the list returned by execute.
+        """
+        return self.add("eth_maxPriorityFeePerGas", [], lambda result: int(result, 16))
+
+    def execute(self):
+        """
+        Sends the whole batch in one HTTP request and decodes every result.
+
+        Returns:
+            (list): the decoded results, in the order the calls were added.
+        """
+        if not self.requests:
+            return []
+        provider = self.web3.provider
+        response = make_post_request(provider.endpoint_uri, json.dumps(self.requests).encode(), **provider.get_request_kwargs())
+        responses = {response["id"]: response for response in json.loads(response)}
+        results = []
+        for request, formatter in zip(self.requests, self.formatters):
+            response = responses[request["id"]]
+            if "error" in response:
+                raise ValueError(response["error"]) # raised the same way web3 raises JSON-RPC errors
+            results.append(response["result"] if formatter is None else formatter(response["result"]))
+        return results
@@ -0,0 +1,80 @@
+import threading
+import requests
+from aiohttp import ClientTimeout
+from requests.adapters import HTTPAdapter
+from web3 import (Web3, AsyncWeb3)
+from utilities.multi_endpoint_provider import create_multi_endpoint_provider
+'''
+rpc_client.py
+
+Shares one JSON-RPC client per node across the process. Every ArbBot, setup(), the trading sims and
+log_balances.py get the same Web3 instance, backed by a keep-alive requests session whose connection
+pool bounds how many requests can be in flight against the node at once. Connections are reused
+instead of being set up for every client, and the pool size and timeouts are configured in one place.
+With fallback nodes, the client spreads its requests over all of them through a MultiEndpointProvider.
+'''
+NODE_URL = "http://127.0.0.1:8545"
+DEFAULT_POOL_SIZE = 16 # connections kept alive to the node, and requests in flight at most
+DEFAULT_TIMEOUT = 10 # seconds to wait for a response of the node
+DEFAULT_RETRIES = 2 # retries of a request that failed to connect
+DEFAULT_HEDGE_AFTER = 0.25 # seconds to wait for a read before hedging it on a fallback node
+
+rpc_clients = {}
+rpc_clients_lock = threading.Lock()
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES):
+    """
+    Creates a keep-alive HTTP session with a bounded connection pool. Requests beyond the pool size wait for a free connection.
+
+    Params:
+        pool_size (int): the number of connections kept alive to the node.
+        retries (int): the number of retries of a request that failed to connect.
+
+    Returns:
+        (Session): the HTTP session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_web3(node_url=NODE_URL, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, fallback_urls=None, hedge_after=DEFAULT_HEDGE_AFTER):
+    """
+    Gets the Web3 instance of a node shared by the whole process. The client is created on the first call for the
+    node, so the pool size, timeout, retries and fallback nodes of later calls are ignored.
+
+    Params:
+        node_url (str): the url of the node.
+        pool_size (int): the number of connections kept alive to the node.
+        timeout (float): seconds to wait for a response of the node.
+        retries (int): the number of retries of a request that failed to connect.
+        fallback_urls (list): urls of other nodes of the same chain to route requests to when they are faster, to hedge slow reads on,
+            and to fail over to. Only node_url is used if none.
+        hedge_after (float): seconds to wait for a read before hedging it on a fallback node.
+
+    Returns:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+    """
+    with rpc_clients_lock:
+        if node_url not in rpc_clients:
+            if fallback_urls:
+                provider = create_multi_endpoint_provider([node_url] + list(fallback_urls), lambda: create_session(pool_size, retries), timeout, hedge_after)
+            else:
+                provider = Web3.HTTPProvider(node_url, request_kwargs={'timeout': timeout}, session=create_session(pool_size, retries))
+            rpc_clients[node_url] = Web3(provider)
+        return rpc_clients[node_url]
+
+def get_async_web3(node_url=NODE_URL, timeout=DEFAULT_TIMEOUT):
+    """
+    Gets an AsyncWeb3 instance of a node. AsyncHTTPProvider keeps one keep-alive aiohttp session per event loop,
+    and the concurrency against the node is bounded by the caller, e.g. AsyncScanner.max_concurrency.
+
+    Params:
+        node_url (str): the url of the node.
+        timeout (float): seconds to wait for a response of the node.
+
+    Returns:
+        (AsyncWeb3): an AsyncWeb3 instance to access blockchain.
+    """
+    return AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(node_url, request_kwargs={'timeout': ClientTimeout(total=timeout)}))
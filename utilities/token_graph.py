@@ -0,0 +1,175 @@
+from math import log
+from utilities.pair_registry import (sort_tokens)
+from utilities.quote_engine import (DEX_FEES, DEFAULT_FEE)
+'''
+token_graph.py
+
+Models tokens as nodes and every pool on every router as a pair of directed edges weighted by the
+negative log of the fee-adjusted marginal exchange rate. A cycle with a negative total weight returns
+more of the starting token than it takes in. Edge weights are updated incrementally from the pairs
+whose reserves changed.
+
+A cycle can only turn profitable if one of its pools moved, so the cycles through the tokens held by the
+arbitrage contract are enumerated once, up to the maximum cycle length, and indexed by pair. Each block
+then only re-scores the cycles through the pairs whose reserves changed, which finds every profitable
+cycle within the length bound, where a Bellman-Ford search is only guaranteed to find one of them.
+'''
+class TokenGraph:
+    """
+    Represents a token graph of the pools behind the configured routes.
+
+    Attributes:
+        max_length (int): the maximum number of hops of a cycle.
+        min_length (int): the minimum number of hops of a cycle.
+        fees (dict): (fee numerator, fee denominator) keyed by router address.
+        pair_edges (dict): (token0, token1, router address) of every pool keyed by pair address.
+        adjacency (dict): list of (token out, router address, pair address) keyed by token in.
+        weights (dict): edge weight keyed by (token in, token out, router address).
+        cycles (list): cycles indexed by index_cycles, as dicts with the token "path" and the "routers" and "pairs" of each hop.
+        pair_cycles (dict): indices of the indexed cycles trading through a pair keyed by pair address.
+    """
+    def __init__(self, routes, router_dict, pair_registry, fees=DEX_FEES, max_length=3, min_length=3):
+        """
+        Initialize the TokenGraph instance with an edge pair for every pool behind the routes.
+
+        Params:
+            routes (list): routes as in data["routes"] of the mainnet config.
+            router_dict (dict): router Contract instances keyed by router address.
+            pair_registry (PairRegistry): registry of the pair contracts on all routers.
+            fees (dict): (fee numerator, fee denominator) keyed by router address.
+            max_length (int): the maximum number of hops of a cycle.
+            min_length (int): the minimum number of hops of a cycle. Two-hop cycles are the routes themselves.
+        """
+        self.max_length = max_length
+        self.min_length = min_length
+        self.fees = fees
+        self.pair_edges = {}
+        self.adjacency = {}
+        self.weights = {}
+        self.cycles = []
+        self.pair_cycles = {}
+        for route in routes:
+            for router_address in (route["router1"], route["router2"]):
+                pair_address = pair_registry.get_pair_address(router_dict[router_address], route["token1"], route["token2"])
+                self.add_pool(pair_address, route["token1"], route["token2"], router_address)
+
+    def add_pool(self, pair_address, tokenA_address, tokenB_address, router_address):
+        """
+        Adds the two directed edges of a pool to the graph.
+
+        Params:
+            pair_address (str): address of the pair contract.
+            tokenA_address (str): address of a token contract.
+            tokenB_address (str): address of a token contract.
+            router_address (str): address of the router trading the pair.
+
+        Returns:
+            none
+        """
+        if pair_address in self.pair_edges:
+            return
+        token0, token1 = sort_tokens(tokenA_address, tokenB_address)
+        self.pair_edges[pair_address] = (token0, token1, router_address)
+        self.adjacency.setdefault(token0, []).append((token1, router_address, pair_address))
+        self.adjacency.setdefault(token1, []).append((token0, router_address, pair_address))
+
+    def update_reserves(self, reserves, pair_addresses=None):
+        """
+        Recomputes the edge weights of the given pools from their reserves.
+
+        Params:
+            reserves (ReserveSnapshot or ReserveBook): reserves of the pools.
+            pair_addresses (iterable): addresses of the pairs to update. Updates every pool if none.
+
+        Returns:
+            none
+        """
+        if pair_addresses is None:
+            pair_addresses = self.pair_edges.keys()
+        for pair_address in pair_addresses:
+            if pair_address not in self.pair_edges:
+                continue
+            token0, token1, router_address = self.pair_edges[pair_address]
+            reserve0, reserve1, _ = reserves.get_reserves(pair_address)
+            fee_numerator, fee_denominator = self.fees.get(router_address, DEFAULT_FEE)
+            fee = fee_numerator / fee_denominator
+            if reserve0 > 0 and reserve1 > 0:
+                self.weights[(token0, token1, router_address)] = -log(fee * reserve1 / reserve0)
+                self.weights[(token1, token0, router_address)] = -log(fee * reserve0 / reserve1)
+            else:
+                self.weights.pop((token0, token1, router_address), None)
+                self.weights.pop((token1, token0, router_address), None)
+
+    def index_cycles(self, sources):
+        """
+        Enumerates every simple cycle of min_length to max_length hops starting and ending at the source tokens,
+        and indexes them by the pairs they trade through.
+
+        Params:
+            sources (list): addresses of the tokens a cycle may start from.
+
+        Returns:
+            (int): the number of indexed cycles.
+        """
+        self.cycles = []
+        self.pair_cycles = {}
+        seen = set()
+
+        def extend(source, path, routers, pairs):
+            for token_out, router_address, pair_address in self.adjacency[path[-1]]:
+                if pair_address in pairs:
+                    continue
+                if token_out == source:
+                    # the same cycle reached from another source is a rotation of the same pairs in the same direction
+                    cycle_pairs = pairs + [pair_address]
+                    key = min(tuple(cycle_pairs[i:] + cycle_pairs[:i]) for i in range(len(cycle_pairs)))
+                    if len(cycle_pairs) >= self.min_length and key not in seen:
+                        seen.add(key)
+                        self.cycles.append({
+                            "path": path + [source],
+                            "routers": routers + [router_address],
+                            "pairs": pairs + [pair_address]
+                        })
+                elif token_out not in path and len(pairs) + 1 < self.max_length:
+                    extend(source, path + [token_out], routers + [router_address], pairs + [pair_address])
+
+        for source in sources:
+            if source in self.adjacency:
+                extend(source, [source], [], [])
+        for cycle_index, cycle in enumerate(self.cycles):
+            for pair_address in cycle["pairs"]:
+                self.pair_cycles.setdefault(pair_address, []).append(cycle_index)
+        return len(self.cycles)
+
+    def score_cycles(self, pair_addresses=None):
+        """
+        Re-scores the indexed cycles that trade through any of the given pairs with the current edge weights.
+
+        Params:
+            pair_addresses (iterable): addresses of the pairs whose reserves changed. Re-scores every cycle if none.
+
+        Returns:
+            cycles (list): the profitable cycles as dicts with the token "path", the "routers" and "pairs" of each hop
+                and the cycle "weight", sorted from the most to the least profitable.
+        """
+        if pair_addresses is None:
+            cycle_indices = range(len(self.cycles))
+        else:
+            cycle_indices = set()
+            for pair_address in pair_addresses:
+                cycle_indices.update(self.pair_cycles.get(pair_address, []))
+
+        cycles = []
+        for cycle_index in cycle_indices:
+            cycle = self.cycles[cycle_index]
+            weight = 0.0
+            for token_in, token_out, router_address in zip(cycle["path"], cycle["path"][1:], cycle["routers"]):
+                edge_weight = self.weights.get((token_in, token_out, router_address))
+                if edge_weight is None:
+                    break
+                weight += edge_weight
+            else:
+                if weight < 0:
+                    cycles.append(dict(cycle, weight=weight))
+        cycles.sort(key=lambda cycle: cycle["weight"])
+        return cycles
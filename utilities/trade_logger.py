@@ -0,0 +1,145 @@
+import csv
+import threading
+'''
+trade_logger.py
+
+Logs the performance of every arb trade to performance_monitor/trade_logs_bot.csv and to the console.
+Trades are logged from the receipt tracker thread once they are mined, so the running totals are
+guarded by a lock.
+'''
+TRADE_LOG_PATH = "performance_monitor/trade_logs_bot.csv"
+TRADE_LOG_HEADER = [
+    "net_profit($)",
+    "profit_per_trade($)",
+    "net_roi",
+    "success_rate",
+    "total_trade_volume_usd($)",
+    "trade_profit($)",
+    "analysis_latency(ms)",
+    "on_chain_execution_time(ms)",
+    "price_diff",
+    "time_opportunity_found(s)",
+    "time_tx_init(s)",
+    "time_tx_finalized(s)",
+    "base_asset",
+    "intermediate_asset",
+    "first_swap_router",
+    "second_swap_router",
+    "base_asset_balance_before_swap(wei)",
+    "base_asset_balance_after_swap(wei)",
+    "tx_receipt"
+    ]
+ETH_PRICE_PER_WEI = 2.60687E-15 # USD value of 1 wei of ETH used to price gas
+
+class TradeLogger:
+    """
+    Represents the performance log of the arb trades.
+
+    Attributes:
+        log_path (str): path of the csv log.
+        bot_balances (float): USD value of the initial balances of the arbitrage contract.
+        trade_count (int): the number of arb trades sent on-chain.
+        success_count (int): the number of arb trades that succeeded.
+        net_profit (float): balance after trades - balance before trades - gas fees, in USD.
+        total_trade_volume_usd (float): USD value of the traded amounts.
+        lock (Lock): lock guarding the running totals and the csv log.
+    """
+    def __init__(self, log_path=TRADE_LOG_PATH, bot_balances=2589.50 * 10):
+        """
+        Initialize the TradeLogger instance and create the csv log with its header.
+
+        Params:
+            log_path (str): path of the csv log.
+            bot_balances (float): USD value of the initial balances of the arbitrage contract.
+        """
+        self.log_path = log_path
+        self.bot_balances = bot_balances
+        self.trade_count = 0
+        self.success_count = 0
+        self.net_profit = 0
+        self.total_trade_volume_usd = 0
+        self.lock = threading.Lock()
+        with open(self.log_path, mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(TRADE_LOG_HEADER)
+
+    def log_trade(self, tx_receipt, trade_amount, token1_wei_price, token1_balance, token1_balance_after, price_diff,
+                  time_opportunity_found, time_tx_init, time_tx_finalized, token1, token2, router_1, router_2):
+        """
+        Computes the PnL of a mined arb trade, updates the running totals, and logs them to the csv log and the console.
+
+        Params:
+            tx_receipt (receipt): the receipt of the trade transaction.
+            trade_amount (int): the amount in wei of token1 traded in.
+            token1_wei_price (float): USD value of 1 wei of token1.
+            token1_balance (int): balance in wei of token1 in the arbitrage contract before the trade.
+            token1_balance_after (int): balance in wei of token1 in the arbitrage contract after the trade.
+            price_diff (float): price difference of the pair that triggered the trade.
+            time_opportunity_found (float): the time the opportunity was found.
+            time_tx_init (float): the time the trade was sent.
+            time_tx_finalized (float): the time the receipt was found.
+            token1 (str): address of the base asset.
+            token2 (str): address of the intermediate asset.
+            router_1 (str): address of the first swap router.
+            router_2 (str): address of the second swap router.
+
+        Returns:
+            (float): the USD profit of the trade after gas.
+        """
+        gas_cost = tx_receipt['gasUsed'] * tx_receipt['effectiveGasPrice'] * ETH_PRICE_PER_WEI
+        trade_profit = (token1_balance_after - token1_balance)*token1_wei_price - gas_cost
+        analysis_latency = (time_tx_init - time_opportunity_found) * 1000 # convert to ms
+        on_chain_execution_time = (time_tx_finalized - time_tx_init) * 1000 # convert to ms
+
+        with self.lock:
+            self.trade_count += 1
+            if tx_receipt["status"] == 1:
+                self.success_count += 1
+            self.total_trade_volume_usd += trade_amount * token1_wei_price
+            self.net_profit += trade_profit # get the net_profit so far
+            profit_per_trade = round(self.net_profit/self.trade_count, 2)
+            return_on_investment = round(self.net_profit/self.bot_balances, 2) # roi = net_profit/total investments, rounded to 2 decimal places
+            success_rate = round(self.success_count/self.trade_count, 2)
+            with open(self.log_path, mode='a', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow([
+                    self.net_profit,
+                    profit_per_trade,
+                    return_on_investment,
+                    success_rate,
+                    self.total_trade_volume_usd,
+                    trade_profit,
+                    analysis_latency, # Time taken to detect and execute an arbitrage opportunity.
+                    on_chain_execution_time, # The time between placing the order and the order getting executed, which reflects gas price competitiveness and serves gas optimization reference.
+                    price_diff,
+                    time_opportunity_found,
+                    time_tx_init,
+                    time_tx_finalized,
+                    token1,
+                    token2,
+                    router_1,
+                    router_2,
+                    token1_balance, # balance before the trade
+                    token1_balance_after, # balance after the trade
+                    tx_receipt
+                    ])
+
+            print(f'''
+PROFITABILITY
+    -- Net Profit:          ${self.net_profit}
+    -- Net ROI:             {return_on_investment*100}%
+    -- Profit per Trade:    ${profit_per_trade}
+
+SUCCESS RATE
+    -- Winning Chance:      {success_rate*100}%
+    -- Winning Trade Count: {self.success_count}
+    -- Total Trade Count:   {self.trade_count}
+
+EXECUTION SPEED
+    -- Analysis Latency:    {analysis_latency}ms
+    -- On-chain execution:  {on_chain_execution_time}ms
+
+CAPITAL UTILIZATION
+    -- Trade Volume:        ${self.total_trade_volume_usd}
+''')
+        return trade_profit
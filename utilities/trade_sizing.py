@@ -0,0 +1,73 @@
+from math import isqrt
+'''
+trade_sizing.py
+
+Computes the profit-maximizing input amount of a two-pool constant-product round trip.
+
+Swapping x of token1 to token2 on pool A and back to token1 on pool B returns
+    f(x) = Ga * Gb * a_out * b_out * x / (a_in * b_in + Ga * x * (b_in + Gb * a_out))
+where Ga and Gb are the shares of the input left after each pool's swap fee. The profit f(x) - x
+is maximized where f'(x) = 1, which gives
+    x* = (sqrt(Ga * Gb * a_in * a_out * b_in * b_out) - a_in * b_in) / (Ga * (b_in + Gb * a_out))
+and the round trip is only profitable if Ga * Gb * a_out * b_out > a_in * b_in.
+
+A multi-hop path composes to the same A * x / (B + C * x) shape, so its optimum is found the same way
+after folding the pools one hop at a time.
+'''
+def get_optimal_amount_in(reserve_a_in, reserve_a_out, reserve_b_in, reserve_b_out, fee_a=(997, 1000), fee_b=(997, 1000)):
+    """
+    Computes the input amount that maximizes the profit of a round trip through pool A and then pool B.
+
+    Params:
+        reserve_a_in (int): reserve of token1 in pool A.
+        reserve_a_out (int): reserve of token2 in pool A.
+        reserve_b_in (int): reserve of token2 in pool B.
+        reserve_b_out (int): reserve of token1 in pool B.
+        fee_a (tuple): (fee numerator, fee denominator) of pool A.
+        fee_b (tuple): (fee numerator, fee denominator) of pool B.
+
+    Returns:
+        (int): the optimal amount in wei of token1 to trade in, or 0 if the round trip can't be profitable.
+    """
+    if min(reserve_a_in, reserve_a_out, reserve_b_in, reserve_b_out) <= 0:
+        return 0
+    fee_a_numerator, fee_a_denominator = fee_a
+    fee_b_numerator, fee_b_denominator = fee_b
+
+    # All terms are multiplied by fee_a_denominator * fee_b_denominator to stay in integers
+    root = isqrt(
+        fee_a_numerator * fee_b_numerator * fee_a_denominator * fee_b_denominator
+        * reserve_a_in * reserve_a_out * reserve_b_in * reserve_b_out
+        )
+    numerator = root - reserve_a_in * reserve_b_in * fee_a_denominator * fee_b_denominator
+    denominator = fee_a_numerator * (fee_b_denominator * reserve_b_in + fee_b_numerator * reserve_a_out)
+    if numerator <= 0:
+        return 0
+    return numerator // denominator
+
+def get_optimal_path_amount_in(pools):
+    """
+    Computes the input amount that maximizes the profit of a cycle through a list of pools.
+    Each hop returns A * x / (B + C * x) with A = fee numerator * reserve_out, B = fee denominator * reserve_in
+    and C = fee numerator. Two hops fold into A1 * A2 * x / (B1 * B2 + (C1 * B2 + C2 * A1) * x), and the
+    folded path is maximized at x* = (sqrt(A * B) - B) / C.
+
+    Params:
+        pools (list): (reserve_in, reserve_out, (fee numerator, fee denominator)) of every hop in order.
+
+    Returns:
+        (int): the optimal amount in wei of the starting token to trade in, or 0 if the cycle can't be profitable.
+    """
+    A, B, C = 1, 1, 0
+    for reserve_in, reserve_out, (fee_numerator, fee_denominator) in pools:
+        if reserve_in <= 0 or reserve_out <= 0:
+            return 0
+        hop_A = fee_numerator * reserve_out
+        hop_B = fee_denominator * reserve_in
+        hop_C = fee_numerator
+        A, B, C = A * hop_A, B * hop_B, C * hop_B + hop_C * A
+
+    numerator = isqrt(A * B) - B
+    if numerator <= 0 or C <= 0:
+        return 0
+    return numerator // C
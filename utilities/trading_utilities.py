@@ -1,5 +1,9 @@
 from decimal import Decimal
 from web3 import Web3
+from web3.exceptions import TimeExhausted
+from utilities.nonce_manager import (get_nonce_manager, is_nonce_error, is_already_known)
+from utilities.rpc_batch import RpcBatch
+from utilities.metadata_cache import (get_decimals, get_symbol, get_WETH)
 import json
 '''
 trading_utilities.py
@@ -11,6 +15,7 @@ when there's enough balance of the baseAsset in the user wallet.
 Author: ILnaw
 Version: 08-14-2024
 '''
+TRANSFER_EVENT_TOPIC = Web3.to_hex(Web3.keccak(text="Transfer(address,address,uint256)"))
 
 def to_wei(amount, decimals):
     """
@@ -38,9 +43,80 @@ def from_wei(amount_in_wei, decimals):
     """
     return int(Decimal(amount_in_wei) / (10**decimals))
 
+def get_token_flow(receipt, token_address, account_address):
+    """
+    Gets the net amount of a token an account received in a transaction, from the ERC20 Transfer logs of its receipt.
+    Unlike a balance read at the block of the transaction, it excludes the other transactions of the block.
+
+    Params:
+        receipt (receipt): the receipt of the transaction.
+        token_address (str): address of the token contract.
+        account_address (str): address of the account.
+
+    Returns:
+        (int): the wei amount of the token transferred to the account, less the amount transferred from it.
+    """
+    account_topic = "0x" + account_address[2:].lower().rjust(64, "0")
+    flow = 0
+    for log in receipt["logs"]:
+        topics = [Web3.to_hex(topic) for topic in log["topics"]]
+        if len(topics) != 3 or topics[0] != TRANSFER_EVENT_TOPIC or log["address"].lower() != token_address.lower():
+            continue
+        amount = int.from_bytes(bytes(log["data"])[:32], "big")
+        if topics[2].lower() == account_topic:
+            flow += amount
+        if topics[1].lower() == account_topic:
+            flow -= amount
+    return flow
+
+def send_raw_tx(web3, raw_tx):
+    """
+    Sends a signed transaction. If the node already has it, e.g. because a node that timed out had accepted it before
+    the send failed over, the transaction is already in flight and its hash is returned.
+
+    Params:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        raw_tx (HexBytes): the signed transaction.
+
+    Returns:
+        tx_hash (HexBytes): the hash of the sent transaction.
+    """
+    try:
+        return web3.eth.send_raw_transaction(raw_tx)
+    except Exception as error:
+        if is_already_known(error):
+            return Web3.keccak(raw_tx)
+        raise
+
+def send_tx(web3, tx, private_key):
+    """
+    Sign and send a transaction without waiting for it to be mined.
+
+    Params:
+        web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
+        tx (dict): A dictionary conforming to the web3.eth.send_transaction(transaction) method.
+        private_key (str): Hex value of a private key.
+
+    Returns:
+        tx_hash (HexBytes): the hash of the sent transaction.
+    """
+    nonce_manager = get_nonce_manager(web3, web3.eth.account.from_key(private_key).address)
+    signed_tx = web3.eth.account.sign_transaction(tx, private_key)
+    try:
+        return send_raw_tx(web3, signed_tx.rawTransaction)
+    except Exception as error:
+        if not is_nonce_error(error):
+            nonce_manager.resync() # the allocated nonce was never used
+            raise
+    # resync with the chain and retry once with a fresh nonce
+    nonce_manager.resync()
+    tx = dict(tx, nonce=nonce_manager.allocate())
+    signed_tx = web3.eth.account.sign_transaction(tx, private_key)
+    return send_raw_tx(web3, signed_tx.rawTransaction)
+
 def sign_and_send_tx(web3, tx, private_key):
     """
-    Sign and send a transaction.
+    Sign and send a transaction, and wait for it to be mined.
 
     Params:
         web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
@@ -50,14 +126,17 @@ def sign_and_send_tx(web3, tx, private_key):
     Returns:
         tx_receipt (receipt): the receipt of a transaction.
     """
-    signed_tx = web3.eth.account.sign_transaction(tx, private_key)
-    tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-    tx_receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+    tx_hash = send_tx(web3, tx, private_key)
+    try:
+        tx_receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+    except TimeExhausted:
+        get_nonce_manager(web3, web3.eth.account.from_key(private_key).address).resync() # the transaction may have been dropped
+        raise
     return tx_receipt
 
 def get_token_decimals(token_address, web3):
     '''
-    Get the number of decimals for a token.
+    Get the number of decimals for a token. Read from the node only the first time, through the metadata cache.
 
     Params:
         token_address: the string address of the token contract.
@@ -69,11 +148,12 @@ def get_token_decimals(token_address, web3):
     erc20_abi = '[{"constant":true,"inputs":[],"name":"decimals","outputs":[{"name":"","type":"uint8"}],"payable":false,"stateMutability":"view","type":"function"}]'
 
     token_contract = web3.eth.contract(address=token_address, abi=erc20_abi)
-    return token_contract.functions.decimals().call()
+    return get_decimals(token_contract)
 
 def get_account_balances(web3, address):
     '''
     Get the balance of all tokens in an account based on the baseAssets specified in the mainnet config file.
+    All balances are read in a single JSON-RPC batch request.
 
     Params:
         web3 (Provider): a Provider instance to access blockchain. Takes JSON-RPC requests and returns the response.
@@ -84,8 +164,8 @@ def get_account_balances(web3, address):
     '''
     with open("configs/mainnet.json", "r") as file:
         data = json.load(file)
-    ETH_balance = web3.eth.get_balance(address)
-    balances = {"ETH": ETH_balance}
+    batch = RpcBatch(web3)
+    batch.add_balance(address)
     erc20_abi = '''
     [
 {
@@ -312,11 +392,12 @@ def get_account_balances(web3, address):
     '''
 
     for token in data["baseAssets"]:
-        token_address = token["address"]
-        token_sym = token["sym"]
-        token_contract = web3.eth.contract(address=token_address, abi=erc20_abi)
-        token_balance = token_contract.functions.balanceOf(address).call()
-        balances[token_sym] =token_balance
+        token_contract = web3.eth.contract(address=token["address"], abi=erc20_abi)
+        batch.add_call(token_contract.functions.balanceOf(address))
+    ETH_balance, *token_balances = batch.execute()
+    balances = {"ETH": ETH_balance}
+    for token, token_balance in zip(data["baseAssets"], token_balances):
+        balances[token["sym"]] = token_balance
     return balances
 
 def approve_tokens(web3, token_contract, spender_address, amount, private_key):
@@ -337,14 +418,14 @@ def approve_tokens(web3, token_contract, spender_address, amount, private_key):
     owner_address = signer_wallet.address
     tx = token_contract.functions.approve(spender_address, amount).build_transaction({
         'from': owner_address,
-        'nonce': web3.eth.get_transaction_count(owner_address),
+        'nonce': get_nonce_manager(web3, owner_address).allocate(),
         'gas': 800000,
         'maxFeePerGas': web3.to_wei('20', 'gwei')
     })
     
     receipt = sign_and_send_tx(web3, tx, private_key)
     token_amount_in_ETH = from_wei(amount, get_token_decimals(token_contract.address, web3))
-    token_symbol = token_contract.functions.symbol().call()
+    token_symbol = get_symbol(token_contract)
     print(f"Approved {token_amount_in_ETH} {token_symbol} from {owner_address} to {spender_address}")
     return receipt
 
@@ -491,7 +572,7 @@ def swap_ETH_for_ERC20(amount_in_ETH, arb_bot, ERC20_instance, router_instance,
         return {'status': 0}
     amount_in_wei = to_wei(amount_in_ETH, 18)
     deadline = arb_bot.web3.eth.get_block('latest')['timestamp'] + 60 * 20 # 20 minutes from the current block
-    path = [router_instance.functions.WETH().call(), ERC20_instance.address]
+    path = [get_WETH(router_instance), ERC20_instance.address]
 
     # Prepare the transaction
     tx = router_instance.functions.swapExactETHForTokens(
@@ -514,7 +595,7 @@ def swap_ETH_for_ERC20(amount_in_ETH, arb_bot, ERC20_instance, router_instance,
           ''')
     # Print the return token balance on recipient.
     ERC20_balance_on_recipient = ERC20_instance.functions.balanceOf(recipient_address).call()
-    token_symbol = ERC20_instance.functions.symbol().call()
+    token_symbol = get_symbol(ERC20_instance)
     balance_from_wei = from_wei(ERC20_balance_on_recipient, get_token_decimals(ERC20_instance.address, arb_bot.web3))
     print(f"Current {token_symbol} balance on recipient address (int): {balance_from_wei} {token_symbol}")
 
@@ -533,7 +614,7 @@ def send_ERC20(arb_bot, recipient_address, ERC20_contract, amount):
     Returns:
         tx_receipt (receipt): The receipt of the ERC20 transfer transaction.
     """
-    print(f'Sending {ERC20_contract.functions.symbol().call()} from sender_address to {recipient_address}...')
+    print(f'Sending {get_symbol(ERC20_contract)} from sender_address to {recipient_address}...')
     # Send ETH to Contract
     tx = ERC20_contract.functions.transfer(
         recipient_address,
@@ -789,7 +870,7 @@ if __name__ == "__main__":
     for token in base_assets:
         token_address = token["address"]
         token_contract = whale_arb_bot.web3.eth.contract(address=token_address, abi=erc20_abi)
-        token_symbol = token_contract.functions.symbol().call()
+        token_symbol = get_symbol(token_contract)
         allowance = get_ERC20_allowance(token_contract, whale_address, uniswap_router_address)
         print(f"UniswapV2Router's allowance for {whale_address}'s {token_symbol}: {allowance} wei.")
         
@@ -0,0 +1,141 @@
+from eth_abi import encode
+from web3 import Web3
+from utilities.gas_model import DEFAULT_GAS_LIMIT
+'''
+tx_templates.py
+
+Builds Arbitrage.executeTrade transactions from cached templates instead of web3's contract-function
+machinery. The function selector and the ABI encoding of the router and token arguments are cached
+per route, so a trade only appends the encoded amount and fills in the nonce and fees before signing.
+Transactions of the most promising routes of a block can also be pre-signed speculatively against the
+next nonce, and are sent as they are if the trade still matches when the opportunity is confirmed.
+'''
+EXECUTE_TRADE_SELECTOR = bytes(Web3.keccak(text="executeTrade(address,address,address,address,uint256)")[:4])
+
+class TradeTxTemplates:
+    """
+    Represents the cached executeTrade transaction templates of an arbitrage bot contract.
+
+    Attributes:
+        account (LocalAccount): the account signing the transactions.
+        chain_id (int): The ID of the connected chain.
+        bot_address (str): Address of the arbitrage bot contract.
+        nonce_manager (NonceManager): local nonce allocator of the sender.
+        prefixes (dict): selector and encoded static arguments keyed by (router1, router2, token1, token2).
+        presigned (dict): (nonce, maxFeePerGas, maxPriorityFeePerGas, raw transaction) keyed by (router1, router2, token1, token2, amount).
+    """
+    def __init__(self, account, chain_id, bot_address, nonce_manager):
+        """
+        Initialize the TradeTxTemplates instance of an arbitrage bot contract.
+
+        Params:
+            account (LocalAccount): the account signing the transactions.
+            chain_id (int): The ID of the connected chain.
+            bot_address (str): Address of the arbitrage bot contract.
+            nonce_manager (NonceManager): local nonce allocator of the sender.
+        """
+        self.account = account
+        self.chain_id = chain_id
+        self.bot_address = bot_address
+        self.nonce_manager = nonce_manager
+        self.prefixes = {}
+        self.presigned = {}
+
+    def encode(self, router1, router2, token1, token2, amount):
+        """
+        Encodes the calldata of executeTrade, reusing the cached selector and static arguments of the route.
+
+        Params:
+            router1 (str): The address of a router contract.
+            router2 (str): The address of a router contract.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+
+        Returns:
+            (bytes): the calldata of the executeTrade call.
+        """
+        route = (router1, router2, token1, token2)
+        if route not in self.prefixes:
+            self.prefixes[route] = EXECUTE_TRADE_SELECTOR + encode(['address', 'address', 'address', 'address'], list(route))
+        return self.prefixes[route] + amount.to_bytes(32, 'big')
+
+    def build(self, router1, router2, token1, token2, amount, nonce, max_fee_per_gas, max_priority_fee_per_gas, gas=DEFAULT_GAS_LIMIT):
+        """
+        Builds an executeTrade transaction from the template of the route.
+
+        Params:
+            router1 (str): The address of a router contract.
+            router2 (str): The address of a router contract.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+            nonce (int): the nonce of the transaction.
+            max_fee_per_gas (int): the max fee per gas in wei.
+            max_priority_fee_per_gas (int): the max priority fee per gas in wei.
+            gas (int): the gas limit of the transaction.
+
+        Returns:
+            tx(dict): the dictionary representation of the trade transaction.
+        """
+        return {
+            'type': 2,
+            'chainId': self.chain_id,
+            'to': self.bot_address,
+            'value': 0,
+            'data': self.encode(router1, router2, token1, token2, amount),
+            'gas': gas,
+            'maxFeePerGas': max_fee_per_gas,
+            'maxPriorityFeePerGas': max_priority_fee_per_gas,
+            'nonce': nonce
+        }
+
+    def presign(self, trades, max_fee_per_gas, max_priority_fee_per_gas, gas_limits=None):
+        """
+        Speculatively signs executeTrade transactions against the next nonce. Only one of them can ever be sent,
+        and all of them are dropped on the next call.
+
+        Params:
+            trades (list): (router1, router2, token1, token2, amount) of every trade to pre-sign.
+            max_fee_per_gas (int): the max fee per gas in wei.
+            max_priority_fee_per_gas (int): the max priority fee per gas in wei.
+            gas_limits (list): the gas limit of every trade. Every trade gets the default gas limit of build if none.
+
+        Returns:
+            (int): the number of pre-signed transactions.
+        """
+        self.presigned = {}
+        nonce = self.nonce_manager.peek()
+        if gas_limits is None:
+            gas_limits = [DEFAULT_GAS_LIMIT] * len(trades)
+        for trade, gas in zip(trades, gas_limits):
+            tx = self.build(*trade, nonce, max_fee_per_gas, max_priority_fee_per_gas, gas)
+            raw_tx = self.account.sign_transaction(tx).rawTransaction
+            self.presigned[tuple(trade)] = (nonce, max_fee_per_gas, max_priority_fee_per_gas, raw_tx)
+        return len(self.presigned)
+
+    def take(self, router1, router2, token1, token2, amount, max_fee_per_gas, max_priority_fee_per_gas):
+        """
+        Takes the pre-signed transaction of a trade if its amount and fees still match and its nonce is still the next one.
+
+        Params:
+            router1 (str): The address of a router contract.
+            router2 (str): The address of a router contract.
+            token1 (str): The address of a token contract.
+            token2 (str): The address of a token contract.
+            amount (int): The amount of token1 to trade with.
+            max_fee_per_gas (int): the current max fee per gas in wei.
+            max_priority_fee_per_gas (int): the current max priority fee per gas in wei.
+
+        Returns:
+            (bytes): the signed raw transaction, or None if no pre-signed transaction can be used.
+        """
+        presigned = self.presigned.pop((router1, router2, token1, token2, amount), None)
+        if presigned is None:
+            return None
+        nonce, presigned_max_fee, presigned_priority_fee, raw_tx = presigned
+        if (presigned_max_fee, presigned_priority_fee) != (max_fee_per_gas, max_priority_fee_per_gas):
+            return None
+        if not self.nonce_manager.claim(nonce):
+            return None
+        return raw_tx
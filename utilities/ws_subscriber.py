@@ -0,0 +1,273 @@
+import asyncio
+import json
+import threading
+import time
+import websockets
+from web3 import Web3
+from utilities.reserve_book import SYNC_EVENT_TOPIC
+'''
+ws_subscriber.py
+
+Pushes new blocks and pair events to the bot over a WebSocket connection to the node, instead of
+having the bot poll for them over HTTP. A background thread subscribes to newHeads and to the Sync
+and Swap logs of the tracked pairs with eth_subscribe, and reconnects and resubscribes whenever the
+connection drops. Heads are coalesced so that a slow consumer always skips to the latest block, and
+logs are buffered up to a bound; if the bound is hit or the connection dropped, the consumer is told
+to resync from the node over HTTP instead of trusting a buffer with gaps. Logs removed by a reorg are
+handed to the consumer, so that it can roll back what it applied from the orphaned blocks.
+'''
+NODE_WS_URL = "ws://127.0.0.1:8545"
+SWAP_EVENT_TOPIC = Web3.to_hex(Web3.keccak(text="Swap(address,uint256,uint256,uint256,uint256,address)"))
+
+class WsSubscriber:
+    """
+    Represents a WebSocket subscription to the new blocks and the Sync and Swap logs of a set of pairs.
+
+    Attributes:
+        ws_url (str): the WebSocket url of the node.
+        pair_addresses (list): addresses of the pair contracts whose logs are subscribed to.
+        max_pending_logs (int): the number of logs buffered for the consumer at most.
+        reconnect_delay (float): seconds to wait before the first reconnect attempt, doubled on every failed attempt.
+        max_reconnect_delay (float): seconds to wait between two reconnect attempts at most.
+        latest_head (int): the number of the latest block announced by the node.
+        last_head (int): the last block number returned to the consumer.
+        sync_logs (list): Sync logs received since the last drain, in the order they were emitted.
+        swap_logs (list): Swap logs received since the last drain, in the order they were emitted.
+        removed_logs (list): Sync and Swap logs removed by a reorg since the last drain.
+        resync (bool): whether logs may have been missed since the last drain.
+        connections (int): the number of connections made, including reconnects.
+        condition (Condition): condition guarding the buffers and signaling new heads.
+        thread (Thread): the background thread running the subscription loop.
+        running (bool): whether the background thread should keep the subscription alive.
+        loop (AbstractEventLoop): the event loop of the background thread.
+        stopped (Event): asyncio event of the background thread set by stop(), which cuts a reconnect delay short.
+        websocket (WebSocketClientProtocol): the open connection to the node, or None while disconnected.
+    """
+    def __init__(self, pair_addresses, ws_url=NODE_WS_URL, max_pending_logs=10000, reconnect_delay=0.5, max_reconnect_delay=10):
+        """
+        Initialize the WsSubscriber instance. The connection is opened with start().
+
+        Params:
+            pair_addresses (list): addresses of the pair contracts whose logs are subscribed to.
+            ws_url (str): the WebSocket url of the node.
+            max_pending_logs (int): the number of logs buffered for the consumer at most.
+            reconnect_delay (float): seconds to wait before the first reconnect attempt, doubled on every failed attempt.
+            max_reconnect_delay (float): seconds to wait between two reconnect attempts at most.
+        """
+        self.ws_url = ws_url
+        self.pair_addresses = list(pair_addresses)
+        self.max_pending_logs = max_pending_logs
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.latest_head = None
+        self.last_head = None
+        self.sync_logs = []
+        self.swap_logs = []
+        self.removed_logs = []
+        self.resync = True # logs emitted before the first subscription are read from the node
+        self.connections = 0
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.loop = None
+        self.stopped = None
+        self.websocket = None
+
+    def on_head(self, head):
+        """
+        Records a new block announced by the node and wakes the consumer.
+
+        Params:
+            head (dict): the block header of the newHeads notification.
+
+        Returns:
+            none
+        """
+        with self.condition:
+            block_number = int(head["number"], 16)
+            if self.latest_head is None or block_number > self.latest_head:
+                self.latest_head = block_number
+            self.condition.notify_all()
+
+    def on_log(self, log):
+        """
+        Buffers a Sync or Swap log of a tracked pair. A log beyond the buffer bound makes the consumer resync instead,
+        and a log removed by a reorg is handed to the consumer to roll back.
+
+        Params:
+            log (dict): the log of the logs notification.
+
+        Returns:
+            none
+        """
+        with self.condition:
+            if len(self.sync_logs) + len(self.swap_logs) + len(self.removed_logs) >= self.max_pending_logs:
+                self.resync = True
+                return
+            log = dict(log, data=bytes.fromhex(log["data"][2:]), blockNumber=int(log["blockNumber"], 16))
+            if log.get("removed"):
+                self.removed_logs.append(log)
+            elif log["topics"][0] == SYNC_EVENT_TOPIC:
+                self.sync_logs.append(log)
+            elif log["topics"][0] == SWAP_EVENT_TOPIC:
+                self.swap_logs.append(log)
+
+    def wait_for_head(self, end_time):
+        """
+        Waits for a block newer than the last one returned. Skips straight to the latest block if several blocks were announced in between.
+
+        Params:
+            end_time (float): the time to stop waiting at.
+
+        Returns:
+            (int): the new block number, or None if end_time was reached.
+        """
+        with self.condition:
+            while self.latest_head is None or (self.last_head is not None and self.latest_head <= self.last_head):
+                remaining = end_time - time.time()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+            self.last_head = self.latest_head
+            return self.last_head
+
+    def drain(self):
+        """
+        Takes the logs buffered since the last drain.
+
+        Returns:
+            sync_logs (list): Sync logs of the tracked pairs, in the order they were emitted.
+            swap_logs (list): Swap logs of the tracked pairs, in the order they were emitted.
+            resync (bool): true if logs may have been missed, in which case the logs should be read from the node instead.
+            removed_logs (list): logs removed by a reorg, whose blocks should be read again from the node.
+        """
+        with self.condition:
+            sync_logs, swap_logs, resync, removed_logs = self.sync_logs, self.swap_logs, self.resync, self.removed_logs
+            self.sync_logs, self.swap_logs, self.resync, self.removed_logs = [], [], False, []
+            return sync_logs, swap_logs, resync, removed_logs
+
+    def on_notification(self, notification, subscriptions):
+        """
+        Hands an eth_subscription notification to on_head or on_log by the kind of its subscription.
+
+        Params:
+            notification (dict): the eth_subscription notification.
+            subscriptions (dict): "newHeads" or "logs" keyed by subscription ID.
+
+        Returns:
+            none
+        """
+        kind = subscriptions.get(notification["params"]["subscription"])
+        if kind == "newHeads":
+            self.on_head(notification["params"]["result"])
+        elif kind == "logs":
+            self.on_log(notification["params"]["result"])
+
+    async def subscribe(self, websocket):
+        """
+        Subscribes to newHeads and to the Sync and Swap logs of the tracked pairs on a new connection. Notifications of
+        a subscription that arrive before the reply to the other subscription are kept and handled once both are known.
+
+        Params:
+            websocket (WebSocketClientProtocol): the open connection to the node.
+
+        Returns:
+            (dict): "newHeads" or "logs" keyed by subscription ID.
+        """
+        requests = {
+            1: ("newHeads", ["newHeads"]),
+            2: ("logs", ["logs", {"address": self.pair_addresses, "topics": [[SYNC_EVENT_TOPIC, SWAP_EVENT_TOPIC]]}]),
+        }
+        for request_id, (_, params) in requests.items():
+            await websocket.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": "eth_subscribe", "params": params}))
+        subscriptions = {}
+        notifications = []
+        while len(subscriptions) < len(requests):
+            message = json.loads(await websocket.recv())
+            if message.get("method") == "eth_subscription":
+                notifications.append(message)
+            elif message.get("id") in requests:
+                if "error" in message:
+                    raise ConnectionError(f"eth_subscribe failed: {message['error']}")
+                subscriptions[message["result"]] = requests[message["id"]][0]
+        for notification in notifications:
+            self.on_notification(notification, subscriptions)
+        return subscriptions
+
+    async def listen(self):
+        """
+        Keeps the subscription alive until stopped, reconnecting and resubscribing whenever the connection drops.
+        Runs in the event loop of the background thread.
+
+        Returns:
+            none
+        """
+        delay = self.reconnect_delay
+        while self.running:
+            try:
+                async with websockets.connect(self.ws_url) as websocket:
+                    self.websocket = websocket
+                    subscriptions = await self.subscribe(websocket)
+                    self.connections += 1
+                    delay = self.reconnect_delay
+                    async for message in websocket:
+                        notification = json.loads(message)
+                        if notification.get("method") == "eth_subscription":
+                            self.on_notification(notification, subscriptions)
+            except (OSError, websockets.WebSocketException, ConnectionError) as error:
+                if self.running:
+                    print(f"WebSocket subscription lost: {error}. Reconnecting in {delay}s.")
+            finally:
+                self.websocket = None
+            if self.running:
+                # logs emitted while disconnected are lost, so the consumer reads them from the node
+                with self.condition:
+                    self.resync = True
+                try:
+                    await asyncio.wait_for(self.stopped.wait(), delay) # returns early once stopped
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    def run(self):
+        """
+        Runs the subscription loop in the event loop of the background thread.
+
+        Returns:
+            none
+        """
+        loop = asyncio.new_event_loop()
+        self.stopped = asyncio.Event()
+        self.loop = loop
+        loop.run_until_complete(self.listen())
+        loop.close()
+
+    def start(self):
+        """
+        Starts the background subscription thread.
+
+        Returns:
+            (WsSubscriber): the subscriber itself.
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Closes the connection and stops the background subscription thread, also while it waits to reconnect.
+
+        Returns:
+            none
+        """
+        self.running = False
+        if self.loop is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.stopped.set)
+                if self.websocket is not None:
+                    asyncio.run_coroutine_threadsafe(self.websocket.close(), self.loop)
+            except RuntimeError:
+                pass # the loop has already finished and closed
+        if self.thread is not None:
+            self.thread.join()